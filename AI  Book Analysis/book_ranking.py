@@ -0,0 +1,63 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+# How often each field's words count in a book's document: titles say the most about a book.
+FIELD_WEIGHTS = {"title": 3, "category": 2, "author": 1, "description": 1}
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "book", "books", "but", "by", "for", "from", "i", "in", "into",
+    "is", "it", "its", "like", "love", "me", "my", "of", "on", "or", "prefer", "something", "that", "the",
+    "their", "this", "to", "want", "was", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [_stem(word) for word in words if word not in STOPWORDS and len(word) > 1]
+
+
+def _stem(word: str) -> str:
+    """Plural to singular, which is most of the mismatch between preferences and blurbs."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _document(book: Dict) -> List[str]:
+    tokens = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = book.get(field)
+        if value and value != "N/A":
+            tokens += tokenize(str(value)) * weight
+    return tokens
+
+
+def rank_books(books: List[Dict], preference: str, k1: float = 1.5, b: float = 0.75) -> List[Dict]:
+    """
+    Books sorted by Okapi BM25 relevance of their title, category, author and description to the
+    preference text. Ties, including a preference that matches nothing, keep the search order.
+    """
+    query = set(tokenize(preference))
+    documents = [Counter(_document(book)) for book in books]
+    if not query or not documents:
+        return list(books)
+    lengths = [sum(document.values()) for document in documents]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    document_frequency = Counter(term for document in documents for term in query if term in document)
+    n = len(documents)
+
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term in query:
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (n - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    order = sorted(range(n), key=lambda i: -scores[i])
+    return [books[i] for i in order]
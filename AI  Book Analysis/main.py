@@ -1,10 +1,20 @@
 import streamlit as st
 import json
 import os
+import sys
 from dotenv import load_dotenv
 import serpapi
 from groq import Groq
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.prompt_compaction import compact_records
+from llm_toolkit.router import wrap_client
+
+from book_ranking import rank_books
+
 # Load environment variables
 load_dotenv()
 
@@ -40,7 +50,16 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize Groq client
-client = Groq(api_key=os.getenv("GROQ"))
+@st.cache_resource
+def get_client():
+    """Built once per process, so the router's backend health is shared by every rerun and session"""
+    return wrap_client(Groq(api_key=os.getenv("GROQ")), app="ai_book_analysis")
+
+
+client = get_client()
+
+# Books sent to the LLM after local BM25 ranking against the preference
+TOP_K = int(os.getenv("BOOK_ANALYSIS_TOP_K", "5"))
 
 
 def fetch_books(query):
@@ -74,11 +93,13 @@ def fetch_books(query):
     return books_data
 
 
-def get_best_book(books, preference):
-    if not books:
+def get_best_book(ranked_books, preference, top_k=TOP_K):
+    """Recommend one book; ranked_books comes from rank_books(books, preference), most relevant first."""
+    if not ranked_books:
         return "No books found for the given query."
 
-    top_books = books[0:10]
+    # Only the books most relevant to the preference go into the prompt.
+    top_books = ranked_books[:top_k]
     prompt = f"""
     You are an expert in book recommendations. Given the following books and user preference, 
     recommend the best book.
@@ -86,7 +107,7 @@ def get_best_book(books, preference):
     User preference: {preference}
 
     Books:
-    {json.dumps(top_books, indent=2)}
+    {compact_records(top_books, "books")}
 
     Provide the title of the best book along with a short explanation.
     """
@@ -128,8 +149,9 @@ if search_button:
             # Display results in columns
             st.subheader(f"📖 Found {len(books)} Books")
 
-            # Best recommendation section
+            # Best recommendation section; the grid below then lists the books by relevance
             if preference:
+                books = rank_books(books, preference)
                 with st.spinner("🤖 AI is finding the best book for you..."):
                     best_book = get_best_book(books, preference)
 
@@ -1,14 +1,102 @@
 import os
+import sys
+from typing import Tuple
 import streamlit as st
 from groq import Groq
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.router import is_degraded, wrap_client
+
+from code_chunks import AnalysisCache, Chunk, analyze_chunks, merge_results, number_lines, split_code
+from style_check import check_style
+
 
 # Load environment variables from .env file
 load_dotenv()
+
+
 # Initialize the Groq client using your environment variable.
 # Make sure you have set the GROQ environment variable appropriately.
-client = Groq(api_key = os.getenv("GROQ"))
+@st.cache_resource
+def get_client():
+    """One routed client per process, so backend health survives reruns"""
+    return wrap_client(Groq(api_key = os.getenv("GROQ")), app="ai_coding_assistant")
+
+
+client = get_client()
+
+ANALYSIS_INSTRUCTIONS = {
+    "bug_finder": ("Analyze the following code snippet for bugs, spelling mistakes, "
+                   "and provide suggestions to optimize and improve the code"),
+    "pep8_checker": ("Analyze the following Python code for compliance with PEP8 guidelines. "
+                     "Identify any violations and suggest improvements"),
+    # Used after the local style check has already reported the mechanical violations.
+    "pep8_improvements": ("The following Python code has already been checked by a PEP8 style checker for "
+                          "whitespace, line length, blank lines, imports, comparisons and naming case; do not "
+                          "repeat those. Suggest only improvements a checker cannot find: clearer names, "
+                          "docstrings and comments, simpler structure and more idiomatic Python"),
+}
+
+
+@st.cache_resource
+def get_analysis_cache() -> AnalysisCache:
+    """Chunk analyses shared by every session, keyed by content hash"""
+    return AnalysisCache()
+
+
+analysis_cache = get_analysis_cache()
+
+
+def request_analysis(prompt: str) -> Tuple[str, bool]:
+    """Send one analysis prompt to Groq; raises on API errors. Also returns whether the reply is a degraded one."""
+    # Prepare the message payload for the Groq API.
+    messages = [
+        {"role": "system", "content": "you are a helpful assistant."},
+        {"role": "user", "content": prompt}
+    ]
+    chat_completion = client.chat.completions.create(
+        messages=messages,
+        model="llama-3.3-70b-versatile",
+        temperature=0.5,
+        max_completion_tokens=1024,
+        top_p=1,
+        stop=None,
+        stream=False,
+    )
+    return chat_completion.choices[0].message.content, is_degraded(chat_completion)
+
+
+def analyze_chunk(chunk: Chunk, analysis_type: str) -> Tuple[str, bool]:
+    """Analyze one function, class or block; line numbers in the answer are relative to the chunk."""
+    instructions = ANALYSIS_INSTRUCTIONS.get(analysis_type, "Analyze the following code")
+    prompt = (
+        f"{instructions}. This is `{chunk.name}` from a larger file. Each line is prefixed with its "
+        "number; refer to problems as 'line N' using those numbers. Only report on this part:\n\n"
+        + number_lines(chunk.code)
+    )
+    return request_analysis(prompt)
+
+
+def analyze_code_in_chunks(code: str, analysis_type: str, on_result=None) -> str:
+    """
+    Split the code into functions/classes (or by size for non-Python code), analyze the chunks
+    concurrently and merge the findings with file line numbers. on_result(result, done, total)
+    is called as each chunk finishes.
+    """
+    chunks = split_code(code)
+    results = []
+    for result in analyze_chunks(chunks, analysis_type, lambda chunk: analyze_chunk(chunk, analysis_type),
+                                 analysis_cache):
+        record_cache("ai_coding_assistant", "analyze_chunk", result.cached)
+        results.append(result)
+        if on_result:
+            on_result(result, len(results), len(chunks))
+    return merge_results(results)
 
 
 def analyze_code(code: str, analysis_type: str) -> str:
@@ -22,52 +110,44 @@ def analyze_code(code: str, analysis_type: str) -> str:
     Returns:
         str: The response from the LLM.
     """
-    if analysis_type == "bug_finder":
-        prompt = (
-                "Analyze the following code snippet for bugs, spelling mistakes, "
-                "and provide suggestions to optimize and improve the code:\n\n" + code
-        )
-    elif analysis_type == "pep8_checker":
-        prompt = (
-                "Analyze the following Python code for compliance with PEP8 guidelines. "
-                "Identify any violations and suggest improvements:\n\n" + code
-        )
-    else:
-        prompt = "Analyze the following code:\n\n" + code
-
-    # Prepare the message payload for the Groq API.
-    messages = [
-        {"role": "system", "content": "you are a helpful assistant."},
-        {"role": "user", "content": prompt}
-    ]
+    prompt = ANALYSIS_INSTRUCTIONS.get(analysis_type, "Analyze the following code") + ":\n\n" + code
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b-versatile",
-            temperature=0.5,
-            max_completion_tokens=1024,
-            top_p=1,
-            stop=None,
-            stream=False,
-        )
-        return chat_completion.choices[0].message.content
+        return request_analysis(prompt)[0]
     except Exception as e:
         return f"Error calling Groq API: {e}"
 
 
+def run_analysis(code: str, analysis_type: str, chunked: bool) -> str:
+    """Whole-snippet analysis, or chunked analysis with a progress bar."""
+    if not chunked:
+        return analyze_code(code, analysis_type=analysis_type)
+    progress = st.progress(0.0)
+
+    def on_result(result, done, total):
+        progress.progress(done / total, text=f"Analyzed {result.chunk.name} ({done}/{total})")
+
+    merged = analyze_code_in_chunks(code, analysis_type, on_result)
+    progress.empty()
+    return merged
+
+
 def bug_finder_page():
     st.title("Code Bug Finder & Optimizer")
     st.write("Enter your code snippet below to detect bugs, spelling errors, and receive optimization suggestions.")
 
     code_input = st.text_area("Enter your code here", height=300)
+    chunked = st.checkbox("Analyze large code function by function",
+                          value=code_input.count("\n") > 150,
+                          help="Splits the code into functions and classes, analyzes them in parallel and "
+                               "only re-analyzes the parts you changed.")
 
     if st.button("Analyze Code"):
         if not code_input.strip():
             st.error("Please enter some code before analyzing.")
         else:
             with st.spinner("Analyzing code..."):
-                result = analyze_code(code_input, analysis_type="bug_finder")
+                result = run_analysis(code_input, "bug_finder", chunked)
             st.subheader("Analysis Result")
             st.code(result, language="python")
 
@@ -77,15 +157,31 @@ def pep8_checker_page():
     st.write("Enter your Python code below to check for PEP8 compliance and receive improvement suggestions.")
 
     code_input = st.text_area("Enter your Python code here", height=300)
+    chunked = st.checkbox("Check large code function by function",
+                          value=code_input.count("\n") > 150,
+                          help="Splits the code into functions and classes, checks them in parallel and "
+                               "only re-checks the parts you changed.")
 
     if st.button("Check PEP8 Guidelines"):
         if not code_input.strip():
             st.error("Please enter some code before checking.")
-        else:
-            with st.spinner("Checking code..."):
-                result = analyze_code(code_input, analysis_type="pep8_checker")
-            st.subheader("PEP8 Analysis Result")
-            st.code(result, language="python")
+            return
+
+        # Mechanical violations are found locally in milliseconds; only the rest goes to the LLM.
+        violations = check_style(code_input)
+        st.subheader("PEP8 Violations")
+        if not violations:
+            st.success("No PEP8 violations found. 🎉")
+            return
+        st.dataframe([v._asdict() for v in violations], hide_index=True, use_container_width=True)
+        if violations[0].code == "E999":
+            st.error("Fix the syntax error first; the code could not be checked any further.")
+            return
+
+        with st.spinner("Looking for further improvements..."):
+            result = run_analysis(code_input, "pep8_improvements", chunked)
+        st.subheader("Suggested Improvements")
+        st.code(result, language="python")
 
 
 def main():
@@ -0,0 +1,200 @@
+import ast
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from llm_toolkit.cache import LRUCache
+
+# Chunks longer than this are split further (classes into methods, everything else by size).
+MAX_CHUNK_LINES = 120
+
+DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+LINE_REFERENCE = re.compile(r"\b([Ll]ines?\s+)(\d+)(?:(\s*(?:-|–|to|and)\s*)(\d+))?")
+
+
+class Chunk(NamedTuple):
+    name: str
+    start: int  # 1-based, inclusive
+    end: int
+    code: str
+
+
+class ChunkResult(NamedTuple):
+    chunk: Chunk
+    analysis: str
+    cached: bool
+    error: Optional[str]
+
+
+def _node_start(node) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def _make_chunk(name: str, lines: List[str], start: int, end: int) -> Chunk:
+    return Chunk(name, start, end, "\n".join(lines[start - 1:end]))
+
+
+def _with_leading_comments(lines: List[str], start: int, first_free: int) -> int:
+    """Move a definition's start up over the comment lines directly above it (but not before first_free)."""
+    while start - 1 >= first_free and lines[start - 2].strip().startswith("#"):
+        start -= 1
+    return start
+
+
+def _code_between(lines: List[str], start: int, end: int, max_lines: int, name: str) -> List[Chunk]:
+    """Lines start..end without leading/trailing blank lines, as one chunk or split by size if too long."""
+    while start <= end and not lines[start - 1].strip():
+        start += 1
+    while end >= start and not lines[end - 1].strip():
+        end -= 1
+    if start > end:
+        return []
+    if end - start + 1 <= max_lines:
+        return [_make_chunk(name, lines, start, end)]
+    return split_by_size("\n".join(lines[start - 1:end]), max_lines, name, start)
+
+
+def split_by_size(code: str, max_lines: int = MAX_CHUNK_LINES, name: str = "lines",
+                  first_line: int = 1) -> List[Chunk]:
+    """Split text into pieces of at most max_lines, preferring to cut at blank lines."""
+    lines = code.split("\n")
+    chunks, start = [], 0
+    while start < len(lines):
+        end = min(start + max_lines, len(lines))
+        if end < len(lines):
+            blank = max((i for i in range(start + max_lines // 2, end) if not lines[i].strip()), default=None)
+            end = blank + 1 if blank is not None else end
+        piece = "\n".join(lines[start:end])
+        if piece.strip():
+            chunks.append(Chunk(f"{name} {first_line + start}-{first_line + end - 1}",
+                                first_line + start, first_line + end - 1, piece))
+        start = end
+    return chunks
+
+
+def split_python(code: str, max_lines: int = MAX_CHUNK_LINES) -> Optional[List[Chunk]]:
+    """
+    One chunk per top-level function or class (decorators and the comments directly above it included),
+    with everything between them (statements and comments) grouped as module code. Long classes are
+    split into their methods, long functions and module code by size.
+    Returns None if the code is not valid Python.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    lines = code.split("\n")
+    chunks = []
+    first_free = 1  # first line not yet in a chunk
+
+    for node in tree.body:
+        if not isinstance(node, DEFINITIONS):
+            continue
+        start, end = _with_leading_comments(lines, _node_start(node), first_free), node.end_lineno
+        chunks.extend(_code_between(lines, first_free, start - 1, max_lines, "module code"))
+        first_free = end + 1
+        if end - start + 1 <= max_lines:
+            chunks.append(_make_chunk(node.name, lines, start, end))
+        elif isinstance(node, ast.ClassDef):
+            chunks.extend(_split_class(node, lines, max_lines, start))
+        else:
+            chunks.extend(split_by_size("\n".join(lines[start - 1:end]), max_lines, node.name, start))
+    chunks.extend(_code_between(lines, first_free, len(lines), max_lines, "module code"))
+    return chunks
+
+
+def _split_class(node: ast.ClassDef, lines: List[str], max_lines: int, class_start: int) -> List[Chunk]:
+    """One chunk per method; the class line, docstring and attributes between methods are grouped by size."""
+    chunks = []
+    first_free = class_start  # first line not yet in a chunk
+    for child in node.body:
+        if not isinstance(child, DEFINITIONS):
+            continue
+        start, end = _with_leading_comments(lines, _node_start(child), first_free), child.end_lineno
+        chunks.extend(_code_between(lines, first_free, start - 1, max_lines, f"class {node.name}"))
+        first_free = end + 1
+        name = f"{node.name}.{child.name}"
+        if end - start + 1 <= max_lines:
+            chunks.append(_make_chunk(name, lines, start, end))
+        else:
+            chunks.extend(split_by_size("\n".join(lines[start - 1:end]), max_lines, name, start))
+    chunks.extend(_code_between(lines, first_free, node.end_lineno, max_lines, f"class {node.name}"))
+    return chunks
+
+
+def split_code(code: str, max_lines: int = MAX_CHUNK_LINES) -> List[Chunk]:
+    """AST chunks for Python, size-based chunks for anything else."""
+    return split_python(code, max_lines) or split_by_size(code, max_lines)
+
+
+def number_lines(code: str) -> str:
+    """Prefix each line with its number inside the chunk, so the model can cite lines."""
+    return "\n".join(f"{i:>4} | {line}" for i, line in enumerate(code.split("\n"), start=1))
+
+
+def shift_line_references(text: str, offset: int) -> str:
+    """Turn 'line 3' / 'lines 3-5' relative to a chunk into line numbers in the whole file."""
+    def shift(match):
+        first = f"{match.group(1)}{int(match.group(2)) + offset}"
+        if match.group(4):
+            return f"{first}{match.group(3)}{int(match.group(4)) + offset}"
+        return first
+    return LINE_REFERENCE.sub(shift, text) if offset else text
+
+
+class AnalysisCache(LRUCache):
+    """Thread-safe LRU of chunk analyses keyed by (analysis type, chunk content)."""
+
+    def __init__(self, max_items: int = 1024):
+        super().__init__(max_items)
+
+    @staticmethod
+    def key(analysis_type: str, code: str) -> str:
+        return hashlib.sha256(f"{analysis_type}\x1f{code}".encode("utf-8")).hexdigest()
+
+
+def analyze_chunks(chunks: List[Chunk], analysis_type: str, analyze: Callable[[Chunk], Tuple[str, bool]],
+                   cache: AnalysisCache, max_workers: int = 4) -> Iterator[ChunkResult]:
+    """
+    Analyze chunks concurrently and yield results as they finish, cached ones first.
+
+    `analyze(chunk)` returns the analysis with line numbers relative to the chunk plus whether it is a
+    degraded (offline fallback) reply, and raises on API errors; errors and degraded replies are reported,
+    not cached. Results are cached by content only, so a chunk that just moved up or down the file is
+    not analyzed again; line references are shifted on the way out.
+    """
+    pending = []
+    for chunk in chunks:
+        cached = cache.get(cache.key(analysis_type, chunk.code))
+        if cached is not None:
+            yield ChunkResult(chunk, shift_line_references(cached, chunk.start - 1), True, None)
+        else:
+            pending.append(chunk)
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(analyze, chunk): chunk for chunk in pending}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                analysis, degraded = future.result()
+            except Exception as e:
+                yield ChunkResult(chunk, "", False, str(e))
+                continue
+            if not degraded:
+                cache.put(cache.key(analysis_type, chunk.code), analysis)
+            yield ChunkResult(chunk, shift_line_references(analysis, chunk.start - 1), False, None)
+
+
+def merge_results(results: List[ChunkResult]) -> str:
+    """One report, in file order, with a header per chunk giving its line range."""
+    sections = []
+    for result in sorted(results, key=lambda r: r.chunk.start):
+        header = f"## {result.chunk.name} (lines {result.chunk.start}-{result.chunk.end})"
+        body = f"Error calling Groq API: {result.error}" if result.error else result.analysis.strip()
+        sections.append(f"{header}\n{body}")
+    return "\n\n".join(sections)
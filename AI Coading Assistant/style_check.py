@@ -0,0 +1,291 @@
+import ast
+import io
+import keyword
+import re
+import tokenize
+from typing import List, NamedTuple, Set
+
+try:
+    import pycodestyle  # optional: the reference implementation, used when installed
+except ImportError:
+    pycodestyle = None
+
+MAX_LINE_LENGTH = 79
+
+# Operators that always need a space on both sides.
+SPACED_OPERATORS = {
+    "==", "!=", "<", ">", "<=", ">=", "->", "+=", "-=", "*=", "/=", "//=", "%=", "**=",
+    "|=", "&=", "^=", ">>=", "<<=", "@=", ":=",
+}
+OPENING_BRACKETS = "([{"
+CLOSING_BRACKETS = ")]}"
+# Python 3.12+ tokenizes f-strings into pieces; earlier versions give a single STRING token.
+FSTRING_START = getattr(tokenize, "FSTRING_START", None)
+FSTRING_END = getattr(tokenize, "FSTRING_END", None)
+SKIPPED_TOKENS = {tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER}
+
+
+class Violation(NamedTuple):
+    line: int
+    column: int
+    code: str
+    message: str
+
+    def __str__(self):
+        return f"line {self.line}, col {self.column}: {self.code} {self.message}"
+
+
+def check_style(code: str, max_line_length: int = MAX_LINE_LENGTH) -> List[Violation]:
+    """
+    Deterministic PEP8 violations, sorted by position.
+
+    Uses pycodestyle when it is installed and the built-in tokenize/ast checks otherwise;
+    naming conventions (N8xx) are always checked here. Code that does not parse gives a single E999.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [Violation(e.lineno or 1, e.offset or 1, "E999", f"SyntaxError: {e.msg}")]
+
+    lines = code.split("\n")
+    if pycodestyle is not None:
+        violations = _pycodestyle_violations(code, max_line_length)
+    else:
+        violations = (_physical_line_checks(lines, max_line_length) + _token_checks(code)
+                      + _blank_line_checks(tree, lines) + _ast_checks(tree))
+    violations += _naming_checks(tree)
+    return sorted(set(violations))
+
+
+def _pycodestyle_violations(code: str, max_line_length: int) -> List[Violation]:
+    class CollectingReport(pycodestyle.BaseReport):
+        def __init__(self, options):
+            super().__init__(options)
+            self.violations = []
+
+        def error(self, line_number, offset, text, check):
+            code = super().error(line_number, offset, text, check)
+            if code:
+                self.violations.append(Violation(line_number, offset + 1, code, text[5:]))
+            return code
+
+    style = pycodestyle.StyleGuide(quiet=True, max_line_length=max_line_length)
+    report = CollectingReport(style.options)
+    checker = pycodestyle.Checker(lines=code.splitlines(True), options=style.options, report=report)
+    checker.check_all()
+    return report.violations
+
+
+def _physical_line_checks(lines: List[str], max_line_length: int) -> List[Violation]:
+    violations = []
+    for number, line in enumerate(lines, start=1):
+        stripped = line.rstrip()
+        if len(stripped) > max_line_length:
+            violations.append(Violation(number, max_line_length + 1, "E501",
+                                        f"line too long ({len(stripped)} > {max_line_length} characters)"))
+        if line != stripped:
+            if stripped:
+                violations.append(Violation(number, len(stripped) + 1, "W291", "trailing whitespace"))
+            else:
+                violations.append(Violation(number, 1, "W293", "whitespace on a blank line"))
+        indent = line[:len(line) - len(line.lstrip())]
+        if "\t" in indent:
+            violations.append(Violation(number, indent.index("\t") + 1, "W191", "indentation contains tabs"))
+    trailing = len(lines) - len("\n".join(lines).rstrip().split("\n"))
+    if trailing > 1:
+        violations.append(Violation(len(lines) - trailing + 1, 1, "W391", "blank line at end of file"))
+    return violations
+
+
+def _token_checks(code: str) -> List[Violation]:
+    tokens = [tok for tok in tokenize.generate_tokens(io.StringIO(code).readline)]
+    violations = []
+    brackets = []  # currently open brackets, innermost last
+    lambda_depths = []  # bracket depths of lambdas whose argument list is still open
+    significant = [tok for tok in tokens if tok.type not in SKIPPED_TOKENS]
+
+    for tok in tokens:
+        if tok.type == tokenize.INDENT and len(tok.string.expandtabs(8)) % 4:
+            violations.append(Violation(tok.start[0], 1, "E111", "indentation is not a multiple of four"))
+
+    for i, tok in enumerate(significant):
+        prev = significant[i - 1] if i > 0 else None
+        nxt = significant[i + 1] if i + 1 < len(significant) else None
+        same_line_prev = prev is not None and prev.end[0] == tok.start[0]
+        same_line_next = nxt is not None and nxt.start[0] == tok.end[0]
+        row, col = tok.start
+
+        if tok.type == tokenize.COMMENT:
+            text = tok.string
+            if same_line_prev:
+                if col - prev.end[1] < 2:
+                    violations.append(Violation(row, col + 1, "E261", "at least two spaces before inline comment"))
+                if not text.startswith("# ") and text != "#":
+                    violations.append(Violation(row, col + 1, "E262", "inline comment should start with '# '"))
+            elif not re.match(r"#(!|:|\s|$)|#+\s|#+$", text) or (text.startswith("#!") and row != 1):
+                violations.append(Violation(row, col + 1, "E265", "block comment should start with '# '"))
+            continue
+
+        if tok.type == tokenize.NAME and tok.string == "lambda":
+            lambda_depths.append(len(brackets))
+            continue
+        if tok.type != tokenize.OP:
+            continue
+        if tok.string in OPENING_BRACKETS:
+            if same_line_prev and prev.type == tokenize.NAME and not _is_keyword(prev) \
+                    and prev.end[1] < col and tok.string != "{":
+                violations.append(Violation(row, prev.end[1] + 1, "E211", f"whitespace before '{tok.string}'"))
+            if same_line_next and nxt.type != tokenize.COMMENT and nxt.start[1] > tok.end[1] \
+                    and nxt.string not in CLOSING_BRACKETS:
+                violations.append(Violation(row, col + 2, "E201", f"whitespace after '{tok.string}'"))
+            brackets.append(tok.string)
+        elif tok.string in CLOSING_BRACKETS:
+            if brackets:
+                brackets.pop()
+            if same_line_prev and prev.end[1] < col and prev.string not in OPENING_BRACKETS + ",":
+                violations.append(Violation(row, prev.end[1] + 1, "E202", f"whitespace before '{tok.string}'"))
+        elif tok.string in ",;":
+            if same_line_prev and prev.end[1] < col:
+                violations.append(Violation(row, prev.end[1] + 1, "E203", f"whitespace before '{tok.string}'"))
+            if tok.string == ";":
+                if nxt is None or not same_line_next or nxt.type == tokenize.COMMENT:
+                    violations.append(Violation(row, col + 1, "E703", "statement ends with a semicolon"))
+                else:
+                    violations.append(Violation(row, col + 1, "E702", "multiple statements on one line (semicolon)"))
+            elif same_line_next and nxt.start[1] == tok.end[1] and nxt.string not in CLOSING_BRACKETS:
+                violations.append(Violation(row, col + 1, "E231", "missing whitespace after ','"))
+        elif tok.string == ":":
+            if lambda_depths and lambda_depths[-1] == len(brackets):
+                lambda_depths.pop()  # end of the lambda's arguments
+            # Slices are exempt: PEP8 treats their colon as a binary operator, spaces allowed.
+            if same_line_prev and prev.end[1] < col and prev.string not in OPENING_BRACKETS + "," \
+                    and not (brackets and brackets[-1] == "["):
+                violations.append(Violation(row, prev.end[1] + 1, "E203", "whitespace before ':'"))
+        elif tok.string in SPACED_OPERATORS or (tok.string == "=" and not brackets
+                                                and not (lambda_depths and lambda_depths[-1] == 0)):
+            if (same_line_prev and prev.end[1] == col) or (same_line_next and nxt.start[1] == tok.end[1]):
+                violations.append(Violation(row, col + 1, "E225", "missing whitespace around operator"))
+    return violations
+
+
+def _is_keyword(tok: tokenize.TokenInfo) -> bool:
+    """Keywords, including the soft keywords match/case where they start a statement."""
+    if keyword.iskeyword(tok.string):
+        return True
+    return tok.string in ("match", "case") and not tok.line[:tok.start[1]].strip()
+
+
+def _string_continuation_lines(code: str) -> Set[int]:
+    """Lines that continue a multi-line string (docstrings included); their blank lines are string content."""
+    rows = set()
+    fstring_starts = []
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        if tok.type == FSTRING_START:
+            fstring_starts.append(tok.start[0])
+            continue
+        if tok.type == FSTRING_END:
+            start_row = fstring_starts.pop()
+        elif tok.type == tokenize.STRING:
+            start_row = tok.start[0]
+        else:
+            continue
+        rows.update(range(start_row + 1, tok.end[0] + 1))
+    return rows
+
+
+def _blank_lines_before(lines: List[str], line_number: int) -> int:
+    """Blank lines above a statement, looking past the comments directly above it."""
+    index = line_number - 2
+    while index >= 0 and lines[index].strip().startswith("#"):
+        index -= 1
+    count = 0
+    while index >= 0 and not lines[index].strip():
+        count += 1
+        index -= 1
+    return count if index >= 0 else -1  # -1: start of file
+
+
+def _node_start(node) -> int:
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+
+def _blank_line_checks(tree: ast.Module, lines: List[str]) -> List[Violation]:
+    violations = []
+    definitions = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    for previous, node in zip([None] + tree.body[:-1], tree.body):
+        blanks = _blank_lines_before(lines, _node_start(node))
+        if previous is None or blanks < 0:
+            continue
+        if isinstance(node, definitions) and blanks < 2:
+            violations.append(Violation(_node_start(node), 1, "E302", f"expected 2 blank lines, found {blanks}"))
+        elif isinstance(previous, definitions) and not isinstance(node, definitions) and blanks < 2:
+            violations.append(Violation(node.lineno, 1, "E305",
+                                        f"expected 2 blank lines after class or function definition, found {blanks}"))
+
+    for cls in (n for n in ast.walk(tree) if isinstance(n, ast.ClassDef)):
+        for previous, node in zip(cls.body[:-1], cls.body[1:]):
+            if isinstance(node, definitions) and _blank_lines_before(lines, _node_start(node)) == 0:
+                violations.append(Violation(_node_start(node), node.col_offset + 1, "E301",
+                                            "expected 1 blank line, found 0"))
+
+    in_strings = _string_continuation_lines("\n".join(lines))
+    run = 0
+    for number, line in enumerate(lines, start=1):
+        if number in in_strings:
+            run = 0
+            continue
+        if not line.strip():
+            run += 1
+            continue
+        allowed = 2 if not line[:1].isspace() else 1
+        if run > allowed:
+            violations.append(Violation(number, 1, "E303", f"too many blank lines ({run})"))
+        run = 0
+    return violations
+
+
+def _ast_checks(tree: ast.Module) -> List[Violation]:
+    violations = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Compare):
+            operands = [node.left] + node.comparators
+            for op, left, right in zip(node.ops, operands, operands[1:]):
+                if not isinstance(op, (ast.Eq, ast.NotEq)):
+                    continue
+                for side in (left, right):
+                    if isinstance(side, ast.Constant) and side.value is None:
+                        violations.append(Violation(node.lineno, node.col_offset + 1, "E711",
+                                                    "comparison to None should be 'if cond is None:'"))
+                    elif isinstance(side, ast.Constant) and isinstance(side.value, bool):
+                        violations.append(Violation(node.lineno, node.col_offset + 1, "E712",
+                                                    f"comparison to {side.value} should be "
+                                                    f"'if cond is {side.value}:' or 'if {'' if side.value else 'not '}cond:'"))
+        elif isinstance(node, ast.ExceptHandler) and node.type is None:
+            violations.append(Violation(node.lineno, node.col_offset + 1, "E722", "do not use bare 'except'"))
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Lambda):
+            violations.append(Violation(node.lineno, node.col_offset + 1, "E731",
+                                        "do not assign a lambda expression, use a def"))
+        elif isinstance(node, ast.Import) and len(node.names) > 1:
+            violations.append(Violation(node.lineno, node.col_offset + 1, "E401", "multiple imports on one line"))
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store) and node.id in ("l", "O", "I"):
+            violations.append(Violation(node.lineno, node.col_offset + 1, "E741",
+                                        f"ambiguous variable name '{node.id}'"))
+    return violations
+
+
+def _naming_checks(tree: ast.Module) -> List[Violation]:
+    violations = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef) and not re.match(r"^_*[A-Z][A-Za-z0-9]*$", node.name):
+            violations.append(Violation(node.lineno, node.col_offset + 1, "N801",
+                                        f"class name '{node.name}' should use CapWords convention"))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name != node.name.lower() and not node.name.startswith("__"):
+                violations.append(Violation(node.lineno, node.col_offset + 1, "N802",
+                                            f"function name '{node.name}' should be lowercase"))
+            args = node.args.posonlyargs + node.args.args + node.args.kwonlyargs
+            for arg in args + [a for a in (node.args.vararg, node.args.kwarg) if a]:
+                if arg.arg != arg.arg.lower():
+                    violations.append(Violation(arg.lineno, arg.col_offset + 1, "N803",
+                                                f"argument name '{arg.arg}' should be lowercase"))
+    return violations
@@ -0,0 +1,174 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+from PIL import Image
+
+# Category contents hardly change within a day.
+CATALOG_TTL_SECONDS = 24 * 3600
+# Twice the 200px the grid shows, for high-density screens.
+THUMBNAIL_SIZE = (400, 600)
+
+
+def _write_atomically(path: str, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class CatalogCache:
+    """
+    On-disk TTL cache of the movie list of every category, with their thumbnails.
+
+    A background thread refreshes expired categories concurrently and downloads their thumbnails, so the
+    page reads movies and images from local files. Expired entries are still served until the refresh
+    has replaced them. A category is fetched by one refresh at a time; get_or_fetch waits for it.
+    """
+
+    def __init__(self, directory: str, fetch: Callable[[str], List[Dict]], categories: List[str],
+                 ttl_seconds: float = CATALOG_TTL_SECONDS, max_workers: int = 8):
+        self.directory = directory
+        self.fetch = fetch
+        self.categories = list(categories)
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max_workers
+        self.catalog_path = os.path.join(directory, "catalog.json")
+        self.thumbnail_dir = os.path.join(directory, "thumbnails")
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+        self._entries = self._load()  # category -> {"fetched_at": ts, "movies": [...]}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one writer at a time, so an older snapshot never lands last
+        self._in_flight: Dict[str, threading.Event] = {}  # category -> set when its fetch is done
+        self._session = requests.Session()
+        self._thread = None
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.catalog_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self._entries).encode("utf-8")
+            _write_atomically(self.catalog_path, data)
+
+    def thumbnail_path(self, url: str) -> str:
+        return os.path.join(self.thumbnail_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".jpg")
+
+    def get(self, category: str) -> Optional[List[Dict]]:
+        """The cached movies of a category, each with a local `thumbnail_path` once downloaded; None if never fetched."""
+        with self._lock:
+            entry = self._entries.get(category)
+        if entry is None:
+            return None
+        movies = []
+        for movie in entry["movies"]:
+            path = self.thumbnail_path(movie.get("thumbnail", ""))
+            movies.append(dict(movie, thumbnail_path=path) if os.path.exists(path) else movie)
+        return movies
+
+    def get_or_fetch(self, category: str, timeout: float = 60.0) -> List[Dict]:
+        """
+        The cached movies of a category. On a cold cache the category is fetched now, or, if a refresh is
+        already fetching it, that refresh is awaited instead of calling the API a second time.
+        Raises RuntimeError if the fetch fails.
+        """
+        movies = self.get(category)
+        if movies is not None:
+            return movies
+        error = self.refresh([category]).get(category)
+        if error is not None:
+            raise RuntimeError(f"Could not fetch {category}: {error}")
+        with self._lock:
+            in_flight = self._in_flight.get(category)
+        if in_flight is not None:
+            in_flight.wait(timeout)
+        movies = self.get(category)
+        if movies is None:
+            raise RuntimeError(f"Could not fetch {category}")
+        return movies
+
+    def is_stale(self, category: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(category)
+        return entry is None or time.time() - entry["fetched_at"] > self.ttl_seconds
+
+    def _download_thumbnail(self, url: str):
+        path = self.thumbnail_path(url)
+        if not url or os.path.exists(path):
+            return
+        response = self._session.get(url, timeout=10)
+        response.raise_for_status()
+        image = Image.open(io.BytesIO(response.content)).convert("RGB")
+        image.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=85, optimize=True)
+        _write_atomically(path, output.getvalue())
+
+    def refresh(self, categories: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Fetch the given (default: all stale) categories and their thumbnails concurrently; category -> error.
+        Categories another refresh is already fetching are skipped and left out of the result.
+        """
+        categories = [c for c in self.categories if self.is_stale(c)] if categories is None else categories
+        with self._lock:
+            categories = [c for c in categories if c not in self._in_flight]
+            for category in categories:
+                self._in_flight[category] = threading.Event()
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                fetched = dict(zip(categories, pool.map(self._fetch_safely, categories)))
+                urls = set()
+                for category, (movies, error) in fetched.items():
+                    errors[category] = error
+                    if error is None:
+                        with self._lock:
+                            self._entries[category] = {"fetched_at": time.time(), "movies": movies}
+                        urls.update(movie.get("thumbnail", "") for movie in movies)
+            finally:
+                # The movie lists are in place; thumbnails follow and fall back to remote URLs meanwhile.
+                with self._lock:
+                    for category in categories:
+                        self._in_flight.pop(category).set()
+            for future in [pool.submit(self._download_thumbnail, url) for url in urls]:
+                try:
+                    future.result()
+                except Exception:
+                    pass  # the grid falls back to the remote thumbnail URL
+        if any(error is None for error in errors.values()):
+            self._save()
+        return errors
+
+    def _fetch_safely(self, category: str):
+        try:
+            return self.fetch(category), None
+        except Exception as e:
+            return None, str(e)
+
+    def start(self, check_interval: float = 600.0):
+        """Refresh in a daemon thread now and whenever a category expires."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:  # keep refreshing; the next round may succeed
+                    print(f"Movie catalog: refresh failed: {e}")
+                time.sleep(min(check_interval, self.ttl_seconds))
+
+        self._thread = threading.Thread(target=run, name="movie-catalog-refresh", daemon=True)
+        self._thread.start()
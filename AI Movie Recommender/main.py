@@ -3,13 +3,40 @@ import json
 import serpapi
 from groq import Groq
 import os
+import sys
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.prompt_compaction import compact_records
+from llm_toolkit.router import is_degraded, wrap_client
+
+from catalog_cache import CatalogCache
+from preference_cache import PreferenceCache, analysis_key
+
 load_dotenv()
+
+
 # Initialize Groq client
-groq_client = Groq(
-    api_key=os.getenv("GROQ")
-)
+@st.cache_resource
+def get_groq_client():
+    """Built once per process (on first use, after set_page_config), so backend health survives reruns."""
+    return wrap_client(Groq(
+        api_key=os.getenv("GROQ")
+    ), app="ai_movie_recommender")
+
+
+CATEGORIES = {
+    "18": "Indian Cinema",
+    "1": "Action & Adventure",
+    "4": "Comedy",
+    "5": "Drama",
+    "10": "Romance"
+}
+MOVIE_CACHE_DIR = os.getenv("MOVIE_CACHE_DIR", ".movie_cache")
 
 
 def get_movie_recommendations(category):
@@ -32,8 +59,9 @@ def get_movie_recommendations(category):
 
 
 def get_enhanced_recommendations(movies, user_preferences):
+    """The analysis text, and whether it is only the router's offline fallback reply."""
     # Prepare movie descriptions for Groq
-    movie_descriptions = "\n".join([f"{m['title']}: {m['description']}" for m in movies])
+    movie_descriptions = compact_records(movies, "movies")
 
     # Get enhanced recommendations from Groq with user preferences
     prompt = f"""Given these movies and their descriptions:
@@ -49,7 +77,7 @@ def get_enhanced_recommendations(movies, user_preferences):
 
     Format your response in clear sections."""
 
-    chat_completion = groq_client.chat.completions.create(
+    chat_completion = get_groq_client().chat.completions.create(
         messages=[
             {
                 "role": "system",
@@ -65,20 +93,53 @@ def get_enhanced_recommendations(movies, user_preferences):
         max_completion_tokens=1024
     )
 
-    return chat_completion.choices[0].message.content
+    return chat_completion.choices[0].message.content, is_degraded(chat_completion)
+
+
+@st.cache_resource
+def get_catalog_cache():
+    """Process-wide catalog of every category, refreshed in the background."""
+    cache = CatalogCache(
+        MOVIE_CACHE_DIR,
+        get_movie_recommendations,
+        list(CATEGORIES),
+        ttl_seconds=float(os.getenv("MOVIE_CATALOG_TTL_HOURS", "24")) * 3600,
+    )
+    cache.start()
+    return cache
+
+
+def cached_movie_recommendations(category):
+    """Movies of a category from the catalog cache; fetched live only before its first refresh."""
+    return get_catalog_cache().get_or_fetch(category)
+
+
+@st.cache_resource
+def get_preference_cache():
+    """Process-wide analyses, keyed by canonical preferences plus the movie list they were made for."""
+    os.makedirs(MOVIE_CACHE_DIR, exist_ok=True)
+    return PreferenceCache(os.path.join(MOVIE_CACHE_DIR, "analyses.json"),
+                           max_items=int(os.getenv("MOVIE_ANALYSIS_CACHE_SIZE", "256")))
+
+
+def cached_enhanced_recommendations(movies, user_preferences):
+    """get_enhanced_recommendations, answered from the cache for a repeated preference combination."""
+    cache = get_preference_cache()
+    key = analysis_key(movies, user_preferences)
+    analysis = cache.get(key)
+    record_cache("ai_movie_recommender", "get_enhanced_recommendations", analysis is not None)
+    if analysis is None:
+        analysis, degraded = get_enhanced_recommendations(movies, user_preferences)
+        if not degraded:
+            cache.put(key, analysis)
+    return analysis
 
 
 def main():
     st.title("🎬 Smart Movie Recommendations")
 
     # Category selection
-    categories = {
-        "18": "Indian Cinema",
-        "1": "Action & Adventure",
-        "4": "Comedy",
-        "5": "Drama",
-        "10": "Romance"
-    }
+    categories = CATEGORIES
 
     # Sidebar for preferences
     st.sidebar.title("Your Preferences")
@@ -121,8 +182,8 @@ def main():
             return
 
         with st.spinner("Fetching movies..."):
-            # Get initial movies from SerpAPI
-            movies = get_movie_recommendations(selected_category)
+            # Get initial movies from the catalog cache (SerpAPI on a cold cache)
+            movies = cached_movie_recommendations(selected_category)
 
             # Display movies in a grid
             st.subheader("Top 10 Movies")
@@ -130,7 +191,7 @@ def main():
             for idx, movie in enumerate(movies):
                 col = cols[idx % 2]
                 with col:
-                    st.image(movie['thumbnail'], width=200)
+                    st.image(movie.get('thumbnail_path') or movie['thumbnail'], width=200)
                     st.markdown(f"**{movie['title']}**")
                     st.write(f"Rating: {movie['rating']} ⭐")
                     st.write(f"Price: {movie['price']}")
@@ -139,7 +200,7 @@ def main():
 
         # Get enhanced recommendations from Groq
         with st.spinner("Analyzing movies and personalizing recommendations..."):
-            analysis = get_enhanced_recommendations(movies, preference_options)
+            analysis = cached_enhanced_recommendations(movies, preference_options)
 
             st.subheader("🎯 Personalized Analysis")
             st.markdown(analysis)
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List
+
+from llm_toolkit.cache import LRUCache
+
+# The movie fields the analysis prompt is built from.
+FINGERPRINT_FIELDS = ("title", "rating", "price", "description")
+
+
+def _normalize(value):
+    return " ".join(str(value).split()).lower()
+
+
+def canonical_preferences(preferences: Dict) -> Dict:
+    """
+    Preferences with lists sorted and de-duplicated and strings normalized; empty choices are dropped,
+    so selection order, casing and untouched widgets do not produce distinct keys.
+    """
+    canonical = {}
+    for name, value in sorted(preferences.items()):
+        if isinstance(value, (list, tuple, set)):
+            value = sorted({_normalize(item) for item in value})
+        elif value is not None:
+            value = _normalize(value)
+        if value:
+            canonical[name] = value
+    return canonical
+
+
+def movies_fingerprint(movies: List[Dict]) -> str:
+    records = [[movie.get(field) for field in FINGERPRINT_FIELDS] for movie in movies]
+    return hashlib.sha256(json.dumps(records).encode("utf-8")).hexdigest()
+
+
+def analysis_key(movies: List[Dict], preferences: Dict) -> str:
+    payload = json.dumps([movies_fingerprint(movies), canonical_preferences(preferences)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PreferenceCache(LRUCache):
+    """LRU of analyses keyed by analysis_key, written to a JSON file after every new entry."""
+
+    def __init__(self, path: str, max_items: int = 256):
+        super().__init__(max_items)
+        self.path = path
+        self._save_lock = threading.Lock()  # one writer at a time, so an older snapshot never lands last
+        try:
+            with open(path, encoding="utf-8") as f:
+                for key, value in json.load(f):  # stored least recently used first
+                    super().put(key, value)
+        except (OSError, ValueError):
+            pass
+
+    def put(self, key: str, value: str):
+        super().put(key, value)
+        with self._save_lock:
+            data = json.dumps(self.items())
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
@@ -1,4 +1,5 @@
 import os
+import sys
 import streamlit as st
 import serpapi
 from groq import Groq
@@ -6,6 +7,13 @@ import json
 from dotenv import load_dotenv
 import pandas as pd
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.prompt_compaction import compact_records
+from llm_toolkit.router import wrap_client
+
 # Load environment variables
 load_dotenv()
 
@@ -43,7 +51,13 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # Initialize Groq client
-client = Groq(api_key=os.getenv("GROQ"))
+@st.cache_resource
+def get_client():
+    """Built once per process; a new router on every rerun would forget which backends are healthy"""
+    return wrap_client(Groq(api_key=os.getenv("GROQ")), app="ai_shopping_recommender")
+
+
+client = get_client()
 
 
 def search_products(query, location):
@@ -71,7 +85,8 @@ def analyze_products(products, preferences):
     if not products:
         return "No products found to analyze."
 
-    product_data = json.dumps(products[:5], indent=2)
+    # Only the fields the analysis needs; raw SerpAPI objects are mostly links and tracking IDs.
+    product_data = compact_records(products[:5], "products")
     prompt = f"""Given these products:
 {product_data}
 
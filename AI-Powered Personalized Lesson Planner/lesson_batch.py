@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List
+
+BATCH_FIELDS = ["subject", "grade_level", "duration", "learning_style", "objectives"]
+BATCH_DEFAULTS = {
+    "grade_level": "Middle School (6-8)",
+    "duration": "45 minutes",
+    "learning_style": ["Visual"],
+}
+
+
+def parse_learning_style(value) -> List[str]:
+    """Accept a list, or a string separated by ';', '|' or ','."""
+    if isinstance(value, list):
+        return [str(style).strip() for style in value if str(style).strip()]
+    for separator in (";", "|", ","):
+        if separator in str(value):
+            return [style.strip() for style in str(value).split(separator) if style.strip()]
+    return [str(value).strip()] if str(value).strip() else []
+
+
+def load_batch_requests(filename: str, data: bytes) -> List[Dict]:
+    """
+    Read a CSV (with a header row) or a JSON list of lesson requests.
+    Rows without a subject or objectives are rejected with a ValueError naming the row.
+    """
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        rows = json.loads(text)
+        if isinstance(rows, dict):
+            rows = rows.get("lessons", [])
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+
+    requests = []
+    for number, row in enumerate(rows, start=1):
+        row = {str(key).strip().lower(): value for key, value in row.items() if key}
+        request = {field: row.get(field) or BATCH_DEFAULTS.get(field) for field in BATCH_FIELDS}
+        if not request["subject"] or not request["objectives"]:
+            raise ValueError(f"Row {number}: 'subject' and 'objectives' are required")
+        request["learning_style"] = parse_learning_style(request["learning_style"]) or BATCH_DEFAULTS["learning_style"]
+        requests.append(request)
+    return requests
+
+
+def run_batch(requests: List[Dict], generate: Callable[..., Dict], max_workers: int = 4) -> Iterator[Dict]:
+    """
+    Generate plans concurrently, at most `max_workers` requests in flight.
+    Yields one result record per request, in completion order, as soon as it finishes.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(generate, **request): (index, request) for index, request in enumerate(requests)}
+        for future in as_completed(futures):
+            index, request = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"plan": None, "attempts": 0, "error": str(e)}
+            yield {
+                "index": index,
+                "request": request,
+                "status": "ok" if result["plan"] else "failed",
+                "attempts": result["attempts"],
+                "error": result["error"],
+                "plan": result["plan"],
+            }
@@ -0,0 +1,145 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+# complete_json(prompt, max_tokens) -> parsed JSON object, or None if the reply was not JSON
+CompleteJson = Callable[[str, int], Optional[Dict]]
+# on_part(kind, index, value): kind is "outline", "section", "resources", "differentiation" or "failed"
+OnPart = Callable[[str, Optional[int], object], None]
+
+
+def _context(subject: str, grade_level: str, duration: str, learning_style: List[str], objectives: str) -> str:
+    return (f"Subject: {subject}\nGrade level: {grade_level}\nTotal duration: {duration}\n"
+            f"Learning styles: {', '.join(learning_style)}\nObjectives: {objectives}")
+
+
+def outline_prompt(context: str) -> str:
+    return f"""{context}
+
+Create a short lesson outline as JSON:
+{{"sections": [{{"title": "Introduction", "duration": "10 minutes"}}, ...]}}
+
+Requirements:
+1. 3-5 sections whose durations add up to the total duration
+2. Titles only, no activities yet
+
+Return only the JSON object."""
+
+
+def section_prompt(context: str, section: Dict, outline: List[Dict]) -> str:
+    titles = ", ".join(s["title"] for s in outline)
+    return f"""{context}
+Lesson outline: {titles}
+
+Write the "{section['title']}" section ({section['duration']}) as JSON:
+{{"title": "{section['title']}", "duration": "{section['duration']}", "activities": ["...", "..."]}}
+
+Include 3-5 specific activities appropriate for the grade level. Return only the JSON object."""
+
+
+def resources_prompt(context: str) -> str:
+    return f"""{context}
+
+List the resources needed for this lesson as JSON:
+{{"resources": ["...", "..."]}}
+
+Include at least 5 relevant resources. Return only the JSON object."""
+
+
+def differentiation_prompt(context: str) -> str:
+    return f"""{context}
+
+Provide detailed differentiation strategies as JSON:
+{{"differentiation": {{"visual_learners": "...", "auditory_learners": "...", "kinesthetic_learners": "..."}}}}
+
+Return only the JSON object."""
+
+
+def valid_outline(value) -> bool:
+    sections = value.get("sections") if isinstance(value, dict) else None
+    return (isinstance(sections, list) and len(sections) >= 3
+            and all(isinstance(s, dict) and s.get("title") and s.get("duration") for s in sections))
+
+
+def valid_section(value) -> bool:
+    return (isinstance(value, dict) and isinstance(value.get("activities"), list)
+            and len(value["activities"]) >= 1)
+
+
+def valid_resources(value) -> bool:
+    return isinstance(value, dict) and isinstance(value.get("resources"), list) and len(value["resources"]) >= 3
+
+
+def valid_differentiation(value) -> bool:
+    return isinstance(value, dict) and isinstance(value.get("differentiation"), dict) and value["differentiation"]
+
+
+def _generate_part(complete_json: CompleteJson, prompt: str, max_tokens: int, is_valid, max_attempts: int):
+    """Retry one part of the plan until it is valid; other parts are unaffected."""
+    error = None
+    for _ in range(max_attempts):
+        try:
+            value = complete_json(prompt, max_tokens)
+        except Exception as e:
+            error = str(e)
+            continue
+        if value is not None and is_valid(value):
+            return value
+        error = "invalid or unparseable response: " + json.dumps(value)[:200]
+    raise ValueError(error)
+
+
+def generate_plan_by_sections(subject: str, grade_level: str, duration: str, learning_style: List[str],
+                              objectives: str, complete_json: CompleteJson, on_part: OnPart,
+                              max_workers: int = 6, max_attempts: int = 3) -> Optional[Dict]:
+    """
+    Build a lesson plan from a short outline plus concurrent per-part requests.
+
+    on_part is called from the calling thread as each part arrives, so it may update the UI.
+    Returns the assembled plan, or None if the outline or any part still failed after retries.
+    """
+    context = _context(subject, grade_level, duration, learning_style, objectives)
+    try:
+        outline = _generate_part(complete_json, outline_prompt(context), 300, valid_outline, max_attempts)["sections"]
+    except ValueError as e:
+        on_part("failed", None, f"Outline: {e}")
+        return None
+    on_part("outline", None, outline)
+
+    plan = {
+        "subject": subject,
+        "grade_level": grade_level,
+        "duration": duration,
+        "learning_style": learning_style,
+        "objectives": objectives,
+        "sections": [None] * len(outline),
+        "resources": None,
+        "differentiation": None,
+    }
+    jobs = {("section", i): (section_prompt(context, section, outline), 600, valid_section)
+            for i, section in enumerate(outline)}
+    jobs[("resources", None)] = (resources_prompt(context), 300, valid_resources)
+    jobs[("differentiation", None)] = (differentiation_prompt(context), 400, valid_differentiation)
+
+    complete = True
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_generate_part, complete_json, prompt, max_tokens, is_valid, max_attempts): key
+                   for key, (prompt, max_tokens, is_valid) in jobs.items()}
+        for future in as_completed(futures):
+            kind, index = futures[future]
+            try:
+                value = future.result()
+            except ValueError as e:
+                complete = False
+                on_part("failed", index, f"{kind.title()}: {e}")
+                continue
+            if kind == "section":
+                # Keep the outline's title and timing even if the model renamed the section.
+                value = {**value, "title": outline[index]["title"], "duration": outline[index]["duration"]}
+                plan["sections"][index] = value
+            else:
+                value = value[kind]
+                plan[kind] = value
+            on_part(kind, index, value)
+
+    return plan if complete else None
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    plan_hash TEXT PRIMARY KEY,
+    input_key TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    grade_level TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    learning_style TEXT NOT NULL,
+    objectives TEXT NOT NULL,
+    plan_json TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plans_input_key ON plans (input_key, created_at);
+CREATE INDEX IF NOT EXISTS plans_subject_grade ON plans (subject, grade_level);
+CREATE INDEX IF NOT EXISTS plans_created_at ON plans (created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS plans_fts USING fts5 (
+    subject, grade_level, objectives, content='plans', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS plans_fts_insert AFTER INSERT ON plans BEGIN
+    INSERT INTO plans_fts (rowid, subject, grade_level, objectives)
+    VALUES (new.rowid, new.subject, new.grade_level, new.objectives);
+END;
+CREATE TRIGGER IF NOT EXISTS plans_fts_delete AFTER DELETE ON plans BEGIN
+    INSERT INTO plans_fts (plans_fts, rowid, subject, grade_level, objectives)
+    VALUES ('delete', old.rowid, old.subject, old.grade_level, old.objectives);
+END;
+"""
+
+
+def plan_hash(plan: Dict) -> str:
+    """Content hash of a plan; identical plans share one row."""
+    return hashlib.sha256(json.dumps(plan, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def input_key(subject: str, grade_level: str, duration: str, learning_style: List[str], objectives: str) -> str:
+    """Hash of the normalized generation inputs (case, spacing and style order do not matter)."""
+    normalize = lambda text: " ".join(str(text).lower().split())  # noqa: E731
+    parts = [normalize(subject), normalize(grade_level), normalize(duration),
+             ",".join(sorted(normalize(style) for style in learning_style)), normalize(objectives)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 prefix query: every word must match."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+
+class LessonPlanStore:
+    """SQLite library of generated lesson plans with full-text search over subject, grade and objectives."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+
+    def save(self, plan: Dict, inputs: Optional[Dict] = None) -> str:
+        """
+        Store a plan under the inputs it was generated from (default: the ones it records).
+        Storing the same plan twice is a no-op.
+        """
+        inputs = inputs or plan
+        key = input_key(inputs["subject"], inputs["grade_level"], inputs["duration"],
+                        inputs.get("learning_style", []), inputs.get("objectives", ""))
+        digest = plan_hash(plan)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO plans (plan_hash, input_key, subject, grade_level, duration, "
+                "learning_style, objectives, plan_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, key, plan["subject"], plan["grade_level"], plan["duration"],
+                 json.dumps(plan.get("learning_style", [])), plan.get("objectives", ""),
+                 json.dumps(plan), datetime.now().isoformat(timespec="seconds"))
+            )
+        return digest
+
+    def get(self, digest: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT plan_json FROM plans WHERE plan_hash = ?", (digest,)).fetchone()
+        return json.loads(row["plan_json"]) if row else None
+
+    def find_by_inputs(self, subject: str, grade_level: str, duration: str,
+                       learning_style: List[str], objectives: str) -> Optional[Dict]:
+        """The newest stored plan generated from the same inputs, if any."""
+        key = input_key(subject, grade_level, duration, learning_style, objectives)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT plan_json FROM plans WHERE input_key = ? ORDER BY created_at DESC LIMIT 1", (key,)
+            ).fetchone()
+        return json.loads(row["plan_json"]) if row else None
+
+    def search(self, query: str = "", limit: int = 10, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        One page of plan summaries, newest first, plus the total number of matches.
+        An empty query lists every plan.
+        """
+        match = fts_query(query)
+        if match:
+            where = "WHERE plans.rowid IN (SELECT rowid FROM plans_fts WHERE plans_fts MATCH ?)"
+            params = [match]
+        else:
+            where, params = "", []
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM plans {where}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT plan_hash, subject, grade_level, duration, created_at FROM plans {where} "
+                "ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?", params + [limit, offset]
+            ).fetchall()
+        return [dict(row) for row in rows], total
@@ -3,9 +3,23 @@ import json
 from datetime import datetime, timedelta
 import groq
 import os
-from typing import List, Dict
+import sys
+import tempfile
+from typing import Callable, List, Dict, Optional
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.prompt_templates import PromptTemplate
+from llm_toolkit.router import wrap_client
+from llm_toolkit.streaming_json import JSONStreamError, iter_json_stream, stream_text
+
+from lesson_batch import load_batch_requests, run_batch
+from lesson_sections import generate_plan_by_sections
+from lesson_store import LessonPlanStore
+
 load_dotenv()
 
 # Setup page configuration
@@ -27,9 +41,9 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+PLANS_PER_PAGE = 10
+
 # Initialize session state variables
-if 'lesson_plans' not in st.session_state:
-    st.session_state.lesson_plans = []
 if 'current_plan' not in st.session_state:
     st.session_state.current_plan = None
 if 'debug_mode' not in st.session_state:
@@ -41,88 +55,145 @@ if not groq_api_key:
     st.error("Please set the GROQ API key in your .env file as GROQ=your-api-key")
     st.stop()
 
-client = groq.Client(api_key=groq_api_key)
 
 
-def generate_lesson_plan_prompt(subject: str, grade_level: str, duration: str,
-                                learning_style: List[str], objectives: str) -> str:
-    """Generate a prompt for the Groq API"""
-    example_plan = {
-        "subject": subject,
-        "grade_level": grade_level,
-        "duration": duration,
-        "learning_style": learning_style,
-        "objectives": objectives,
-        "sections": [
-            {
-                "title": "Introduction",
-                "duration": "10 minutes",
-                "activities": [
-                    "Hook activity related to real-world applications",
-                    "Review of prerequisites",
-                    "Setting lesson objectives"
-                ]
-            },
-            {
-                "title": "Main Content",
-                "duration": "20 minutes",
-                "activities": [
-                    "Direct instruction with visual aids",
-                    "Guided practice with examples",
-                    "Interactive demonstration"
-                ]
-            },
-            {
-                "title": "Practice",
-                "duration": "15 minutes",
-                "activities": [
-                    "Individual problem-solving",
-                    "Group work activities",
-                    "Hands-on application"
-                ]
-            },
-            {
-                "title": "Assessment & Closure",
-                "duration": "15 minutes",
-                "activities": [
-                    "Exit ticket assessment",
-                    "Summary discussion",
-                    "Preview of next lesson"
-                ]
-            }
-        ],
-        "resources": [
-            "Digital presentation",
-            "Worksheets",
-            "Manipulatives",
-            "Assessment materials",
-            "Reference guides"
-        ],
-        "differentiation": {
-            "visual_learners": "Use diagrams and visual aids",
-            "auditory_learners": "Include discussions and verbal explanations",
-            "kinesthetic_learners": "Incorporate hands-on activities"
+@st.cache_resource
+def get_client():
+    """One routed client per process, so backend health and latency survive reruns"""
+    return wrap_client(groq.Client(api_key=groq_api_key), app="lesson_planner")
+
+
+client = get_client()
+
+
+@st.cache_resource
+def get_plan_store() -> LessonPlanStore:
+    """One SQLite library of generated plans, shared by every session"""
+    return LessonPlanStore(os.getenv("LESSON_DB_PATH", "lesson_plans.db"))
+
+
+plan_store = get_plan_store()
+
+# Shape the streamed plan must keep; generation is stopped as soon as it diverges.
+LESSON_PLAN_SCHEMA = {
+    "subject": str,
+    "grade_level": str,
+    "duration": str,
+    "sections": [{"title": str, "duration": str, "activities": [str]}],
+    "resources": [str],
+    "differentiation": dict,
+}
+
+
+# Compiled once: the example JSON and the fixed requirements are sent byte-identical on every
+# request, ahead of the lesson details, so the backend can reuse its cached prefix. The example's
+# header fields are placeholders; the plan's header is filled in from the request (see lesson_header).
+EXAMPLE_PLAN = {
+    "subject": "<subject>",
+    "grade_level": "<grade level>",
+    "duration": "<duration>",
+    "learning_style": ["<learning style>"],
+    "objectives": "<objectives>",
+    "sections": [
+        {
+            "title": "Introduction",
+            "duration": "10 minutes",
+            "activities": [
+                "Hook activity related to real-world applications",
+                "Review of prerequisites",
+                "Setting lesson objectives"
+            ]
+        },
+        {
+            "title": "Main Content",
+            "duration": "20 minutes",
+            "activities": [
+                "Direct instruction with visual aids",
+                "Guided practice with examples",
+                "Interactive demonstration"
+            ]
+        },
+        {
+            "title": "Practice",
+            "duration": "15 minutes",
+            "activities": [
+                "Individual problem-solving",
+                "Group work activities",
+                "Hands-on application"
+            ]
+        },
+        {
+            "title": "Assessment & Closure",
+            "duration": "15 minutes",
+            "activities": [
+                "Exit ticket assessment",
+                "Summary discussion",
+                "Preview of next lesson"
+            ]
         }
+    ],
+    "resources": [
+        "Digital presentation",
+        "Worksheets",
+        "Manipulatives",
+        "Assessment materials",
+        "Reference guides"
+    ],
+    "differentiation": {
+        "visual_learners": "Use diagrams and visual aids",
+        "auditory_learners": "Include discussions and verbal explanations",
+        "kinesthetic_learners": "Incorporate hands-on activities"
     }
+}
 
-    return f"""Create a detailed lesson plan using this exact JSON structure:
+LESSON_PLAN_TEMPLATE = PromptTemplate(
+    "lesson_plan",
+    app="lesson_planner",
+    prefix=f"""Create a detailed lesson plan using this exact JSON structure:
 
-{json.dumps(example_plan, indent=2)}
+{json.dumps(EXAMPLE_PLAN, indent=2)}
 
 Requirements:
 1. Follow the exact JSON structure shown above
 2. Each section should have 3-5 specific activities
 3. Include at least 5 relevant resources
 4. Provide detailed differentiation strategies
-5. Ensure all content is appropriate for {grade_level} level
-6. Focus on meeting these objectives: {objectives}
-7. Incorporate these learning styles: {', '.join(learning_style)}
+""",
+    suffix="""5. Plan a {duration} lesson on {subject}
+6. Ensure all content is appropriate for {grade_level} level
+7. Focus on meeting these objectives: {objectives}
+8. Incorporate these learning styles: {learning_style}
 
 Return only the JSON object, no additional text or explanations."""
+)
 
 
-def extract_json_from_response(text: str) -> Dict:
-    """Extract and validate JSON from the response text"""
+def lesson_header(subject: str, grade_level: str, duration: str,
+                  learning_style: List[str], objectives: str) -> Dict:
+    """The plan's header fields, which always echo the request"""
+    return {
+        "subject": subject,
+        "grade_level": grade_level,
+        "duration": duration,
+        "learning_style": learning_style,
+        "objectives": objectives
+    }
+
+
+def generate_lesson_plan_prompt(subject: str, grade_level: str, duration: str,
+                                learning_style: List[str], objectives: str) -> str:
+    """Generate a prompt for the Groq API"""
+    return LESSON_PLAN_TEMPLATE.render(
+        subject=subject,
+        grade_level=grade_level,
+        duration=duration,
+        learning_style=", ".join(learning_style),
+        objectives=objectives
+    )
+
+
+def parse_json_response(text: str) -> Optional[Dict]:
+    """Parse JSON from the response text, or None if there is no valid object in it"""
     try:
         # First try direct JSON parsing
         return json.loads(text)
@@ -135,9 +206,17 @@ def extract_json_from_response(text: str) -> Dict:
                 json_str = text[start_idx:end_idx]
                 return json.loads(json_str)
         except Exception:
-            st.error("Failed to parse response as JSON. Raw response:")
-            st.code(text)
             return None
+    return None
+
+
+def extract_json_from_response(text: str) -> Dict:
+    """Extract and validate JSON from the response text"""
+    plan = parse_json_response(text)
+    if plan is None:
+        st.error("Failed to parse response as JSON. Raw response:")
+        st.code(text)
+    return plan
 
 
 def validate_lesson_plan(plan: Dict) -> bool:
@@ -155,45 +234,239 @@ def validate_lesson_plan(plan: Dict) -> bool:
     return True
 
 
-def generate_lesson_plan(subject: str, grade_level: str, duration: str,
-                         learning_style: List[str], objectives: str) -> Dict:
-    """Generate a lesson plan using Groq API"""
+def lesson_plan_messages(prompt: str) -> List[Dict]:
+    return [
+        {"role": "system",
+         "content": "You are an expert educator who creates lesson plans. Always respond with valid JSON only, no additional text."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def stream_lesson_plan(prompt: str, received: List[str],
+                       on_event: Optional[Callable] = None) -> Optional[Dict]:
+    """
+    Stream a lesson plan from Groq and parse it while it arrives.
+    on_event(path, value) is called for each finished part, e.g. ("sections", 0).
+    Raises JSONStreamError, and stops the generation, as soon as the reply leaves LESSON_PLAN_SCHEMA.
+    Every text chunk is appended to `received`.
+    """
+    completion = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=lesson_plan_messages(prompt),
+        temperature=0.5,
+        max_tokens=4000,
+        top_p=1,
+        stream=True
+    )
+
+    def chunks():
+        try:
+            for text in stream_text(completion):
+                received.append(text)
+                yield text
+        finally:
+            completion.close()
+
+    for path, value in iter_json_stream(chunks(), LESSON_PLAN_SCHEMA):
+        if not path:
+            return value
+        if on_event:
+            on_event(path, value)
+    return None
+
+
+def request_lesson_plan(subject: str, grade_level: str, duration: str,
+                        learning_style: List[str], objectives: str, max_attempts: int = 1,
+                        on_event: Optional[Callable] = None) -> Dict:
+    """
+    Call Groq until a valid lesson plan comes back or max_attempts is reached.
+    Does not touch the Streamlit UI, so it is safe to run from worker threads.
+    Returns {"plan", "attempts", "error", "raw"}.
+    """
     prompt = generate_lesson_plan_prompt(
         subject, grade_level, duration, learning_style, objectives
     )
+    result = {"plan": None, "attempts": 0, "error": None, "raw": None}
 
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system",
-                 "content": "You are an expert educator who creates lesson plans. Always respond with valid JSON only, no additional text."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=4000,
-            top_p=1,
-            stream=False
-        )
-
-        response_text = completion.choices[0].message.content
+    for attempt in range(1, max_attempts + 1):
+        result["attempts"] = attempt
+        received = []
+        try:
+            lesson_plan = stream_lesson_plan(prompt, received, on_event)
+            result["raw"] = "".join(received)
+        except JSONStreamError as e:
+            result["raw"] = "".join(received)
+            result["error"] = f"Stopped a malformed lesson plan early: {str(e)}"
+            continue
+        except Exception as e:
+            result["error"] = f"Error generating lesson plan: {str(e)}"
+            continue
+
+        if isinstance(lesson_plan, dict):
+            lesson_plan.update(lesson_header(subject, grade_level, duration, learning_style, objectives))
+        if lesson_plan is None:
+            result["error"] = "Failed to parse response as JSON"
+        elif not validate_lesson_plan(lesson_plan):
+            result["error"] = "Generated lesson plan is invalid or missing required fields"
+        else:
+            result["plan"] = lesson_plan
+            result["error"] = None
+            break
 
-        if st.session_state.debug_mode:
-            st.subheader("Debug: Raw API Response")
-            st.code(response_text)
+    return result
 
-        lesson_plan = extract_json_from_response(response_text)
 
-        if lesson_plan and validate_lesson_plan(lesson_plan):
-            return lesson_plan
+def generate_lesson_plan(subject: str, grade_level: str, duration: str,
+                         learning_style: List[str], objectives: str) -> Dict:
+    """Generate a lesson plan using Groq API, showing each section as soon as it is complete"""
+    live_area = st.empty()
+    streamed = {"sections": []}
+
+    def on_event(path, value):
+        if path[0] == "sections" and len(path) == 2:
+            streamed["sections"] = streamed["sections"][:path[1]] + [value]
+        elif path in (("resources",), ("differentiation",)):
+            streamed[path[0]] = value
         else:
-            st.error("Generated lesson plan is invalid or missing required fields")
-            return None
+            return
+        with live_area.container():
+            st.subheader("📝 Lesson Structure")
+            for section in streamed["sections"]:
+                st.write(f"✅ **{section['title']}** ({section.get('duration', '')}) - "
+                         f"{len(section['activities'])} activities")
+            if "resources" in streamed:
+                st.write(f"✅ **Resources** - {len(streamed['resources'])} items")
+            if "differentiation" in streamed:
+                st.write("✅ **Differentiation Strategies**")
+
+    result = request_lesson_plan(subject, grade_level, duration, learning_style, objectives,
+                                 on_event=on_event)
+    live_area.empty()
+
+    if result["raw"] is None:
+        st.error(result["error"])
+        return None
+
+    if st.session_state.debug_mode:
+        st.subheader("Debug: Raw API Response")
+        st.code(result["raw"])
 
-    except Exception as e:
-        st.error(f"Error generating lesson plan: {str(e)}")
+    if result["plan"]:
+        return result["plan"]
+
+    if result["error"] == "Failed to parse response as JSON":
+        extract_json_from_response(result["raw"])  # shows the raw response
+    else:
+        st.error(result["error"])
+    return None
+
+
+def generate_lesson_plans_in_bulk(batch_file, max_concurrency: int) -> Optional[str]:
+    """Generate every plan in an uploaded CSV/JSON file, streaming results into a JSONL file"""
+    try:
+        lesson_requests = load_batch_requests(batch_file.name, batch_file.getvalue())
+    except (ValueError, UnicodeDecodeError) as e:
+        st.error(f"Could not read the batch file: {str(e)}")
+        return None
+    if not lesson_requests:
+        st.warning("The batch file does not contain any lessons.")
         return None
 
+    output_path = os.path.join(
+        os.getenv("LESSON_BATCH_DIR", tempfile.gettempdir()),
+        f"lesson_plans_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    )
+    progress = st.progress(0.0)
+    status = st.empty()
+    finished, failed = 0, 0
+
+    def generate_with_retry(**lesson_request):
+        # Invalid or unparseable plans are regenerated up to twice.
+        return request_lesson_plan(**lesson_request, max_attempts=3)
+
+    with open(output_path, "w", encoding="utf-8") as output:
+        for record in run_batch(lesson_requests, generate_with_retry, max_workers=max_concurrency):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            finished += 1
+            if record["status"] != "ok":
+                failed += 1
+            else:
+                plan_store.save(record["plan"], record["request"])
+            progress.progress(finished / len(lesson_requests))
+            status.write(f"{finished}/{len(lesson_requests)} done ({failed} failed) - "
+                         f"last: {record['request']['subject']}, {record['request']['grade_level']}")
+
+    if failed:
+        st.warning(f"{failed} lesson plan(s) could not be generated; see the 'error' field in the file.")
+    else:
+        st.success(f"Generated {finished} lesson plans.")
+    return output_path
+
+
+def complete_json(prompt: str, max_tokens: int) -> Optional[Dict]:
+    """One small JSON request for a single part of a lesson plan"""
+    completion = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=lesson_plan_messages(prompt),
+        temperature=0.5,
+        max_tokens=max_tokens,
+        top_p=1,
+        stream=False
+    )
+    return parse_json_response(completion.choices[0].message.content)
+
+
+def generate_lesson_plan_by_sections(subject: str, grade_level: str, duration: str,
+                                     learning_style: List[str], objectives: str) -> Dict:
+    """Generate an outline, then all parts concurrently, rendering each part as it arrives"""
+    live_area = st.empty()
+    with live_area.container():
+        st.subheader("📝 Lesson Structure")
+        outline_box = st.empty()
+        col1, col2 = st.columns(2)
+        resources_box = col1.empty()
+        differentiation_box = col2.empty()
+    outline_box.info("Drafting the lesson outline...")
+    section_boxes = []
+
+    def on_part(kind, index, value):
+        # Called on the script thread as each part completes.
+        if kind == "outline":
+            with outline_box.container():
+                section_boxes.extend(st.empty() for _ in value)
+            for section, box in zip(value, section_boxes):
+                box.info(f"⏳ {section['title']} ({section['duration']})")
+            resources_box.info("⏳ Resources")
+            differentiation_box.info("⏳ Differentiation Strategies")
+        elif kind == "section":
+            with section_boxes[index].container():
+                with st.expander(f"{value['title']} ({value['duration']})", expanded=True):
+                    for activity in value["activities"]:
+                        st.write(f"- {activity}")
+        elif kind == "resources":
+            with resources_box.container():
+                st.subheader("📚 Resources")
+                for resource in value:
+                    st.write(f"- {resource}")
+        elif kind == "differentiation":
+            with differentiation_box.container():
+                st.subheader("🔄 Differentiation Strategies")
+                for learner_type, strategy in value.items():
+                    st.write(f"- **{learner_type}:** {strategy}")
+        elif kind == "failed":
+            st.error(f"Could not generate part of the lesson plan. {value}")
+
+    lesson_plan = generate_plan_by_sections(
+        subject, grade_level, duration, learning_style, objectives,
+        complete_json=complete_json, on_part=on_part
+    )
+    if lesson_plan and validate_lesson_plan(lesson_plan):
+        # The full plan is rendered below like any other plan.
+        live_area.empty()
+        return lesson_plan
+    return None
+
 
 # Sidebar for input parameters
 st.sidebar.title("Lesson Parameters")
@@ -211,23 +484,62 @@ learning_style = st.sidebar.multiselect("Learning Styles",
                                         default=["Visual"])
 objectives = st.sidebar.text_area("Learning Objectives",
                                   placeholder="Enter the main objectives for this lesson...")
+generation_mode = st.sidebar.radio("Generation Mode",
+                                   ["Complete plan", "Section by section"],
+                                   help="Section by section drafts an outline first, then writes every "
+                                        "section in parallel and shows each one as soon as it is ready.")
+reuse_saved = st.sidebar.checkbox("Reuse saved plans", value=True,
+                                  help="Load the stored plan instead of calling Groq when the inputs match one.")
 
 # Main content area
 st.title("📚 AI-Powered Lesson Planner")
 st.caption("Powered by Groq AI")
 
+# Bulk generation for a whole term of lessons
+with st.expander("📦 Bulk Generation"):
+    st.write("Upload a CSV or JSON list with the columns: "
+             "subject, grade_level, duration, learning_style (separated by ';'), objectives.")
+    batch_file = st.file_uploader("Lesson requests", type=["csv", "json"])
+    max_concurrency = st.slider("Concurrent requests", min_value=1, max_value=10, value=4)
+    if st.button("Generate All Lesson Plans", disabled=batch_file is None):
+        with st.spinner("Generating lesson plans..."):
+            st.session_state.batch_output = generate_lesson_plans_in_bulk(batch_file, max_concurrency)
+
+    if st.session_state.get("batch_output"):
+        with open(st.session_state.batch_output, "r", encoding="utf-8") as f:
+            st.download_button(
+                label="Download JSONL",
+                data=f.read(),
+                file_name=os.path.basename(st.session_state.batch_output),
+                mime="application/jsonl"
+            )
+
 if st.sidebar.button("Generate Lesson Plan"):
     if not subject or not objectives:
         st.error("Please fill in both Subject and Learning Objectives fields.")
     else:
-        with st.spinner("Generating your personalized lesson plan using Groq AI..."):
-            lesson_plan = generate_lesson_plan(
-                subject, grade_level, duration, learning_style, objectives
-            )
-            if lesson_plan:
-                st.session_state.current_plan = lesson_plan
-                if lesson_plan not in st.session_state.lesson_plans:
-                    st.session_state.lesson_plans.append(lesson_plan)
+        saved_plan = plan_store.find_by_inputs(
+            subject, grade_level, duration, learning_style, objectives
+        ) if reuse_saved else None
+        if saved_plan:
+            st.info("Loaded the saved plan for these inputs. Untick 'Reuse saved plans' to generate a new one.")
+            st.session_state.current_plan = saved_plan
+        else:
+            with st.spinner("Generating your personalized lesson plan using Groq AI..."):
+                if generation_mode == "Section by section":
+                    lesson_plan = generate_lesson_plan_by_sections(
+                        subject, grade_level, duration, learning_style, objectives
+                    )
+                else:
+                    lesson_plan = generate_lesson_plan(
+                        subject, grade_level, duration, learning_style, objectives
+                    )
+                if lesson_plan:
+                    st.session_state.current_plan = lesson_plan
+                    plan_store.save(lesson_plan, {
+                        "subject": subject, "grade_level": grade_level, "duration": duration,
+                        "learning_style": learning_style, "objectives": objectives
+                    })
 
 # Display current lesson plan
 if st.session_state.current_plan:
@@ -277,9 +589,16 @@ if st.session_state.current_plan:
             mime="application/json"
         )
 
-# History of generated plans
-if st.session_state.lesson_plans:
-    st.sidebar.subheader("Previously Generated Plans")
-    for i, plan in enumerate(st.session_state.lesson_plans):
-        if st.sidebar.button(f"Plan {i + 1}: {plan['subject']}", key=f"history_{i}"):
-            st.session_state.current_plan = plan
\ No newline at end of file
+# Library of generated plans
+st.sidebar.subheader("Saved Plans")
+search_query = st.sidebar.text_input("Search plans", placeholder="e.g., fractions middle school")
+saved_plans, total_plans = plan_store.search(search_query, limit=PLANS_PER_PAGE, offset=0)
+if total_plans > PLANS_PER_PAGE:
+    page = st.sidebar.number_input("Page", min_value=1, max_value=-(-total_plans // PLANS_PER_PAGE), value=1)
+    saved_plans, _ = plan_store.search(search_query, limit=PLANS_PER_PAGE, offset=(page - 1) * PLANS_PER_PAGE)
+st.sidebar.caption(f"{total_plans} plan(s)")
+for summary in saved_plans:
+    label = f"{summary['subject']} · {summary['grade_level']} · {summary['created_at'][:10]}"
+    if st.sidebar.button(label, key=f"history_{summary['plan_hash']}"):
+        st.session_state.current_plan = plan_store.get(summary["plan_hash"])
+        st.rerun()
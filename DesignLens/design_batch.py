@@ -0,0 +1,100 @@
+import io
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Tuple
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+MAX_SCREENS = 50
+PRIORITIES = [("high_priority", "🔴 High Priority"), ("medium_priority", "🟡 Medium Priority"),
+              ("low_priority", "🟢 Low Priority")]
+
+
+def load_screens(uploaded_files) -> List[Tuple[str, bytes]]:
+    """(name, bytes) for every uploaded image and every image inside uploaded ZIPs, in name order."""
+    screens = []
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(uploaded.getvalue())) as archive:
+                for info in archive.infolist():
+                    name = info.filename
+                    if info.is_dir() or "__MACOSX" in name or os.path.basename(name).startswith("."):
+                        continue
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        screens.append((name, archive.read(info)))
+        elif uploaded.name.lower().endswith(IMAGE_EXTENSIONS):
+            screens.append((uploaded.name, uploaded.getvalue()))
+    screens.sort(key=lambda screen: screen[0])
+    if len(screens) > MAX_SCREENS:
+        raise ValueError(f"{len(screens)} screens uploaded; the limit is {MAX_SCREENS} per audit")
+    return screens
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than `per_minute` start in any minute, across all threads."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def audit_screens(screens: List[Tuple[str, bytes]], analyze: Callable[[str, bytes, Callable], Dict],
+                  max_workers: int = 4, rate_limiter: RateLimiter = None) -> Iterator[Dict]:
+    """
+    Audit every screen concurrently and yield one result per screen as it finishes.
+
+    analyze(name, data, before_request) prepares the image, calls before_request() right before it
+    sends a vision request (not for cache hits), and returns the suggestions dict.
+    """
+    before_request = rate_limiter.acquire if rate_limiter else (lambda: None)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(analyze, name, data, before_request): (index, name)
+                   for index, (name, data) in enumerate(screens)}
+        for future in as_completed(futures):
+            index, name = futures[future]
+            try:
+                yield {"index": index, "name": name, "suggestions": future.result(), "error": None}
+            except Exception as e:
+                yield {"index": index, "name": name, "suggestions": None, "error": str(e)}
+
+
+def combine_report(results: List[Dict]) -> str:
+    """One Markdown report: findings grouped by priority across screens, then screen by screen."""
+    results = sorted(results, key=lambda result: result["index"])
+    audited = [r for r in results if r["suggestions"]]
+    lines = ["# UX Audit Report", "",
+             f"{len(audited)} of {len(results)} screens audited."]
+    for key, title in PRIORITIES:
+        count = sum(len(r["suggestions"].get(key, [])) for r in audited)
+        lines.append(f"- {title}: {count} findings")
+
+    for key, title in PRIORITIES:
+        lines += ["", f"## {title}"]
+        for result in audited:
+            for suggestion in result["suggestions"].get(key, []):
+                lines.append(f"- **{result['name']}**: {suggestion}")
+
+    lines += ["", "## Screens"]
+    for result in results:
+        lines += ["", f"### {result['index'] + 1}. {result['name']}"]
+        if result["error"]:
+            lines.append(f"Could not be audited: {result['error']}")
+            continue
+        for key, title in PRIORITIES:
+            for suggestion in result["suggestions"].get(key, []):
+                lines.append(f"- {title.split()[0]} {suggestion}")
+        rationale = result["suggestions"].get("rationale")
+        if rationale:
+            lines.append(f"\n*Rationale:* {rationale}")
+    return "\n".join(lines)
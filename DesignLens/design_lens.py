@@ -1,30 +1,54 @@
 import streamlit as st
 from groq import Groq
-import base64
-from typing import Optional
+from typing import Callable, Optional
 import json
 import os
+import sys
+import zipfile
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.cache import LRUCache
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.prompt_templates import PromptTemplate
+from llm_toolkit.router import wrap_client
+from llm_toolkit.streaming_json import JSONStreamError, iter_json_stream, stream_text
+
+from design_batch import PRIORITIES, RateLimiter, audit_screens, combine_report, load_screens
+from image_prep import PreparedImage, image_digest, prepare_image
+
 
 # Load environment variables from .env file
 load_dotenv()
-# Initialize Groq client
-client = Groq(
-    api_key = os.getenv("GROQ")
-)
 
 
-def encode_image(uploaded_file) -> str:
-    """Encode uploaded image to base64 string"""
-    return base64.b64encode(uploaded_file.getvalue()).decode('utf-8')
+# Initialize Groq client
+@st.cache_resource
+def get_client():
+    """One routed client per process, so backend health survives reruns"""
+    return wrap_client(Groq(
+        api_key = os.getenv("GROQ")
+    ), app="design_lens")
+
 
+client = get_client()
 
-def get_ux_suggestions(image_base64: Optional[str] = None, description: str = "", concerns: str = "") -> dict:
-    """Generate UX suggestions using Groq API"""
+# Expected reply shape; a stream that leaves it is stopped early.
+UX_SCHEMA = {
+    "high_priority": list,
+    "medium_priority": list,
+    "low_priority": list,
+    "rationale": None,
+}
 
-    # Construct the prompt
-    prompt = """You are a UX expert analyzing a user interface. Provide specific, actionable suggestions for improvement.
+# The UX-expert instructions never change, so they are compiled once and always sent first.
+UX_TEMPLATE = PromptTemplate(
+    "ux_suggestions",
+    app="design_lens",
+    system="""You are a UX expert analyzing a user interface. Provide specific, actionable suggestions for improvement.
     Focus on:
     - Layout and visual hierarchy
     - Call-to-action effectiveness
@@ -37,12 +61,52 @@ def get_ux_suggestions(image_base64: Optional[str] = None, description: str = ""
     - medium_priority: list of important but not urgent changes
     - low_priority: list of nice-to-have improvements
     - rationale: explanation for each suggestion
-    """
+    """,
+    suffix="Description: {description}"
+)
+
+PRIORITY_SECTIONS = PRIORITIES
+
+
+@st.cache_resource
+def get_image_cache() -> LRUCache:
+    """Prepared images by content hash, shared by every session"""
+    return LRUCache(128)
 
-    messages = [{"role": "system", "content": prompt}]
+
+@st.cache_resource
+def get_suggestion_cache() -> LRUCache:
+    """Suggestions by (image hash, description, concerns)"""
+    return LRUCache(512)
+
+
+image_cache = get_image_cache()
+suggestion_cache = get_suggestion_cache()
+
+
+def encode_image(uploaded_file) -> PreparedImage:
+    """Downscale and re-encode an uploaded image; the same screenshot is only prepared once"""
+    return prepare_screenshot(uploaded_file.getvalue())
+
+
+def prepare_screenshot(data: bytes) -> PreparedImage:
+    digest = image_digest(data)
+    prepared = image_cache.get(digest)
+    record_cache("design_lens", "encode_image", prepared is not None)
+    if prepared is None:
+        prepared = prepare_image(data, image_format=os.getenv("DESIGN_LENS_IMAGE_FORMAT", "JPEG"), digest=digest)
+        image_cache.put(digest, prepared)
+    return prepared
+
+
+def get_ux_suggestions(image_base64: Optional[str] = None, description: str = "", concerns: str = "",
+                       on_event: Optional[Callable] = None, image_mime: str = "image/jpeg") -> dict:
+    """Generate UX suggestions using Groq API; on_event(path, value) receives each finished list as it streams"""
+
+    messages = [{"role": "system", "content": UX_TEMPLATE.system}]
 
     # Add user input to the message
-    user_input = f"Description: {description}"
+    user_input = UX_TEMPLATE.render(description=description)
 
     if image_base64:
         messages.append({
@@ -52,7 +116,7 @@ def get_ux_suggestions(image_base64: Optional[str] = None, description: str = ""
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{image_base64}"
+                        "url": f"data:{image_mime};base64,{image_base64}"
                     }
                 }
             ]
@@ -68,13 +132,21 @@ def get_ux_suggestions(image_base64: Optional[str] = None, description: str = ""
         messages=messages,
         model="llama-3.2-11b-vision-preview",
         max_tokens=1000,
-        temperature=0.7
+        temperature=0.7,
+        stream=True
     )
 
     # Parse the response into structured format
     try:
-        suggestions = json.loads(response.choices[0].message.content)
-    except json.JSONDecodeError:
+        suggestions = None
+        for path, value in iter_json_stream(stream_text(response), UX_SCHEMA, emit_depth=1):
+            if not path:
+                suggestions = value
+            elif on_event:
+                on_event(path, value)
+        if suggestions is None:
+            raise JSONStreamError("stream ended without a JSON object")
+    except JSONStreamError:  # the stream diverged from UX_SCHEMA
         suggestions = {
             "high_priority": ["Error parsing AI response"],
             "medium_priority": [],
@@ -85,6 +157,86 @@ def get_ux_suggestions(image_base64: Optional[str] = None, description: str = ""
     return suggestions
 
 
+def cached_ux_suggestions(image: Optional[PreparedImage], description: str = "", concerns: str = "",
+                          on_event: Optional[Callable] = None, before_request: Optional[Callable] = None) -> dict:
+    """
+    get_ux_suggestions, skipped entirely when the same screenshot and inputs were analyzed before.
+    before_request() is called only when a request is actually sent (e.g. to rate-limit batches).
+    """
+    key = (image.digest if image else None, description, concerns)
+    suggestions = suggestion_cache.get(key)
+    record_cache("design_lens", "get_ux_suggestions", suggestions is not None)
+    if suggestions is not None:
+        return suggestions
+
+    if before_request:
+        before_request()
+    suggestions = get_ux_suggestions(
+        image_base64=image.base64 if image else None,
+        image_mime=image.mime if image else "image/jpeg",
+        description=description,
+        concerns=concerns,
+        on_event=on_event
+    )
+    if suggestions["high_priority"] != ["Error parsing AI response"]:
+        suggestion_cache.put(key, suggestions)
+    return suggestions
+
+
+def render_suggestions(box, title: str, suggestions: list):
+    with box.container():
+        st.subheader(title)
+        for suggestion in suggestions:
+            st.markdown(f"- {suggestion}")
+
+
+def batch_audit_page(concerns: str):
+    st.write("Upload the screens of a flow (or a ZIP of them) to audit them all at once.")
+    uploaded_files = st.file_uploader("Screens", type=["jpg", "jpeg", "png", "webp", "zip"],
+                                      accept_multiple_files=True)
+    max_workers = st.slider("Concurrent requests", min_value=1, max_value=8, value=4)
+
+    if not st.button("Audit All Screens", disabled=not uploaded_files):
+        return
+    try:
+        screens = load_screens(uploaded_files)
+    except (ValueError, zipfile.BadZipFile) as e:
+        st.error(f"Could not read the uploads: {str(e)}")
+        return
+    if not screens:
+        st.warning("No images found in the uploads.")
+        return
+
+    progress = st.progress(0.0)
+    rows = []
+    for name, _ in screens:
+        rows.append(st.empty())
+        rows[-1].write(f"⏳ {name}")
+
+    def analyze(name, data, before_request):
+        # Runs on worker threads: no Streamlit calls in here.
+        return cached_ux_suggestions(prepare_screenshot(data), description=name, concerns=concerns,
+                                     before_request=before_request)
+
+    rate_limiter = RateLimiter(int(os.getenv("DESIGN_LENS_REQUESTS_PER_MINUTE", "30")))
+    results = []
+    for result in audit_screens(screens, analyze, max_workers=max_workers, rate_limiter=rate_limiter):
+        results.append(result)
+        progress.progress(len(results) / len(screens), text=f"{len(results)}/{len(screens)} screens")
+        if result["error"]:
+            rows[result["index"]].write(f"❌ {result['name']}: {result['error']}")
+        else:
+            counts = ", ".join(f"{len(result['suggestions'].get(key, []))} {title.split()[1].lower()}"
+                               for key, title in PRIORITY_SECTIONS)
+            rows[result["index"]].write(f"✅ {result['name']} ({counts})")
+
+    report = combine_report(results)
+    st.markdown(report)
+    st.download_button("Download report (Markdown)", report, file_name="ux_audit.md", mime="text/markdown")
+    st.download_button("Download results (JSON)", json.dumps(sorted(results, key=lambda r: r["index"]), indent=2),
+                       file_name="ux_audit.json", mime="application/json")
+
+
 def main():
     st.title("AI UX Improvement Suggestions Generator")
 
@@ -92,46 +244,52 @@ def main():
     st.sidebar.header("Input Options")
     input_type = st.sidebar.radio(
         "Choose input type:",
-        ["Upload Screenshot", "Describe Interface"]
+        ["Upload Screenshot", "Describe Interface", "Batch Audit"]
     )
 
+    if input_type == "Batch Audit":
+        batch_audit_page(st.text_area("Specific concerns or issues (optional):", height=100))
+        return
+
     # Main content area
     if input_type == "Upload Screenshot":
-        uploaded_file = st.file_uploader("Upload a screenshot of your interface", type=["jpg", "png"])
-        image_base64 = encode_image(uploaded_file) if uploaded_file else None
+        uploaded_file = st.file_uploader("Upload a screenshot of your interface", type=["jpg", "jpeg", "png", "webp"])
+        try:
+            image = encode_image(uploaded_file) if uploaded_file else None
+        except OSError as e:  # PIL.UnidentifiedImageError, or a truncated file
+            st.error(f"Could not read the screenshot: {str(e)}")
+            return
+        if image:
+            st.caption(f"Sending {image.width}×{image.height} {image.mime} "
+                       f"({image.encoded_bytes // 1024} KB, uploaded {image.original_bytes // 1024} KB)")
     else:
         st.write("Describe your interface design:")
         description = st.text_area("", height=150)
-        image_base64 = None
+        image = None
 
     # Common inputs
     concerns = st.text_area("Specific concerns or issues (optional):", height=100)
 
     if st.button("Generate Suggestions"):
+        # Display suggestions; each priority list appears as soon as it has streamed in
+        st.header("UX Improvement Suggestions")
+        boxes = {key: st.empty() for key, _ in PRIORITY_SECTIONS}
+        titles = dict(PRIORITY_SECTIONS)
+
+        def on_event(path, value):
+            if path[0] in boxes and isinstance(value, list):
+                render_suggestions(boxes[path[0]], titles[path[0]], value)
+
         with st.spinner("Analyzing interface..."):
-            suggestions = get_ux_suggestions(
-                image_base64=image_base64,
+            suggestions = cached_ux_suggestions(
+                image,
                 description=description if input_type == "Describe Interface" else "",
-                concerns=concerns
+                concerns=concerns,
+                on_event=on_event
             )
 
-            # Display suggestions
-            st.header("UX Improvement Suggestions")
-
-            # High priority suggestions
-            st.subheader("🔴 High Priority")
-            for suggestion in suggestions["high_priority"]:
-                st.markdown(f"- {suggestion}")
-
-            # Medium priority suggestions
-            st.subheader("🟡 Medium Priority")
-            for suggestion in suggestions["medium_priority"]:
-                st.markdown(f"- {suggestion}")
-
-            # Low priority suggestions
-            st.subheader("🟢 Low Priority")
-            for suggestion in suggestions["low_priority"]:
-                st.markdown(f"- {suggestion}")
+            for key, title in PRIORITY_SECTIONS:
+                render_suggestions(boxes[key], title, suggestions[key])
 
             # Rationale
             st.subheader("💡 Rationale")
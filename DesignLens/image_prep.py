@@ -0,0 +1,67 @@
+import base64
+import hashlib
+import io
+from typing import NamedTuple, Optional
+
+from PIL import Image, ImageOps
+
+# Llama 3.2 Vision works on 560px tiles, at most 2x2 of them; more pixels only cost upload time.
+MAX_DIMENSION = 1120
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+
+
+class PreparedImage(NamedTuple):
+    digest: str  # sha256 of the original upload
+    base64: str
+    mime: str
+    width: int
+    height: int
+    original_bytes: int
+    encoded_bytes: int
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{self.base64}"
+
+
+def image_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def prepare_image(data: bytes, max_dimension: int = MAX_DIMENSION, image_format: str = "JPEG",
+                  digest: Optional[str] = None) -> PreparedImage:
+    """
+    Downscale a screenshot to the model's useful resolution and re-encode it as JPEG or WebP.
+    The original bytes are kept when they are already small enough and smaller than the re-encode.
+    """
+    digest = digest or image_digest(data)
+    image = Image.open(io.BytesIO(data))
+    original_mime = Image.MIME.get(image.format, "image/png")
+    image = ImageOps.exif_transpose(image)
+    needs_resize = max(image.size) > max_dimension
+
+    if image.mode in ("RGBA", "LA", "P"):
+        # JPEG has no alpha; flatten transparent UI screenshots onto white.
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    if needs_resize:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    output = io.BytesIO()
+    if image_format.upper() == "WEBP":
+        image.save(output, format="WEBP", quality=WEBP_QUALITY, method=4)
+        mime = "image/webp"
+    else:
+        image.save(output, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        mime = "image/jpeg"
+    encoded = output.getvalue()
+
+    if not needs_resize and len(data) <= len(encoded) and original_mime in ("image/jpeg", "image/png", "image/webp"):
+        encoded, mime = data, original_mime
+    return PreparedImage(digest, base64.b64encode(encoded).decode("utf-8"), mime,
+                         image.width, image.height, len(data), len(encoded))
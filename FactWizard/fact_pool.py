@@ -0,0 +1,184 @@
+# fact_pool.py
+import atexit
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+def fingerprint(fact: str) -> str:
+    """Hash of the fact's words, ignoring case, punctuation and emoji."""
+    words = re.findall(r"[a-z0-9]+", fact.lower())
+    return hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()
+
+
+class FactPool:
+    """
+    Pre-generated facts per topic, kept topped up to `target_depth` by a background thread.
+
+    Facts that were already served (or are already waiting in a pool) are never queued again.
+    `generate(topic, avoid)` is given the topic's most recent facts so it can ask for something new.
+    A topic whose attempts fail or come back as repeats is retried with exponential backoff, and after
+    `max_duplicates` repeats in a row it is paused for `duplicate_pause` seconds.
+    Pools and served fingerprints are saved to `path` (at most every `save_interval` seconds) so they
+    survive restarts.
+    """
+
+    def __init__(self, generate: Callable[[str, List[str]], str], topics: List[str], path: str,
+                 target_depth: int = 5, max_served: int = 5000, retry_delay: float = 0.5,
+                 max_retry_delay: float = 60.0, max_duplicates: int = 5, duplicate_pause: float = 600.0,
+                 avoid_count: int = 10, save_interval: float = 5.0):
+        self.generate = generate
+        self.topics = topics
+        self.path = path
+        self.target_depth = target_depth
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_duplicates = max_duplicates
+        self.duplicate_pause = duplicate_pause
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one writer at a time, so an older snapshot never lands last
+        self._wake = threading.Event()
+        self._pools: Dict[str, deque] = {topic: deque() for topic in topics}
+        self._served = deque(maxlen=max_served)
+        self._load()
+        self._seen = set(self._served) | {fingerprint(f) for pool in self._pools.values() for f in pool}
+        self._recent = {topic: deque(self._pools[topic], maxlen=avoid_count) for topic in topics}
+        self._failures = {topic: 0 for topic in topics}  # consecutive errors or repeats
+        self._duplicates = {topic: 0 for topic in topics}  # consecutive repeats
+        self._not_before = {topic: 0.0 for topic in topics}  # time.monotonic() of the next attempt
+        self._dirty = False
+        self._saved_at = 0.0
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="fact-pool", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+        return self
+
+    def take(self, topic: str) -> Optional[str]:
+        """Pop a pre-generated fact, or None if the topic's pool is empty."""
+        with self._lock:
+            pool = self._pools.get(topic)
+            fact = pool.popleft() if pool else None
+            if fact:
+                self._served.append(fingerprint(fact))
+                self._dirty = True
+        self._wake.set()
+        return fact
+
+    def mark_served(self, fact: str):
+        """Record a fact that was generated on the request path, so the pool never repeats it."""
+        digest = fingerprint(fact)
+        with self._lock:
+            self._seen.add(digest)
+            self._served.append(digest)
+            self._dirty = True
+        self._wake.set()
+
+    def depth(self, topic: str) -> int:
+        with self._lock:
+            return len(self._pools.get(topic, ()))
+
+    def flush(self):
+        """Write pending changes now instead of waiting for the next periodic save."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {"pools": {topic: list(pool) for topic, pool in self._pools.items()},
+                        "served": list(self._served)}
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            self._save(data)
+
+    def _add(self, topic: str, fact: str) -> bool:
+        digest = fingerprint(fact)
+        with self._lock:
+            if digest in self._seen:
+                return False
+            self._seen.add(digest)
+            self._pools[topic].append(fact)
+            self._recent[topic].append(fact)
+            self._dirty = True
+        return True
+
+    def _next_topic(self):
+        """The most depleted topic that may be attempted now, or (None, seconds until one may be)."""
+        now = time.monotonic()
+        with self._lock:
+            depleted = [t for t in self.topics if len(self._pools[t]) < self.target_depth]
+            ready = [t for t in depleted if self._not_before[t] <= now]
+            if ready:
+                return min(ready, key=lambda t: len(self._pools[t])), None
+            if depleted:
+                return None, min(self._not_before[t] for t in depleted) - now
+            return None, None
+
+    def _backoff(self, topic: str, duplicate: bool):
+        self._failures[topic] += 1
+        self._duplicates[topic] = self._duplicates[topic] + 1 if duplicate else 0
+        if self._duplicates[topic] >= self.max_duplicates:
+            print(f"Fact pool: {self._duplicates[topic]} repeated {topic} facts in a row; "
+                  f"pausing the topic for {self.duplicate_pause:.0f}s")
+            self._duplicates[topic] = 0
+            delay = self.duplicate_pause
+        else:
+            delay = min(self.max_retry_delay, self.retry_delay * 2 ** (self._failures[topic] - 1))
+        self._not_before[topic] = time.monotonic() + delay
+
+    def _run(self):
+        while True:
+            if self._dirty and time.monotonic() - self._saved_at >= self.save_interval:
+                self.flush()
+            topic, wait = self._next_topic()
+            if topic is None:
+                if self._dirty:
+                    save_in = self.save_interval - (time.monotonic() - self._saved_at)
+                    wait = save_in if wait is None else min(wait, save_in)
+                self._wake.wait(None if wait is None else max(wait, 0.0))
+                self._wake.clear()
+                continue
+            with self._lock:
+                avoid = list(self._recent[topic])
+            try:
+                fact = self.generate(topic, avoid)
+            except Exception as e:
+                print(f"Fact pool: could not generate a {topic} fact: {e}")
+                self._backoff(topic, duplicate=False)
+                continue
+            if fact and self._add(topic, fact):
+                self._failures[topic] = self._duplicates[topic] = 0
+            else:
+                # Empty or a repeat; back off before sampling this topic again.
+                self._backoff(topic, duplicate=bool(fact))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Fact pool: ignoring unreadable {self.path}: {e}")
+            return
+        for topic, facts in data.get("pools", {}).items():
+            if topic in self._pools:
+                self._pools[topic].extend(facts)
+        self._served.extend(data.get("served", []))
+
+    def _save(self, data: dict):
+        # Write to a unique temp file first so a crash never leaves half a file and concurrent writers never collide.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
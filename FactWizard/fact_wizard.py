@@ -2,47 +2,106 @@
 import streamlit as st
 from groq import Groq
 import os
-from typing import Optional
+import sys
+from typing import List, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.router import is_degraded, wrap_client
+
+from fact_pool import FactPool
+
 load_dotenv()
 
 
 # Initialize Groq client
-client = Groq(
-    api_key = os.getenv("GROQ")
-)
+@st.cache_resource
+def get_client():
+    """One routed client per process, shared by the page and the fact pool's background thread"""
+    return wrap_client(Groq(
+        api_key = os.getenv("GROQ")
+    ), app="fact_wizard")
 
 
+# Topics offered in the sidebar; each one has its own pool of pre-generated facts.
+TOPICS = ["Science", "History", "Animals", "Space", "Technology", "Random"]
 
-def generate_fun_fact(topic: Optional[str], is_random: bool) -> str:
-    """Generate a fun fact using Groq API"""
+
+def request_fun_fact(topic: Optional[str], is_random: bool, avoid: Sequence[str] = ()) -> Tuple[str, bool]:
+    """
+    Call Groq for one fun fact, different from the facts in `avoid`; raises on API errors and never
+    touches the UI. Returns the fact and whether it is only the router's offline fallback reply.
+    """
     if is_random:
         prompt = "Generate a random interesting fun fact about any topic. Make it engaging and surprising."
     else:
         prompt = f"Generate an interesting fun fact about {topic}. Make it engaging and surprising."
-
+    if avoid:
+        prompt += "\n\nIt must be about something different from each of these facts:\n" + \
+            "\n".join(f"- {fact}" for fact in avoid)
+
+    completion = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a fun fact generator. Provide concise, interesting, and accurate facts."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.7,
+        max_completion_tokens=100,
+        top_p=1,
+    )
+    return completion.choices[0].message.content.strip(), is_degraded(completion)
+
+
+def generate_fun_fact(topic: Optional[str], is_random: bool) -> Tuple[Optional[str], bool]:
+    """Generate a fun fact using Groq API"""
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a fun fact generator. Provide concise, interesting, and accurate facts."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_completion_tokens=100,
-            top_p=1,
-        )
-        return completion.choices[0].message.content.strip()
+        return request_fun_fact(topic, is_random)
     except Exception as e:
         st.error(f"Error generating fact: {str(e)}")
-        return None
+        return None, False
+
+
+def pool_fun_fact(topic: str, avoid: List[str]) -> str:
+    """A fact worth keeping for the pool; offline fallback replies count as a failed attempt"""
+    fact, degraded = request_fun_fact(None if topic == "Random" else topic, topic == "Random", avoid)
+    if degraded:
+        raise RuntimeError("the AI service is unavailable")
+    return fact
+
+
+@st.cache_resource
+def get_fact_pool() -> FactPool:
+    """Started once per process; keeps every topic's pool topped up in the background"""
+    return FactPool(
+        generate=pool_fun_fact,
+        topics=TOPICS,
+        path=os.getenv("FACT_POOL_PATH", "fact_pool.json"),
+        target_depth=int(os.getenv("FACT_POOL_DEPTH", "5"))
+    ).start()
+
+
+def serve_fun_fact(topic: str) -> str:
+    """A pre-generated fact when the pool has one, otherwise a fact generated on the spot"""
+    pool = get_fact_pool()
+    fact = pool.take(topic)
+    record_cache("fact_wizard", "generate_fun_fact", fact is not None)
+    if fact:
+        return fact
+    fact, degraded = generate_fun_fact(topic=None if topic == "Random" else topic, is_random=topic == "Random")
+    if fact and not degraded:
+        pool.mark_served(fact)
+    return fact
 
 
 # Set page config
@@ -52,6 +111,9 @@ st.set_page_config(
     layout="centered"
 )
 
+# After set_page_config, which must be the first st command; the pool thread only reads the global.
+client = get_client()
+
 # Main UI
 st.title("🧙‍♂️ FactWizard: Your AI Knowledge Explorer")
 st.write("Let the magic of AI reveal fascinating facts from across the universe!")
@@ -61,8 +123,7 @@ with st.sidebar:
     st.header("Customize Your Knowledge Spell")
 
     # Topic selection
-    topics = ["Science", "History", "Animals", "Space", "Technology", "Random"]
-    selected_topic = st.selectbox("Choose your realm of knowledge:", topics)
+    selected_topic = st.selectbox("Choose your realm of knowledge:", TOPICS)
 
     is_random = selected_topic == "Random"
 
@@ -72,10 +133,7 @@ with st.sidebar:
 # Main content area
 if generate_button:
     with st.spinner("🔮 The wizard is conjuring your fact..."):
-        fact = generate_fun_fact(
-            topic=None if is_random else selected_topic,
-            is_random=is_random
-        )
+        fact = serve_fun_fact(selected_topic)
 
         if fact:
             # Display the fun fact in a nice box
@@ -1,11 +1,18 @@
 from fastapi import FastAPI, HTTPException
 import os
+import sys
 import serpapi
 from dotenv import load_dotenv
 import google.generativeai as genai
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import instrument_model
+
 load_dotenv()
 
 app = FastAPI()
@@ -19,7 +26,7 @@ app.add_middleware(
     expose_headers=["*"],
 )
 genai.configure(api_key=os.getenv("GEMINIAPI_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
+model = instrument_model(genai.GenerativeModel("gemini-1.5-flash"), app="travel_app_planner")
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
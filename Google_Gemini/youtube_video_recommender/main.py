@@ -2,8 +2,15 @@ import streamlit as st
 import google.generativeai as genai
 import serpapi
 import os
+import sys
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import instrument_model
+
 # Set page configuration
 st.set_page_config(
     page_title="YouTube Search Assistant",
@@ -57,7 +64,7 @@ def extract_search_topic(prompt):
     """
     Use Gemini to extract the main topic from the user's prompt
     """
-    model = genai.GenerativeModel("gemini-1.5-flash")
+    model = instrument_model(genai.GenerativeModel("gemini-1.5-flash"), app="youtube_video_recommender")
     try:
         topic_extraction_prompt = f"Extract the main search topic from this prompt: '{prompt}'. " \
                                   "Return only the key topic or search query, without any additional text."
@@ -1,4 +1,5 @@
 import os
+import sys
 from typing import List, Dict
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, HTTPException
@@ -7,6 +8,12 @@ import google.generativeai as genai
 import serpapi
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import instrument_model
+
 # Load environment variables
 load_dotenv()
 
@@ -54,7 +61,7 @@ def extract_search_topic(prompt: str) -> str:
     Use Gemini to extract the main topic from the user's prompt
     """
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
+        model = instrument_model(genai.GenerativeModel("gemini-1.5-flash"), app="youtube_search_api")
 
         # Prompt to extract the core search topic
         topic_extraction_prompt = f"Extract the main search topic from this prompt: '{prompt}'. " \
@@ -1,16 +1,49 @@
 import streamlit as st
 from groq import Groq
 import os
+import sys
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.prompt_templates import PromptTemplate
+from llm_toolkit.router import wrap_client
+
 # Load environment variables from .env file
 load_dotenv()
-# Initialize Groq client
-client = Groq(api_key=os.getenv("GROQ"))
+
+
+@st.cache_resource
+def get_client():
+    """Built once per process, so the router's backend health survives reruns"""
+    return wrap_client(Groq(api_key=os.getenv("GROQ")), app="kitchen_alchemist")
+
+
+# Chef instructions come first and never change, so the backend can reuse the cached prefix;
+# only the ingredients and diet are filled in per request.
+RECIPE_TEMPLATE = PromptTemplate(
+    "recipe",
+    app="kitchen_alchemist",
+    system="""You are an expert chef and recipe creator. 
+                        Generate creative, practical recipes based on 
+                        user's ingredients and dietary needs. Provide 
+                        clear measurements and cooking instructions.""",
+    prefix="""Include a creative recipe title, list of ingredients with 
+                    measurements, and step-by-step instructions. Use only 
+                    the provided ingredients unless common pantry staples 
+                    (salt, pepper, oil). Format clearly with headings.
+""",
+    suffix="Create a detailed recipe using: {ingredients}. {diet_rule}"
+)
 
 # Streamlit app configuration
 st.set_page_config(page_title="AI Recipe Generator", page_icon="🍳")
 
+# Initialize Groq client (after set_page_config, which must be the first st command)
+client = get_client()
+
 # App header
 st.header("🍳 AI-Powered Recipe Generator")
 st.write("Enter ingredients you have, and get instant recipe suggestions!")
@@ -33,28 +66,13 @@ if submitted:
         st.warning("Please enter at least one ingredient!")
     else:
         # Construct the prompt
-        prompt = f"Create a detailed recipe using: {ingredients}. "
-        if diet != "None":
-            prompt += f"The recipe must be {diet}. "
-        prompt += """Include a creative recipe title, list of ingredients with 
-                    measurements, and step-by-step instructions. Use only 
-                    the provided ingredients unless common pantry staples 
-                    (salt, pepper, oil). Format clearly with headings."""
-
-        # System message to guide the AI
-        system_prompt = """You are an expert chef and recipe creator. 
-                        Generate creative, practical recipes based on 
-                        user's ingredients and dietary needs. Provide 
-                        clear measurements and cooking instructions."""
+        diet_rule = f"The recipe must be {diet}." if diet != "None" else ""
 
         # Create chat completion
         with st.spinner("🧑🍳 Generating recipe..."):
             try:
                 chat_completion = client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
+                    messages=RECIPE_TEMPLATE.messages(ingredients=ingredients, diet_rule=diet_rule),
                     model="llama3-70b-8192",
                     temperature=0.7,
                     max_tokens=1024,
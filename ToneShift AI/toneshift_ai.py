@@ -1,16 +1,52 @@
 import streamlit as st
 from groq import Groq
+import hashlib
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.cache import LRUCache
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.router import is_degraded, wrap_client
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize Groq API client
-client = Groq(api_key=os.getenv("GROQ"))
+MAX_CACHED_REWRITES = 512
+MAX_PARALLEL_REWRITES = 6
+
+
+class RewriteCache(LRUCache):
+    """LRU of rewritten emails keyed by a hash of (email, tone, length), shared by all sessions."""
+
+    @staticmethod
+    def key(email: str, tone: str, length: str) -> str:
+        return hashlib.sha256("\x1f".join((email.strip(), tone, length)).encode("utf-8")).hexdigest()
+
+
+@st.cache_resource
+def get_client():
+    """The routed Groq client, built once per process so backend health survives reruns"""
+    return wrap_client(Groq(api_key=os.getenv("GROQ")), app="toneshift_ai")
+
+
+@st.cache_resource
+def get_rewrite_cache() -> RewriteCache:
+    return RewriteCache(MAX_CACHED_REWRITES)
+
 
 # ---- Custom Styling ----
 st.set_page_config(page_title="AI Email Rewriter", page_icon="📧", layout="centered")
+
+# Fetched on the main thread (after set_page_config, which must be the first st command) so that
+# compare_tones' worker threads never call into st.
+client = get_client()
+rewrite_cache = get_rewrite_cache()
 st.markdown("""
     <style>
         .stTextArea textarea { font-size: 16px; }
@@ -59,28 +95,75 @@ length_options = {
 }
 length = st.radio("", list(length_options.keys()), horizontal=True)
 
+
+def rewrite_email(email: str, tone: str, length: str) -> str:
+    """Rewrite one email in one tone and length; repeated variants come from the cache"""
+    key = rewrite_cache.key(email, tone, length)
+    cached = rewrite_cache.get(key)
+    record_cache("toneshift_ai", "rewrite_email", cached is not None)
+    if cached is not None:
+        return cached
+
+    # Prepare AI prompt
+    prompt = f"{tone_options[tone]} {length_options[length]}\n\n{email}"
+
+    # Call Groq API for email rewriting
+    chat_completion = client.chat.completions.create(
+        messages=[
+            {"role": "system", "content": "You are an advanced AI assistant that rewrites emails."},
+            {"role": "user", "content": prompt}
+        ],
+        model="llama-3.3-70b-versatile",
+        temperature=0.7,
+        max_completion_tokens=512
+    )
+    rewritten_email = chat_completion.choices[0].message.content
+    if not is_degraded(chat_completion):
+        rewrite_cache.put(key, rewritten_email)
+    return rewritten_email
+
+
+def compare_tones(email: str, tones: list, lengths: list):
+    """Rewrite every (tone, length) pair concurrently, showing each variant as soon as it finishes"""
+    variants = [(t, l) for t in tones for l in lengths]
+    columns = st.columns(2)
+    boxes = {}
+    for i, (variant_tone, variant_length) in enumerate(variants):
+        with columns[i % 2]:
+            st.markdown(f"**{variant_tone} · {variant_length}**")
+            boxes[(variant_tone, variant_length)] = st.empty()
+            boxes[(variant_tone, variant_length)].info("⏳ Rewriting...")
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REWRITES) as pool:
+        futures = {pool.submit(rewrite_email, email, t, l): (t, l) for t, l in variants}
+        for future in as_completed(futures):
+            try:
+                boxes[futures[future]].code(future.result(), language="plaintext")
+            except Exception as e:
+                boxes[futures[future]].error(f"Error rewriting email: {str(e)}")
+
+
+# ---- Compare Tones ----
+with st.expander("🆚 Compare tones"):
+    compare_tone_choices = st.multiselect("Tones", list(tone_options.keys()), default=["Professional", "Friendly"])
+    compare_length_choices = st.multiselect("Lengths", list(length_options.keys()), default=["Default"])
+    if st.button("Compare Rewrites", use_container_width=True):
+        if not email_text.strip():
+            st.warning("⚠️ Please enter an email before rewriting.")
+        elif not compare_tone_choices or not compare_length_choices:
+            st.warning("⚠️ Pick at least one tone and one length.")
+        else:
+            compare_tones(email_text, compare_tone_choices, compare_length_choices)
+
 # ---- Process Email Button ----
 if st.button("🔄 Rewrite Email", use_container_width=True):
     if not email_text.strip():
         st.warning("⚠️ Please enter an email before rewriting.")
     else:
         with st.spinner("✨ Rewriting your email..."):
-            # Prepare AI prompt
-            prompt = f"{tone_options[tone]} {length_options[length]}\n\n{email_text}"
-
-            # Call Groq API for email rewriting
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are an advanced AI assistant that rewrites emails."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.7,
-                max_completion_tokens=512
-            )
+            rewritten_email = rewrite_email(email_text, tone, length)
 
             # Display the rewritten email
-            rewritten_email = chat_completion.choices[0].message.content
             st.subheader("📬 Rewritten Email:")
             rewritten_box = st.text_area("Here's your improved email:", rewritten_email, height=200)
 
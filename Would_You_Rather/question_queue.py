@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+
+
+# Words every question shares; they would make any two questions look alike.
+STOPWORDS = frozenset(
+    "would you rather or a an the be to have of in on at and your for with able every never is it "
+    "that this than can could always only one".split()
+)
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(re.findall(r"[a-z0-9']+", text.lower())) - STOPWORDS
+
+
+def is_near_duplicate(a: frozenset, b: frozenset, threshold: float) -> bool:
+    """Jaccard similarity of the two questions' word sets."""
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= threshold
+
+
+def split_questions(text: str) -> List[str]:
+    """Split a batch reply on '---' lines and drop numbering, blanks and stray separators."""
+    questions = []
+    for block in re.split(r"^\s*-{3,}\s*$", text, flags=re.MULTILINE):
+        block = re.sub(r"^\s*\d+[.)]\s*", "", block.strip())
+        if block:
+            questions.append(block)
+    return questions
+
+
+class QuestionQueue:
+    """
+    Ready-made questions, refilled in batches by a background task.
+
+    When the backlog drops below `low_water`, the task asks for `batch_size` questions per upstream call
+    until it is back at `target`, so bursts of /question are answered from memory and Groq sees steady
+    batches instead of one call per user. Questions too similar to a queued or recently served one are
+    dropped. The backlog and recent questions are saved to `path` and reloaded on start.
+    """
+
+    def __init__(self, generate_batch: Callable[[int], Awaitable[List[str]]], path: str,
+                 target: int = 20, low_water: int = 8, batch_size: int = 5,
+                 similarity: float = 0.6, history: int = 500, retry_delay: float = 15.0):
+        self.generate_batch = generate_batch
+        self.path = path
+        self.target = target
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.similarity = similarity
+        self.retry_delay = retry_delay
+        self._backlog = deque()
+        self._recent = deque(maxlen=history)  # word sets of served questions
+        self._wake = asyncio.Event()
+        self._task = None
+        self._load()
+
+    def __len__(self):
+        return len(self._backlog)
+
+    def start(self):
+        """Start the refill task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refill_forever())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._save()
+
+    def get_nowait(self) -> Optional[str]:
+        """Pop a ready question, or None if the backlog is empty."""
+        question = self._backlog.popleft() if self._backlog else None
+        if question:
+            self._recent.append(_words(question))
+            self._save()
+        if len(self._backlog) < self.low_water:
+            self._wake.set()
+        return question
+
+    def add(self, question: str) -> bool:
+        """Queue a question unless it is a near-duplicate of a queued or recently served one."""
+        words = _words(question)
+        for other in list(self._recent) + [_words(q) for q in self._backlog]:
+            if is_near_duplicate(words, other, self.similarity):
+                return False
+        self._backlog.append(question)
+        return True
+
+    async def _refill_forever(self):
+        while True:
+            if len(self._backlog) >= self.low_water:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            while len(self._backlog) < self.target:
+                try:
+                    questions = await self.generate_batch(self.batch_size)
+                except Exception as e:
+                    print(f"Question queue: refill failed: {e}")
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                added = sum(self.add(question) for question in questions)
+                self._save()
+                if not added:
+                    # Only repeats came back; don't hammer the API for more of the same.
+                    await asyncio.sleep(self.retry_delay)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Question queue: ignoring unreadable {self.path}: {e}")
+            return
+        self._backlog.extend(data.get("backlog", []))
+        self._recent.extend(frozenset(words) for words in data.get("recent", []))
+
+    def _save(self):
+        data = {"backlog": list(self._backlog), "recent": [sorted(words) for words in self._recent]}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
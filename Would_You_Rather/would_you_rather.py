@@ -1,9 +1,22 @@
+import asyncio
 import os
+import sys
+from typing import List
 from dotenv import load_dotenv
 from groq import Groq
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.constants import ParseMode
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.router import is_degraded, wrap_client
+from llm_toolkit.telegram_webhook import application_builder, run_bot
+
+from question_queue import QuestionQueue, split_questions
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,7 +24,50 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 GROQ_API_KEY = os.getenv("GROQ")
 
 # Initialize the groq client
-client = Groq(api_key=GROQ_API_KEY)
+client = wrap_client(Groq(api_key=GROQ_API_KEY), app="would_you_rather")
+
+QUESTION_PROMPT = (
+    "Generate a fun and creative 'Would You Rather' question. "
+    "Include two clear options for the user to choose from. "
+    "Make it entertaining and suitable for a game or social media post."
+)
+
+
+def request_questions(count: int) -> List[str]:
+    """
+    Ask groq for several questions in one call, separated by '---' lines.
+    Raises instead of returning the router's offline fallback reply, which is not worth queueing.
+    """
+    completion = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=[{"role": "user", "content": (
+            f"{QUESTION_PROMPT}\n\nWrite {count} different questions on different themes. "
+            "Separate them with a line containing only ---. No introduction or numbering."
+        )}],
+        temperature=0.9,
+        max_completion_tokens=150 * count,
+        top_p=1,
+        stop=None,
+        stream=False,
+    )
+    if is_degraded(completion):
+        raise RuntimeError("the AI service is unavailable")
+    return split_questions(completion.choices[0].message.content)
+
+
+async def generate_question_batch(count: int) -> List[str]:
+    # The groq client is synchronous; keep the refill off the event loop.
+    return await asyncio.to_thread(request_questions, count)
+
+
+# Ready-made questions for /question, refilled in the background once the bot is running
+question_queue = QuestionQueue(
+    generate_question_batch,
+    path=os.getenv("QUESTION_QUEUE_PATH", "question_queue.json"),
+    target=int(os.getenv("QUESTION_QUEUE_TARGET", "20")),
+)
+# The queue, its file and its refill task are per process; the webhook server must not run this bot in several
+WEBHOOK_SINGLE_PROCESS = True
 
 # Create a custom reply keyboard with available commands
 command_keyboard = ReplyKeyboardMarkup(
@@ -39,18 +95,20 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def generate_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Generates a fun 'Would You Rather' question using groq API and sends it to the user.
+    Sends a question from the prefetch queue, or generates one using groq API if the queue is empty.
     """
-    groq_prompt = (
-        "Generate a fun and creative 'Would You Rather' question. "
-        "Include two clear options for the user to choose from. "
-        "Make it entertaining and suitable for a game or social media post."
-    )
+    question = question_queue.get_nowait()
+    record_cache("would_you_rather", "generate_question", question is not None)
+    if question:
+        await update.message.reply_text(question, parse_mode=ParseMode.HTML)
+        return
 
     try:
-        completion = client.chat.completions.create(
+        # The groq client is synchronous; don't block the event loop (and every other chat) on it.
+        completion = await asyncio.to_thread(
+            client.chat.completions.create,
             model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": groq_prompt}],
+            messages=[{"role": "user", "content": QUESTION_PROMPT}],
             temperature=0.8,
             max_completion_tokens=150,
             top_p=1,
@@ -90,7 +148,8 @@ async def analyze_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
 
     try:
-        completion = client.chat.completions.create(
+        completion = await asyncio.to_thread(
+            client.chat.completions.create,
             model="llama-3.3-70b-versatile",
             messages=[{"role": "user", "content": analysis_prompt}],
             temperature=0.7,
@@ -113,11 +172,24 @@ async def analyze_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await update.message.reply_text(analysis_result, parse_mode=ParseMode.HTML)
 
 
-def main() -> None:
+async def start_question_prefetch(application: Application) -> None:
+    question_queue.start()
+
+
+async def stop_question_prefetch(application: Application) -> None:
+    await question_queue.stop()
+
+
+def build_application(token=None) -> Application:
     """
-    Starts the Telegram bot.
+    Builds the Telegram bot application with its handlers.
     """
-    application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    application = (
+        application_builder(token or TELEGRAM_TOKEN)
+        .post_init(start_question_prefetch)
+        .post_shutdown(stop_question_prefetch)
+        .build()
+    )
 
     # Command handler for /start
     application.add_handler(CommandHandler("start", start))
@@ -125,9 +197,15 @@ def main() -> None:
     application.add_handler(CommandHandler("question", generate_question))
     # Command handler for /answer
     application.add_handler(CommandHandler("answer", analyze_answer))
+    return application
+
 
+def main() -> None:
+    """
+    Starts the Telegram bot: polling, or webhook mode when TELEGRAM_WEBHOOK_URL is set.
+    """
     print("Bot is running...")
-    application.run_polling()
+    run_bot(build_application, "would_you_rather", single_process=WEBHOOK_SINGLE_PROCESS)
 
 
 if __name__ == '__main__':
@@ -1,10 +1,26 @@
 import os
-import requests
+import sys
+import asyncio
+import contextlib
+import threading
+import weakref
+from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
 from groq import Groq
 from telegram import Update
 from telegram.constants import ParseMode
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, ContextTypes, filters
+from telegram.ext import Application, CommandHandler, MessageHandler, ContextTypes, filters
+
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.router import wrap_client
+from llm_toolkit.telegram_webhook import application_builder, run_bot
+
+from meal_mirror import CATALOG_LETTERS, MealMirror
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,25 +28,150 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 GROQ_API_KEY = os.getenv("GROQ")
 
 # Initialize Groq client
-client = Groq(api_key=GROQ_API_KEY)
+client = wrap_client(Groq(api_key=GROQ_API_KEY), app="ai_mealplanner")
 
 # Base URL for TheMealDB API
 MEALDB_BASE_URL = "https://www.themealdb.com/api/json/v1/1"
+MEALDB_TIMEOUT_SECONDS = 5.0
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# Local copy of the whole catalog, refreshed in the background while the bot runs
+meal_mirror = MealMirror(
+    os.getenv("MEALDB_MIRROR_PATH", "mealdb_mirror.json"),
+    max_age_seconds=float(os.getenv("MEALDB_SYNC_HOURS", "24")) * 3600,
+)
+meal_mirror.load()
+MIRROR_SYNC_CONCURRENCY = 4
+_mirror_task = None
+# The mirror file and its sync task are per process; the webhook server must not run this bot in several
+WEBHOOK_SINGLE_PROCESS = True
 
-def search_meal_by_name(meal_name: str) -> dict:
+# One pooled HTTP client per event loop: the bot runs a single loop, the benchmark one per call.
+_http_clients = weakref.WeakKeyDictionary()
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the keep-alive connection pool for TheMealDB on the running event loop.
     """
-    Searches for a meal by name using TheMealDB API.
+    loop = asyncio.get_running_loop()
+    http_client = _http_clients.get(loop)
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=MEALDB_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        _http_clients[loop] = http_client
+    return http_client
+
+async def close_http_client(application=None) -> None:
+    """
+    Closes the connection pool of the running event loop (used as the bot's post_shutdown hook).
+    """
+    http_client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if http_client is not None:
+        await http_client.aclose()
+
+async def search_meal_by_name(meal_name: str) -> Optional[dict]:
+    """
+    Searches for a meal by its exact name using TheMealDB API (used until the local mirror is synced).
     Returns the first meal's details as a dict if found, otherwise returns None.
     """
-    endpoint = f"{MEALDB_BASE_URL}/search.php?s={meal_name}"
-    response = requests.get(endpoint)
-    if response.status_code == 200:
+    try:
+        response = await get_http_client().get(f"{MEALDB_BASE_URL}/search.php", params={"s": meal_name})
+        if response.status_code != 200:
+            print(f"Failed to fetch meal data for {meal_name}. Status code: {response.status_code}")
+            return None
         data = response.json()
-        if data.get('meals'):
-            return data['meals'][0]  # Return the first meal found
-    print(f"Failed to fetch meal data for {meal_name}. Status code: {response.status_code}")
+    except (httpx.HTTPError, ValueError) as e:  # ValueError: the body is not JSON, e.g. an HTML error page
+        print(f"Failed to fetch meal data for {meal_name}: {e}")
+        return None
+    if isinstance(data, dict) and data.get('meals'):
+        return data['meals'][0]  # Return the first meal found
     return None
 
+async def fetch_meals_by_first_letter(letter: str, semaphore: asyncio.Semaphore) -> list:
+    """
+    Fetches every TheMealDB meal whose name starts with `letter`.
+    """
+    async with semaphore:
+        response = await get_http_client().get(f"{MEALDB_BASE_URL}/search.php", params={"f": letter})
+    response.raise_for_status()
+    return response.json().get("meals") or []
+
+async def sync_meal_mirror() -> None:
+    """
+    Downloads the full catalog and swaps it into the local mirror. A partial download is discarded.
+    """
+    semaphore = asyncio.Semaphore(MIRROR_SYNC_CONCURRENCY)
+    batches = await asyncio.gather(*(fetch_meals_by_first_letter(letter, semaphore) for letter in CATALOG_LETTERS))
+    meals = [meal for batch in batches for meal in batch]
+    if meals:
+        await asyncio.to_thread(meal_mirror.replace, meals)
+        print(f"Synced {len(meals)} meals from TheMealDB.")
+
+async def keep_meal_mirror_fresh() -> None:
+    """
+    Re-syncs the mirror whenever it is older than its maximum age.
+    """
+    while True:
+        if meal_mirror.is_stale():
+            try:
+                await sync_meal_mirror()
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"Failed to sync the TheMealDB mirror: {e}")
+        await asyncio.sleep(min(meal_mirror.max_age_seconds, 3600))
+
+async def start_mirror_sync(application) -> None:
+    global _mirror_task
+    _mirror_task = asyncio.create_task(keep_meal_mirror_fresh())
+
+async def shutdown(application) -> None:
+    if _mirror_task is not None:
+        _mirror_task.cancel()
+    await close_http_client(application)
+
+def _stream_custom_recipe(recipe_name: str, user_prompt: str, cancelled: threading.Event) -> Optional[str]:
+    """
+    Runs in a worker thread. Streams a full recipe from Groq and stops reading (which ends the
+    generation upstream) as soon as `cancelled` is set; returns None in that case.
+    """
+    recipe_generation_prompt = (
+        f"Generate a complete recipe for a dish called '{recipe_name}' based on the following details: {user_prompt}.\n\n"
+        "Include a list of ingredients, step-by-step instructions, and any serving suggestions. "
+        "Format the recipe clearly."
+    )
+    stream = client.chat.completions.create(
+        model=GROQ_MODEL,
+        messages=[{"role": "user", "content": recipe_generation_prompt}],
+        temperature=0.6,
+        max_completion_tokens=1024,
+        top_p=1,
+        stop=None,
+        stream=True,
+    )
+    parts = []
+    try:
+        for chunk in stream:
+            if cancelled.is_set():
+                return None
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+    return "".join(parts).strip()
+
+async def generate_custom_recipe(recipe_name: str, user_prompt: str) -> Optional[str]:
+    """
+    Generates a custom recipe with Groq. Cancelling the task also stops the worker thread's stream.
+    """
+    cancelled = threading.Event()
+    try:
+        return await asyncio.to_thread(_stream_custom_recipe, recipe_name, user_prompt, cancelled)
+    finally:
+        cancelled.set()
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Sends a welcome message and brief instructions.
@@ -38,7 +179,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     welcome_message = (
         "Welcome to the <b>Smart Meal Planner Bot</b>!\n\n"
         "Send me a message describing what ingredients you have and your dietary or weight goals, "
-        "and I'll suggest a recipe for you."
+        "and I'll suggest a recipe for you.\n\n"
+        "Or use /ingredients chicken, rice, broccoli to list recipes that use what you have."
     )
     await update.message.reply_text(welcome_message, parse_mode=ParseMode.HTML)
 
@@ -46,8 +188,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """
     Processes the user's message:
       1. Uses Groq to generate a recipe recommendation based on the description.
-      2. Uses TheMealDB API to get recipe details.
-      3. If not found, uses Groq to generate a custom recipe for the dish.
+      2. Looks the recipe up in the local TheMealDB mirror, or in TheMealDB API while a custom
+         recipe is generated speculatively.
+      3. Uses a custom recipe only if TheMealDB has no match; otherwise cancels its generation.
       4. Replies with the recipe information.
     """
     user_prompt = update.message.text.strip()
@@ -65,8 +208,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
 
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        completion = await asyncio.to_thread(
+            client.chat.completions.create,
+            model=GROQ_MODEL,
             messages=[{"role": "user", "content": groq_prompt}],
             temperature=0.6,
             max_completion_tokens=1024,
@@ -88,33 +232,37 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("Could not generate a recipe recommendation. Please try again.", parse_mode=ParseMode.HTML)
         return
 
+    # Step 2: Look the recipe up in TheMealDB. The local mirror answers at once and tolerates
+    # differently phrased names; over the network, a custom recipe is generated at the same time
+    # in case the lookup misses.
+    lookup, meal_details = None, None
+    if meal_mirror.ready:
+        meal_details = meal_mirror.index.find_by_name(recipe_name)
+    else:
+        lookup = asyncio.create_task(search_meal_by_name(recipe_name))
+    custom_recipe_task = None
+    if not meal_details:
+        custom_recipe_task = asyncio.create_task(generate_custom_recipe(recipe_name, user_prompt))
+
     # Inform the user which recipe name was recommended.
     await update.message.reply_text(
         f"Recommended recipe: <b>{recipe_name}</b>\n\nFetching details...",
         parse_mode=ParseMode.HTML
     )
 
-    # Step 2: Use TheMealDB API to fetch details about the recommended recipe.
-    meal_details = search_meal_by_name(recipe_name)
-    if not meal_details:
-        # Step 3: If no recipe details are found, ask Groq to generate a full recipe.
-
-        recipe_generation_prompt = (
-            f"Generate a complete recipe for a dish called '{recipe_name}' based on the following details: {user_prompt}.\n\n"
-            "Include a list of ingredients, step-by-step instructions, and any serving suggestions. "
-            "Format the recipe clearly."
-        )
+    if lookup is not None:
+        meal_details = await lookup
+    if meal_details:
+        # TheMealDB has the dish: the speculative generation is not needed.
+        if custom_recipe_task is not None:
+            custom_recipe_task.cancel()
+            # Retrieve its outcome: it may already have failed, and asyncio logs unretrieved exceptions.
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await custom_recipe_task
+    else:
+        # Step 3: If no recipe details are found, use the generated recipe.
         try:
-            custom_completion = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "user", "content": recipe_generation_prompt}],
-                temperature=0.6,
-                max_completion_tokens=1024,
-                top_p=1,
-                stop=None,
-                stream=False,
-            )
-            custom_recipe = custom_completion.choices[0].message.content.strip()
+            custom_recipe = await custom_recipe_task
             await update.message.reply_text(custom_recipe.replace("**", " ").replace("*", " "), parse_mode=ParseMode.HTML)
         except Exception as e:
             await update.message.reply_text(f"Error generating custom recipe: {e}", parse_mode=ParseMode.HTML)
@@ -132,19 +280,44 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Step 4: Send the recipe details back to the user.
     await update.message.reply_text(response_message, parse_mode=ParseMode.HTML, disable_web_page_preview=False)
 
-def main() -> None:
+async def ingredients(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /ingredients chicken, rice, broccoli: lists catalog meals that use the most of them, without the LLM.
+    """
+    wanted = [item.strip() for item in " ".join(context.args).split(",") if item.strip()]
+    if not wanted:
+        await update.message.reply_text("Usage: /ingredients chicken, rice, broccoli", parse_mode=ParseMode.HTML)
+        return
+    if not meal_mirror.ready:
+        await update.message.reply_text("The recipe catalog is still loading. Please try again in a minute.", parse_mode=ParseMode.HTML)
+        return
+    meals = meal_mirror.index.find_by_ingredients(wanted)
+    if not meals:
+        await update.message.reply_text("No recipes found with those ingredients.", parse_mode=ParseMode.HTML)
+        return
+    lines = [f"• <b>{meal['strMeal']}</b> ({meal.get('strCategory') or 'N/A'}, {meal.get('strArea') or 'N/A'})" for meal in meals]
+    await update.message.reply_text("Recipes with your ingredients:\n\n" + "\n".join(lines), parse_mode=ParseMode.HTML)
+
+def build_application(token=None) -> Application:
     """
-    Runs the Telegram bot.
+    Builds the Telegram bot application with its handlers.
     """
-    application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    application = application_builder(token or TELEGRAM_TOKEN).post_init(start_mirror_sync).post_shutdown(shutdown).build()
 
     # Command handler for /start
     application.add_handler(CommandHandler("start", start))
+    # Command handler for /ingredients
+    application.add_handler(CommandHandler("ingredients", ingredients))
     # Message handler for any text message
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    return application
 
+def main() -> None:
+    """
+    Runs the Telegram bot: polling, or webhook mode when TELEGRAM_WEBHOOK_URL is set.
+    """
     print("Bot is running...")
-    application.run_polling()
+    run_bot(build_application, "mealplanner", single_process=WEBHOOK_SINGLE_PROCESS)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Local copy of TheMealDB catalog with in-memory indexes.
+
+The catalog (a few hundred meals) is fetched letter by letter, kept in a JSON file and
+indexed by name trigrams and by ingredient words, so lookups need no network and tolerate
+dish names that are phrased a little differently from TheMealDB's.
+"""
+import json
+import os
+import re
+import string
+import tempfile
+import time
+import unicodedata
+from collections import Counter
+from typing import Iterable, List, Optional
+
+MAX_INGREDIENTS = 20  # TheMealDB's strIngredient1 .. strIngredient20
+MIN_NAME_SIMILARITY = 0.55
+# Letters the catalog is fetched by (search.php?f=<letter>).
+CATALOG_LETTERS = string.ascii_lowercase
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII words separated by single spaces."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("oes"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_words(text: str) -> set:
+    return {singular(word) for word in text.split()}
+
+
+def meal_ingredients(meal: dict) -> List[str]:
+    names = (meal.get(f"strIngredient{i}") for i in range(1, MAX_INGREDIENTS + 1))
+    return [normalize(name) for name in names if name and name.strip()]
+
+
+class MealIndex:
+    """Immutable lookup structures over one snapshot of the catalog."""
+
+    def __init__(self, meals: Iterable[dict]):
+        self.meals = {meal["idMeal"]: meal for meal in meals if meal.get("idMeal") and meal.get("strMeal")}
+        self.by_name = {}
+        self.name_trigrams = {}
+        self.name_words = {}
+        self.trigram_index = {}
+        self.ingredient_index = {}
+        for meal_id, meal in self.meals.items():
+            name = normalize(meal["strMeal"])
+            self.by_name[name] = meal_id
+            grams = trigrams(name)
+            self.name_trigrams[meal_id] = grams
+            self.name_words[meal_id] = name_words(name)
+            for gram in grams:
+                self.trigram_index.setdefault(gram, set()).add(meal_id)
+            for ingredient in meal_ingredients(meal):
+                for word in ingredient.split():
+                    self.ingredient_index.setdefault(singular(word), set()).add(meal_id)
+
+    def __len__(self):
+        return len(self.meals)
+
+    def find_by_name(self, name: str, min_similarity: float = MIN_NAME_SIMILARITY) -> Optional[dict]:
+        """
+        The meal whose name matches best, or None below min_similarity. Similarity is the larger of
+        the trigram and the word Jaccard index, so both "Spaghetti Carbonara" and "Chicken Teriyaki"
+        find "Spaghetti alla Carbonara" and "Teriyaki Chicken Casserole".
+        """
+        name = normalize(name)
+        if name in self.by_name:
+            return self.meals[self.by_name[name]]
+        grams, words = trigrams(name), name_words(name)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigram_index.get(gram, ()))
+        best_id, best_score = None, 0.0
+        for meal_id, count in shared.items():
+            meal_words = self.name_words[meal_id]
+            score = max(count / (len(grams) + len(self.name_trigrams[meal_id]) - count),
+                        len(words & meal_words) / len(words | meal_words))
+            if score > best_score:
+                best_id, best_score = meal_id, score
+        return self.meals[best_id] if best_score >= min_similarity else None
+
+    def find_by_ingredients(self, ingredients: List[str], limit: int = 5) -> List[dict]:
+        """Meals using the most of the given ingredients ("chicken" matches "chicken breast")."""
+        matches = Counter()
+        for ingredient in ingredients:
+            words = [singular(word) for word in normalize(ingredient).split()]
+            if not words:
+                continue
+            meal_ids = set.intersection(*(self.ingredient_index.get(word, set()) for word in words))
+            matches.update(meal_ids)
+        ranked = sorted(matches.items(),
+                        key=lambda item: (-item[1], len(meal_ingredients(self.meals[item[0]]))))
+        return [self.meals[meal_id] for meal_id, _ in ranked[:limit]]
+
+
+class MealMirror:
+    """The current MealIndex plus its on-disk copy; `replace` swaps in a freshly synced catalog."""
+
+    def __init__(self, path: str, max_age_seconds: float = 24 * 3600):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.index = MealIndex([])
+        self.synced_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return len(self.index) > 0
+
+    def is_stale(self) -> bool:
+        return time.time() - self.synced_at > self.max_age_seconds
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.index = MealIndex(data.get("meals", []))
+        self.synced_at = data.get("synced_at", 0.0)
+
+    def replace(self, meals: List[dict]) -> None:
+        self.index = MealIndex(meals)  # a single assignment, so readers never see a half-built index
+        self.synced_at = time.time()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"synced_at": self.synced_at, "meals": meals}, f)
+        os.replace(tmp_path, self.path)
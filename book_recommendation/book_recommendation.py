@@ -1,11 +1,24 @@
 import os
+import sys
+import re
+import asyncio
 import logging
+import weakref
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-import requests
+import httpx
 from groq import Groq
 from dotenv import load_dotenv
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.cache import LRUCache
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.router import wrap_client
+from llm_toolkit.telegram_webhook import application_builder, run_bot
+
 load_dotenv()
 
 # Configure logging
@@ -16,14 +29,75 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Initialize Groq client
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+groq_client = wrap_client(Groq(api_key=os.getenv("GROQ_API_KEY")), app="book_recommendation")
+
+
+OPENLIBRARY_SEARCH_URL = "https://openlibrary.org/search.json"
+# Only what the reply shows: five titles with their authors
+SEARCH_FIELDS = "title,author_name"
+SEARCH_LIMIT = 5
+SEARCH_TIMEOUT_SECONDS = 10.0
+
+
+# Search results of recent topics; popular topics are answered without calling OpenLibrary
+book_cache = LRUCache(1024, ttl_seconds=float(os.getenv("BOOK_CACHE_TTL_SECONDS", str(6 * 3600))))
+
+# One pooled HTTP client per event loop: the bot runs a single loop, the benchmark one per call.
+_http_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_client():
+    """Keep-alive connection pool for OpenLibrary on the running event loop"""
+    loop = asyncio.get_running_loop()
+    http_client = _http_clients.get(loop)
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=SEARCH_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        _http_clients[loop] = http_client
+    return http_client
+
+
+async def close_http_client(application=None):
+    """Close the connection pool (the bot's post_shutdown hook)"""
+    http_client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if http_client is not None:
+        await http_client.aclose()
+
 
+def normalize_query(query):
+    """Cache key for a topic: lowercase words without punctuation"""
+    return " ".join(re.sub(r"[^\w]+", " ", query.lower()).split())
 
-def search_books(query):
-    """Search for books using OpenLibrary API"""
-    url = f"http://openlibrary.org/search.json?q={query}"
-    response = requests.get(url)
-    return response.json() if response.status_code == 200 else None
+
+async def fetch_books(query):
+    """Search for books using OpenLibrary API, asking only for the fields and results we show"""
+    try:
+        response = await get_http_client().get(
+            OPENLIBRARY_SEARCH_URL,
+            params={"q": query, "fields": SEARCH_FIELDS, "limit": SEARCH_LIMIT},
+        )
+        if response.status_code != 200:
+            return None
+        data = response.json()
+    except (httpx.HTTPError, ValueError) as e:  # ValueError: the body is not JSON, e.g. an HTML error page
+        logger.warning("OpenLibrary search failed for %r: %s", query, e)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def search_books(query):
+    """Search for books, from the cache when the same topic was asked recently"""
+    key = normalize_query(query)
+    books = book_cache.get(key)
+    record_cache("book_recommendation", "search_books", books is not None)
+    if books is None:
+        books = await fetch_books(query)
+        if books and books.get('docs'):
+            book_cache.put(key, books)
+    return books
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -37,7 +111,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle user's book topic request"""
     user_input = update.message.text
-    books = search_books(user_input)
+    books = await search_books(user_input)
 
     if not books or not books.get('docs'):
         await update.message.reply_text("❌ No books found for this topic. Try another one!")
@@ -45,14 +119,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Get top 5 books with authors
     top_books = []
-    for book in books['docs'][:5]:
+    for book in books['docs'][:SEARCH_LIMIT]:
         title = book.get('title', 'Untitled')
         authors = ", ".join(book.get('author_name', ['Unknown Author']))
         top_books.append(f"• {title} by {authors}")
 
     # Generate AI-enhanced response using Groq
     try:
-        response = groq_client.chat.completions.create(
+        response = await asyncio.to_thread(
+            groq_client.chat.completions.create,
             messages=[
                 {"role": "system",
                  "content": "You are a knowledgeable librarian. Provide a brief, engaging description of these books."},
@@ -74,22 +149,24 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(full_response)
 
 
-def main():
-    """Start the bot"""
-    telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not telegram_token:
-        logger.error("Set TELEGRAM_BOT_TOKEN environment variable!")
-        return
-
-    app = Application.builder().token(telegram_token).build()
+def build_application(token=None):
+    """Create the bot application with its handlers"""
+    app = application_builder(token or os.getenv("TELEGRAM_BOT_TOKEN")).post_shutdown(close_http_client).build()
 
     # Register handlers
     app.add_handler(CommandHandler("start", start))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    return app
+
+
+def main():
+    """Start the bot (polling, or webhook mode when TELEGRAM_WEBHOOK_URL is set)"""
+    if not os.getenv("TELEGRAM_BOT_TOKEN"):
+        logger.error("Set TELEGRAM_BOT_TOKEN environment variable!")
+        return
 
-    # Start polling
-    app.run_polling()
     logger.info("Bot is running...")
+    run_bot(build_application, "books")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+# Telegram delivers an album as one update per photo, a few hundred milliseconds apart at most.
+ALBUM_WAIT_SECONDS = 1.0
+MAX_MESSAGE_LENGTH = 4096
+
+logger = logging.getLogger(__name__)
+
+
+class AlbumCollector:
+    """
+    Buffers the messages of each media group and hands them to `on_album(messages)` in one call,
+    once no new photo of that group has arrived for `wait` seconds. The update handler returns at
+    once, so the bot keeps taking updates while the album is being collected.
+    """
+
+    def __init__(self, on_album, wait: float = ALBUM_WAIT_SECONDS):
+        self.on_album = on_album
+        self.wait = wait
+        self._messages = {}  # media_group_id -> messages in arrival order
+        self._deadlines = {}
+        self._tasks = set()
+
+    def add(self, message):
+        group_id = message.media_group_id
+        loop = asyncio.get_running_loop()
+        self._deadlines[group_id] = loop.time() + self.wait
+        if group_id in self._messages:
+            self._messages[group_id].append(message)
+            return
+        self._messages[group_id] = [message]
+        task = loop.create_task(self._flush(group_id))
+        self._tasks.add(task)  # keep a reference until the task is done
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, group_id):
+        loop = asyncio.get_running_loop()
+        while True:
+            remaining = self._deadlines[group_id] - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        del self._deadlines[group_id]
+        messages = sorted(self._messages.pop(group_id), key=lambda message: message.message_id)
+        try:
+            await self.on_album(messages)
+        except Exception:
+            logger.exception("Failed to answer media group %s", group_id)
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH):
+    """Split a reply into Telegram-sized messages, preferring to cut between paragraphs."""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n\n", 0, limit)
+        cut = cut if cut > 0 else limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    parts.append(text)
+    return parts
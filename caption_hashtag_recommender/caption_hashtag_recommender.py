@@ -1,20 +1,39 @@
 import os
+import sys
+import asyncio
 import base64
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from groq import Groq
 
+try:
+    import llm_toolkit
+except ImportError:  # not installed: use the copy in this checkout, it only needs the standard library
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "llm_toolkit"))
+from llm_toolkit.metrics import record_cache
+from llm_toolkit.router import is_degraded, wrap_client
+from llm_toolkit.telegram_webhook import application_builder, run_bot
+
+from album import AlbumCollector, split_message
+from image_cache import PerceptualCache, dhash, downscale_for_vision, open_image, pick_photo_size
+
 load_dotenv()
 
 
 # Groq API setup
 GROQ_API_KEY = os.getenv("GROQ")
-client = Groq(api_key=GROQ_API_KEY)
+client = wrap_client(Groq(api_key=GROQ_API_KEY), app="caption_hashtag_recommender")
 
 # Telegram Bot Token
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
+# Captions of recently seen photos; re-sent or lightly edited photos are answered from here
+caption_cache = PerceptualCache(
+    max_items=int(os.getenv("CAPTION_CACHE_SIZE", "512")),
+    max_distance=int(os.getenv("CAPTION_CACHE_DISTANCE", "6")),
+)
+
 # Function to encode the image in base64
 def encode_image(image_bytes):
     return base64.b64encode(image_bytes).decode('utf-8')
@@ -31,13 +50,14 @@ async def generate_hashtags_from_text(text: str) -> str:
     hashtags = response.choices[0].message.content
     return hashtags
 
-# Function to generate caption and hashtags from an image
-async def generate_caption_and_hashtags_from_image(image_bytes: bytes) -> str:
+# Function to generate caption and hashtags from an image, plus whether it is an offline fallback reply
+async def generate_caption_and_hashtags_from_image(image_bytes: bytes):
     # Encode the image in base64
     base64_image = encode_image(image_bytes)
 
-    # Use Groq Vision API to analyze the image
-    response = client.chat.completions.create(
+    # Use Groq Vision API to analyze the image, off the event loop so album photos run in parallel
+    response = await asyncio.to_thread(
+        client.chat.completions.create,
         model="llama-3.2-11b-vision-preview",
         messages=[
             {
@@ -55,7 +75,7 @@ async def generate_caption_and_hashtags_from_image(image_bytes: bytes) -> str:
         ],
     )
     caption_and_hashtags = response.choices[0].message.content
-    return caption_and_hashtags
+    return caption_and_hashtags, is_degraded(response)
 
 # Telegram command handler for /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -67,28 +87,66 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     hashtags = await generate_hashtags_from_text(user_text)
     await update.message.reply_text(f"Generated Hashtags:\n{hashtags}")
 
-# Telegram message handler for images
-async def handle_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    # Get the image file from the user's message
-    photo = update.message.photo[-1]  # Get the highest resolution photo
+# Caption one photo (a message's list of PhotoSizes), from the cache when possible
+async def caption_photo(photo_sizes) -> str:
+    # A mid-sized copy is plenty for captioning
+    photo = pick_photo_size(photo_sizes)
     file = await photo.get_file()
     image_bytes = await file.download_as_bytearray()
 
-    # Generate caption and hashtags
-    caption_and_hashtags = await generate_caption_and_hashtags_from_image(image_bytes)
+    # Near-duplicates of a recent photo reuse its caption
+    image = await asyncio.to_thread(open_image, image_bytes)
+    image_hash = await asyncio.to_thread(dhash, image)
+    caption_and_hashtags = caption_cache.get(image_hash)
+    record_cache("caption_hashtag_recommender", "handle_image", caption_and_hashtags is not None)
+
+    if caption_and_hashtags is None:
+        # Generate caption and hashtags from a downscaled re-encode
+        vision_bytes = await asyncio.to_thread(downscale_for_vision, image)
+        caption_and_hashtags, degraded = await generate_caption_and_hashtags_from_image(vision_bytes)
+        if not degraded:
+            caption_cache.put(image_hash, caption_and_hashtags)
+    return caption_and_hashtags
+
+# Answer a whole album at once: every photo is downloaded and captioned concurrently
+async def reply_to_album(messages):
+    results = await asyncio.gather(*(caption_photo(message.photo) for message in messages),
+                                   return_exceptions=True)
+    sections = []
+    for number, result in enumerate(results, start=1):
+        if isinstance(result, Exception):
+            result = f"Sorry, I couldn't process this photo ({result})."
+        sections.append(f"Photo {number}:\n{result}")
+    reply = "Captions and Hashtags:\n\n" + "\n\n".join(sections)
+    for part in split_message(reply):
+        await messages[0].reply_text(part)
+
+album_collector = AlbumCollector(reply_to_album)
+
+# Telegram message handler for images
+async def handle_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Photos of an album arrive as separate updates; collect them and reply once
+    if update.message.media_group_id:
+        album_collector.add(update.message)
+        return
+
+    caption_and_hashtags = await caption_photo(update.message.photo)
     await update.message.reply_text(f"Caption and Hashtags:\n{caption_and_hashtags}")
 
-# Main function to run the bot
-def main():
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+# Build the bot application with its handlers
+def build_application(token=None):
+    application = application_builder(token or TELEGRAM_BOT_TOKEN).build()
 
     # Handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
     application.add_handler(MessageHandler(filters.PHOTO, handle_image))
 
-    # Start the bot
-    application.run_polling()
+    return application
+
+# Main function to run the bot (polling, or webhook mode when TELEGRAM_WEBHOOK_URL is set)
+def main():
+    run_bot(build_application, "caption")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import io
+
+from PIL import Image, ImageOps
+
+from llm_toolkit.cache import LRUCache
+
+# Telegram sends every photo in several sizes; this is the smallest one still worth captioning.
+MIN_PHOTO_SIDE = 640
+# Longest side of the image sent to the vision model, and its JPEG quality.
+VISION_MAX_SIDE = 768
+VISION_JPEG_QUALITY = 80
+
+HASH_BITS = 64
+BANDS = 8  # 8-bit bands: two hashes within 7 bits of each other always share at least one band
+BAND_BITS = HASH_BITS // BANDS
+
+
+def pick_photo_size(photo_sizes, min_side=MIN_PHOTO_SIDE):
+    """The smallest PhotoSize whose longer side is at least min_side, else the largest one."""
+    for size in sorted(photo_sizes, key=lambda s: s.width * s.height):
+        if max(size.width, size.height) >= min_side:
+            return size
+    return photo_sizes[-1]
+
+
+def open_image(image_bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(bytes(image_bytes)))
+    return ImageOps.exif_transpose(image).convert("RGB")
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: survives re-compression, resizing and small edits."""
+    small = image.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def downscale_for_vision(image: Image.Image, max_side=VISION_MAX_SIDE, quality=VISION_JPEG_QUALITY) -> bytes:
+    """JPEG bytes of the image with its longer side at most max_side."""
+    image = image.copy()
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def _bands(value: int):
+    mask = (1 << BAND_BITS) - 1
+    return [(band, (value >> (band * BAND_BITS)) & mask) for band in range(BANDS)]
+
+
+class PerceptualCache(LRUCache):
+    """
+    LRU of generated captions keyed by perceptual hash.
+
+    A lookup matches any stored image within `max_distance` differing bits. Each hash is indexed
+    under its eight 8-bit bands, so only images sharing a band are compared, not the whole cache.
+    """
+
+    def __init__(self, max_items: int = 512, max_distance: int = 6):
+        assert max_distance < BANDS, "the band index only guarantees matches below BANDS bits"
+        super().__init__(max_items)
+        self.max_distance = max_distance
+        self._index = {}  # (band, value) -> set of hashes
+
+    def get(self, value: int):
+        with self._lock:
+            candidates = set()
+            for band in _bands(value):
+                candidates |= self._index.get(band, set())
+            best = min(candidates, key=lambda other: bin(value ^ other).count("1"), default=None)
+            if best is None or bin(value ^ best).count("1") > self.max_distance:
+                return None
+            self._items.move_to_end(best)
+            return self._items[best][1]
+
+    def put(self, value: int, caption: str):
+        with self._lock:
+            if value not in self._items:
+                for band in _bands(value):
+                    self._index.setdefault(band, set()).add(value)
+            self._store(value, caption)
+
+    def _evicted(self, value: int):
+        for band in _bands(value):
+            self._index[band].discard(value)
+            if not self._index[band]:
+                del self._index[band]
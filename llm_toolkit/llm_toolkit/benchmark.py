@@ -0,0 +1,281 @@
+# llm_toolkit/benchmark.py
+"""
+End-to-end benchmark of every app's core function against the offline mock server.
+
+Each scenario imports an app from this repository (with the app's own
+dependencies installed), points Groq, Gemini, SerpAPI and TheMealDB at
+llm_toolkit.mock_server, and drives the function the UI would call. The report
+shows throughput and latency percentiles per scenario.
+
+Usage:
+  python -m llm_toolkit.benchmark --requests 50 --concurrency 8
+  python -m llm_toolkit.benchmark --only ai_book_analysis,lesson_planner --latency-ms 600 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import base64
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_toolkit.metrics import percentile
+from llm_toolkit.mock_server import add_mock_arguments, config_from_args, start_mock_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_CODE = '''
+def average(values):
+    total = 0
+    for v in values:
+        total += v
+    return total / len(values)
+'''
+
+# 1x1 white PNG, enough for the vision request path.
+SAMPLE_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC"
+)
+
+MOVIE_PREFERENCES = {
+    "genre_preference": ["Action", "Adventure"],
+    "mood_preference": "Balanced",
+    "content_rating": ["PG-13"],
+    "story_elements": ["Plot Twists"],
+    "duration_preference": "Any",
+}
+
+BOOK_PREFERENCE = "beginner friendly, lots of exercises"
+
+
+class _FakeMessage:
+    """Just enough of telegram.Message for the bot handlers."""
+
+    def __init__(self, text=""):
+        self.text = text
+        self.photo = []
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class _FakeUpdate:
+    def __init__(self, text=""):
+        self.message = _FakeMessage(text)
+
+
+class _FakeContext:
+    def __init__(self, args=None):
+        self.args = args or []
+
+
+def _run_async(coroutine):
+    return asyncio.run(coroutine)
+
+
+class Scenario:
+    """An app file plus the call that exercises its core function."""
+
+    def __init__(self, path, run, setup=None):
+        self.path = path
+        self.run = run
+        self.setup = setup
+
+
+def _point_mealdb(module, base_url):
+    module.MEALDB_BASE_URL = base_url + "/api/json/v1/1"
+
+
+def _point_openlibrary(module, base_url):
+    module.OPENLIBRARY_SEARCH_URL = base_url + "/search.json"
+    module.book_cache.ttl_seconds = 0  # measure the OpenLibrary round trip, not cache hits
+
+
+def _point_gemini(module, base_url):
+    module.genai.configure(api_key="mock", transport="rest", client_options={"api_endpoint": base_url})
+
+
+SCENARIOS = {
+    "ai_shopping_recommender": Scenario(
+        "AI Shopping Recommender/main.py",
+        lambda m: m.analyze_products(m.search_products("wireless headphones", "Mumbai, India"),
+                                     "budget under 5000, noise cancellation"),
+    ),
+    "ai_book_analysis": Scenario(
+        "AI  Book Analysis/main.py",
+        lambda m: m.get_best_book(m.rank_books(m.fetch_books("python programming"), BOOK_PREFERENCE), BOOK_PREFERENCE),
+    ),
+    "ai_movie_recommender": Scenario(
+        "AI Movie Recommender/main.py",
+        lambda m: m.get_enhanced_recommendations(m.get_movie_recommendations("1"), MOVIE_PREFERENCES),
+    ),
+    "lesson_planner": Scenario(
+        "AI-Powered Personalized Lesson Planner/main.py",
+        lambda m: m.generate_lesson_plan("Mathematics", "Middle School (6-8)", "60 minutes", ["Visual"],
+                                         "Understand equivalent fractions"),
+    ),
+    "ai_coding_assistant": Scenario(
+        "AI Coading Assistant/ai_coding_assistant.py",
+        lambda m: m.analyze_code(SAMPLE_CODE, "bug_finder"),
+    ),
+    "design_lens": Scenario(
+        "DesignLens/design_lens.py",
+        lambda m: m.get_ux_suggestions(image_base64=base64.b64encode(SAMPLE_PNG).decode("utf-8"),
+                                       description="Login page"),
+    ),
+    "fact_wizard": Scenario(
+        "FactWizard/fact_wizard.py",
+        lambda m: m.generate_fun_fact("Space", False),
+    ),
+    "would_you_rather": Scenario(
+        "Would_You_Rather/would_you_rather.py",
+        lambda m: _run_async(m.generate_question(_FakeUpdate(), _FakeContext())),
+    ),
+    "ai_mealplanner": Scenario(
+        "ai_mealplanner/ai_mealplaner.py",
+        lambda m: _run_async(m.handle_message(_FakeUpdate("chicken, rice and broccoli, high protein"),
+                                              _FakeContext())),
+        setup=_point_mealdb,
+    ),
+    "book_recommendation": Scenario(
+        "book_recommendation/book_recommendation.py",
+        lambda m: _run_async(m.handle_message(_FakeUpdate("science fiction"), _FakeContext())),
+        setup=_point_openlibrary,
+    ),
+    "caption_hashtag_recommender": Scenario(
+        "caption_hashtag_recommender/caption_hashtag_recommender.py",
+        lambda m: _run_async(m.generate_caption_and_hashtags_from_image(SAMPLE_PNG)),
+    ),
+    "youtube_search_api": Scenario(
+        "Google_Gemini/youtube_video_recommender/main_api.py",
+        lambda m: m.search_youtube(m.extract_search_topic("relaxing videos about sourdough baking")),
+        setup=_point_gemini,
+    ),
+    "travel_app_planner": Scenario(
+        "Google_Gemini/travel_app_planner/main.py",
+        lambda m: m.search_destination("a quiet beach holiday with good food"),
+        setup=_point_gemini,
+    ),
+}
+
+
+def configure_environment(base_url, backend="groq"):
+    """
+    Point every SDK the apps use at the mock server. `backend` is forced as LLM_BACKEND for every app;
+    the default measures the apps against the mock only, with no Ollama/offline fallback. None leaves
+    the router's own rules (and any LLM_BACKEND already set) in charge.
+    """
+    for key in ("GROQ", "GROQ_API_KEY", "GEMINI_API_KEY", "GEMINIAPI_KEY", "SERPAPI_KEY", "SERPAPIAPI_KEY",
+                "TELEGRAM_TOKEN"):
+        os.environ[key] = "mock"
+    os.environ["GROQ_BASE_URL"] = base_url
+    if backend:
+        os.environ["LLM_BACKEND"] = backend
+
+    try:
+        import serpapi
+
+        for holder in (getattr(serpapi, "Client", None), getattr(getattr(serpapi, "http", None), "HTTPClient", None)):
+            if holder is not None and hasattr(holder, "BASE_DOMAIN"):
+                holder.BASE_DOMAIN = base_url
+    except ImportError:
+        pass
+
+
+def load_app(relative_path, name):
+    """Import an app file by path, with its directory importable for sibling modules."""
+    path = os.path.join(REPO_ROOT, relative_path)
+    app_dir = os.path.dirname(path)
+    if app_dir not in sys.path:
+        sys.path.insert(0, app_dir)
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    try:
+        fn()
+        return (time.perf_counter() - started) * 1000, None
+    except Exception as e:
+        return (time.perf_counter() - started) * 1000, f"{type(e).__name__}: {e}"
+
+
+def run_scenario(name, scenario, base_url, requests, concurrency):
+    module = load_app(scenario.path, name)
+    if scenario.setup:
+        scenario.setup(module, base_url)
+    call = lambda: scenario.run(module)  # noqa: E731
+
+    _timed(call)  # warm-up: connection pools, lazy imports
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: _timed(call), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [ms for ms, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+    }
+
+
+def format_report(rows):
+    header = f"{'scenario':<30}{'req':>6}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        if "skipped" in row:
+            lines.append(f"{row['scenario']:<30}  skipped: {row['skipped']}")
+            continue
+        fmt = lambda value: "-" if value is None else f"{value:.1f}"  # noqa: E731
+        lines.append(f"{row['scenario']:<30}{row['requests']:>6}{row['errors']:>6}{fmt(row['throughput_rps']):>9}"
+                     f"{fmt(row['p50_ms']):>10}{fmt(row['p90_ms']):>10}{fmt(row['p99_ms']):>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the apps against the offline mock server.")
+    parser.add_argument("--requests", type=int, default=20, help="timed calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--only", default="", help="comma-separated scenario names")
+    parser.add_argument("--json", dest="json_path", help="also write the rows to this file")
+    parser.add_argument("--backend", default="groq", choices=["groq", "ollama", "offline", "router"],
+                        help="LLM backend forced for every app; 'router' keeps the per-app fallback rules")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server, base_url = start_mock_server(config_from_args(args))
+    configure_environment(base_url, backend=None if args.backend == "router" else args.backend)
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()] or list(SCENARIOS)
+    rows = []
+    for name in selected:
+        try:
+            rows.append(run_scenario(name, SCENARIOS[name], base_url, args.requests, args.concurrency))
+        except Exception as e:  # missing app dependencies, import-time failures
+            rows.append({"scenario": name, "skipped": f"{type(e).__name__}: {e}"})
+    server.shutdown()
+
+    print(format_report(rows))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# llm_toolkit/cache.py
+"""
+A thread-safe in-memory LRU, optionally with a TTL, for the apps' result caches.
+
+    rewrites = LRUCache(512)                         # least recently used entry evicted first
+    searches = LRUCache(1024, ttl_seconds=6 * 3600)  # entries also expire after six hours
+
+`get` returns None for a missing or expired key, so None itself cannot be cached. Subclasses that keep
+their own index (e.g. a nearest-neighbour lookup) hold `_lock`, store with `_store` and override
+`_evicted` to drop evicted keys from it.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """At most `max_items` entries; with `ttl_seconds`, an entry expires that long after it was stored."""
+
+    def __init__(self, max_items: int, ttl_seconds: Optional[float] = None):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()  # key -> (stored_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if self.ttl_seconds is not None and time.monotonic() - item[0] >= self.ttl_seconds:
+                del self._items[key]
+                self._evicted(key)
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._store(key, value)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """(key, value) pairs, least recently used first, e.g. to save the cache and load it back in order."""
+        with self._lock:
+            return [(key, value) for key, (_, value) in self._items.items()]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def _store(self, key: Hashable, value: Any):
+        # Callers hold _lock.
+        self._items[key] = (time.monotonic(), value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            oldest, _ = self._items.popitem(last=False)
+            self._evicted(oldest)
+
+    def _evicted(self, key: Hashable):
+        """Called with _lock held after a key was dropped, for subclasses with their own index."""
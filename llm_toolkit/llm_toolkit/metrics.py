@@ -0,0 +1,485 @@
+# llm_toolkit/metrics.py
+"""
+Per-call instrumentation for every LLM invocation.
+
+`instrument_client(client, app)` wraps anything with `chat.completions.create`
+(Groq, OpenAI, the BackendRouter) and `instrument_model(model, app)` wraps a
+Gemini `GenerativeModel.generate_content`. Each call records wall time,
+time-to-first-token (equal to wall time for non-streaming calls), token usage, the backend and model
+that served it, and errors, labelled by app and by the calling function
+(e.g. `analyze_products`, `get_best_book`, `extract_search_topic`).
+
+Records go to:
+  LLM_METRICS_JSONL   Path of a JSONL file, one record per call.
+  LLM_METRICS_PORT    Port of a Prometheus text endpoint served at /metrics.
+
+App-level caches report their hits/misses with `record_cache(app, function, hit)`, and
+prompt templates report how long each prompt took to build with `record_prompt_build(...)`.
+
+Summarise a JSONL file with:
+  python -m llm_toolkit.metrics metrics.jsonl
+"""
+import contextvars
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMPT_BUILD_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+# Set by the router so the instrumentation knows which backend served a call.
+current_backend = contextvars.ContextVar("llm_backend", default=None)
+# Explicit function label; when unset the calling function's name is used.
+current_function = contextvars.ContextVar("llm_function", default=None)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None for an empty list)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def caller_function():
+    """Name of the first function on the stack outside llm_toolkit."""
+    explicit = current_function.get()
+    if explicit:
+        return explicit
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith("llm_toolkit"):
+            name = frame.f_code.co_name
+            return "main" if name == "<module>" else name
+        frame = frame.f_back
+    return "unknown"
+
+
+class label:
+    """Context manager/decorator that overrides the function label of calls made inside it."""
+
+    def __init__(self, function):
+        self.function = function
+        self._token = None
+
+    def __enter__(self):
+        self._token = current_function.set(self.function)
+        return self
+
+    def __exit__(self, *exc):
+        current_function.reset(self._token)
+        return False
+
+    def __call__(self, fn):
+        def wrapper(*args, **kwargs):
+            with label(self.function):
+                return fn(*args, **kwargs)
+
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+
+
+class _Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{str(value).replace(chr(34), "")}"' for key, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """In-process aggregation of call records, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)  # (app, function, backend, model, status) -> count
+        self.tokens = defaultdict(int)  # (app, function, model, kind) -> count
+        self.cache = defaultdict(int)  # (app, function, result) -> count
+        self.latency = defaultdict(_Histogram)  # (app, function, model) -> seconds
+        self.ttft = defaultdict(_Histogram)  # (app, function, model) -> seconds
+        self.prompt_build = defaultdict(lambda: _Histogram(PROMPT_BUILD_BUCKETS))  # (app, template) -> seconds
+        self.sinks = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def record(self, record):
+        """Aggregate one record (a dict) and forward it to every sink."""
+        with self._lock:
+            if record.get("kind") == "cache":
+                self.cache[(record["app"], record["function"], "hit" if record["cache_hit"] else "miss")] += 1
+            elif record.get("kind") == "prompt":
+                self.prompt_build[(record["app"], record["template"])].observe(record["build_ms"] / 1000.0)
+            else:
+                model = record.get("model") or "unknown"
+                key = (record["app"], record["function"], model)
+                status = "error" if record.get("error") else "ok"
+                self.requests[(record["app"], record["function"], record.get("backend") or "direct", model, status)] += 1
+                self.latency[key].observe(record["wall_ms"] / 1000.0)
+                if record.get("ttft_ms") is not None:
+                    self.ttft[key].observe(record["ttft_ms"] / 1000.0)
+                for kind in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                    if record.get(kind):
+                        self.tokens[key + (kind.replace("_tokens", ""),)] += record[kind]
+        for sink in self.sinks:
+            sink(record)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append("# HELP llm_requests_total LLM calls by outcome.")
+            lines.append("# TYPE llm_requests_total counter")
+            for (app, function, backend, model, status), value in sorted(self.requests.items()):
+                lines.append("llm_requests_total" + _labels(app=app, function=function, backend=backend,
+                                                             model=model, status=status) + f" {value}")
+
+            lines.append("# HELP llm_tokens_total Tokens used by LLM calls.")
+            lines.append("# TYPE llm_tokens_total counter")
+            for (app, function, model, kind), value in sorted(self.tokens.items()):
+                lines.append("llm_tokens_total" + _labels(app=app, function=function, model=model, kind=kind)
+                             + f" {value}")
+
+            lines.append("# HELP llm_cache_lookups_total App-level response cache lookups.")
+            lines.append("# TYPE llm_cache_lookups_total counter")
+            for (app, function, result), value in sorted(self.cache.items()):
+                lines.append("llm_cache_lookups_total" + _labels(app=app, function=function, result=result)
+                             + f" {value}")
+
+            for name, help_text, histograms in (
+                    ("llm_request_duration_seconds", "Wall time of LLM calls.", self.latency),
+                    ("llm_time_to_first_token_seconds", "Time to the first streamed token.", self.ttft),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (app, function, model), hist in sorted(histograms.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):  # counts are already cumulative
+                        lines.append(f"{name}_bucket" + _labels(app=app, function=function, model=model, le=bound)
+                                     + f" {count}")
+                    lines.append(f"{name}_bucket" + _labels(app=app, function=function, model=model, le="+Inf")
+                                 + f" {hist.count}")
+                    lines.append(f"{name}_sum" + _labels(app=app, function=function, model=model)
+                                 + f" {hist.total:.6f}")
+                    lines.append(f"{name}_count" + _labels(app=app, function=function, model=model)
+                                 + f" {hist.count}")
+
+            lines.append("# HELP llm_prompt_build_seconds Time spent rendering prompt templates.")
+            lines.append("# TYPE llm_prompt_build_seconds histogram")
+            for (app, template), hist in sorted(self.prompt_build.items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append("llm_prompt_build_seconds_bucket" + _labels(app=app, template=template, le=bound)
+                                 + f" {count}")
+                lines.append("llm_prompt_build_seconds_bucket" + _labels(app=app, template=template, le="+Inf")
+                             + f" {hist.count}")
+                lines.append("llm_prompt_build_seconds_sum" + _labels(app=app, template=template)
+                             + f" {hist.total:.6f}")
+                lines.append("llm_prompt_build_seconds_count" + _labels(app=app, template=template)
+                             + f" {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+class JsonlSink:
+    """Append each record as one JSON line."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def serve_metrics(registry, port, host="0.0.0.0"):
+    """Serve `registry.render()` at http://host:port/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Process-wide registry, configured from the environment on first use.
+    Streamlit reruns the app script on every interaction, so this must only start
+    the metrics server once per process.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+            if os.getenv("LLM_METRICS_JSONL"):
+                _registry.add_sink(JsonlSink(os.getenv("LLM_METRICS_JSONL")))
+            if os.getenv("LLM_METRICS_PORT"):
+                try:
+                    serve_metrics(_registry, int(os.getenv("LLM_METRICS_PORT")))
+                except OSError as e:
+                    # Another process (e.g. a second Streamlit session worker) already serves it.
+                    print(f"Warning: metrics endpoint not started: {e}")
+    return _registry
+
+
+def record_cache(app, function, hit):
+    """Report an app-level cache lookup (a hit means no LLM call was made)."""
+    get_registry().record({
+        "kind": "cache",
+        "ts": time.time(),
+        "app": app,
+        "function": function,
+        "cache_hit": bool(hit),
+    })
+
+
+def record_prompt_build(app, template, build_ms, prefix_chars, prompt_chars):
+    """Report one prompt rendered from a template; prefix_chars is the cacheable static part."""
+    get_registry().record({
+        "kind": "prompt",
+        "ts": time.time(),
+        "app": app,
+        "template": template,
+        "build_ms": round(build_ms, 4),
+        "prefix_chars": prefix_chars,
+        "prompt_chars": prompt_chars,
+    })
+
+
+def _usage_fields(usage):
+    """Token counts from a Groq/OpenAI `usage` or a Gemini `usage_metadata` object."""
+    if usage is None:
+        return {}
+    if hasattr(usage, "prompt_token_count"):  # Gemini
+        return {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None),
+            "total_tokens": getattr(usage, "total_token_count", None),
+            "cached_tokens": getattr(usage, "cached_content_token_count", None),
+        }
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "total_tokens": getattr(usage, "total_tokens", None),
+        "cached_tokens": getattr(details, "cached_tokens", None) if details else None,
+    }
+
+
+class _CallTimer:
+    """Collects one record; finished either directly or when a stream is exhausted."""
+
+    def __init__(self, registry, app, function, model):
+        self.registry = registry
+        self.started = time.perf_counter()
+        self.record = {
+            "kind": "llm",
+            "ts": time.time(),
+            "app": app,
+            "function": function,
+            "backend": None,
+            "model": model,
+            "wall_ms": None,
+            "ttft_ms": None,
+            "prompt_tokens": None,
+            "completion_tokens": None,
+            "total_tokens": None,
+            "cached_tokens": None,
+            "error": None,
+        }
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def first_token(self):
+        if self.record["ttft_ms"] is None:
+            self.record["ttft_ms"] = self.elapsed_ms()
+
+    def finish(self, usage=None, model=None, error=None):
+        self.record["wall_ms"] = self.elapsed_ms()
+        self.record["backend"] = self.record["backend"] or current_backend.get()
+        if model:
+            self.record["model"] = model
+        if error is not None:
+            self.record["error"] = f"{type(error).__name__}: {error}"
+        for key, value in _usage_fields(usage).items():
+            if value is not None:
+                self.record[key] = value
+        self.registry.record(self.record)
+
+
+def _instrumented_stream(stream, timer, text_of):
+    usage = None
+    model = None
+    try:
+        for chunk in stream:
+            if text_of(chunk):
+                timer.first_token()
+            # Groq puts usage on the last chunk under x_groq; OpenAI/Gemini use usage/usage_metadata.
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None) \
+                or getattr(chunk, "usage_metadata", None) or usage
+            model = getattr(chunk, "model", None) or model
+            yield chunk
+    except GeneratorExit:
+        # The caller stopped reading (e.g. an early abort); stop the upstream generation too.
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        timer.finish(usage, model)
+        raise
+    except Exception as e:
+        timer.finish(usage, model, error=e)
+        raise
+    timer.finish(usage, model)
+
+
+def _chat_chunk_text(chunk):
+    choices = getattr(chunk, "choices", None) or []
+    return choices and getattr(getattr(choices[0], "delta", None), "content", None)
+
+
+def _gemini_chunk_text(chunk):
+    try:
+        return chunk.text
+    except Exception:
+        return None
+
+
+class InstrumentedClient:
+    """Wraps a client's chat.completions.create with timing and token accounting."""
+
+    def __init__(self, client, app, registry=None):
+        self._client = client
+        self.app = app
+        self.registry = registry or get_registry()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def create(self, **kwargs):
+        timer = _CallTimer(self.registry, self.app, caller_function(), kwargs.get("model"))
+        token = current_backend.set(None)
+        try:
+            response = self._client.chat.completions.create(**kwargs)
+        except Exception as e:
+            timer.finish(error=e)
+            current_backend.reset(token)
+            raise
+        if kwargs.get("stream"):
+            timer.record["backend"] = current_backend.get()
+            current_backend.reset(token)
+            return _instrumented_stream(response, timer, _chat_chunk_text)
+        timer.first_token()
+        timer.finish(getattr(response, "usage", None), getattr(response, "model", None))
+        current_backend.reset(token)
+        return response
+
+
+class InstrumentedModel:
+    """Wraps a Gemini GenerativeModel's generate_content with the same accounting."""
+
+    def __init__(self, model, app, registry=None):
+        self._model = model
+        self.app = app
+        self.registry = registry or get_registry()
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def generate_content(self, *args, **kwargs):
+        model_name = getattr(self._model, "model_name", None)
+        timer = _CallTimer(self.registry, self.app, caller_function(), model_name)
+        try:
+            response = self._model.generate_content(*args, **kwargs)
+        except Exception as e:
+            timer.finish(error=e)
+            raise
+        if kwargs.get("stream"):
+            return _instrumented_stream(response, timer, _gemini_chunk_text)
+        timer.first_token()
+        timer.finish(getattr(response, "usage_metadata", None))
+        return response
+
+
+def instrument_client(client, app):
+    return InstrumentedClient(client, app)
+
+
+def instrument_model(model, app):
+    return InstrumentedModel(model, app)
+
+
+def summarize(path):
+    """Per app/function call counts, latency percentiles and mean tokens from a JSONL sink."""
+    groups = defaultdict(list)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("kind") == "llm":
+                groups[(record["app"], record["function"])].append(record)
+
+    rows = []
+    for (app, function), records in sorted(groups.items()):
+        wall = [r["wall_ms"] for r in records]
+        ttft = [r["ttft_ms"] for r in records if r.get("ttft_ms") is not None]
+        prompt = [r["prompt_tokens"] for r in records if r.get("prompt_tokens")]
+        cached = [r.get("cached_tokens") or 0 for r in records if r.get("prompt_tokens")]
+        rows.append({
+            "app": app,
+            "function": function,
+            "calls": len(records),
+            "errors": sum(1 for r in records if r.get("error")),
+            "p50_ms": percentile(wall, 50),
+            "p95_ms": percentile(wall, 95),
+            "ttft_p50_ms": percentile(ttft, 50),
+            "mean_prompt_tokens": round(sum(prompt) / len(prompt)) if prompt else None,
+            "mean_cached_tokens": round(sum(cached) / len(cached)) if cached else None,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m llm_toolkit.metrics <metrics.jsonl>")
+        sys.exit(1)
+    for row in summarize(sys.argv[1]):
+        print(json.dumps(row))
@@ -0,0 +1,555 @@
+# llm_toolkit/mock_server.py
+"""
+Offline stand-in for the services the apps call, for reproducible benchmarks.
+
+Speaks:
+  - Groq/OpenAI chat completions, streaming included:
+        POST /openai/v1/chat/completions   (Groq SDK, via GROQ_BASE_URL)
+        POST /v1/chat/completions          (OpenAI SDK / Ollama clients)
+  - Gemini REST:
+        POST /v1beta/models/<model>:generateContent
+  - SerpAPI JSON shapes used by the apps:
+        GET /search(.json)?engine=google_shopping     -> shopping_results
+        GET /search(.json)?engine=youtube             -> video_results
+        GET /search(.json)?engine=google_play_books   -> organic_results[].items
+        GET /search(.json)?engine=google_play_movies  -> organic_results[].items
+        GET /search(.json)?engine=google              -> top_sights.sights
+  - TheMealDB search by name (search.php?s=) and by first letter (search.php?f=, a fixed catalog with
+    ingredients), and OpenLibrary search, for the Telegram bots.
+  - The Telegram Bot API methods the bots use, so webhook mode can run without Telegram:
+        POST /bot<token>/<method>           (getMe, setWebhook, sendMessage, getFile, ...)
+        GET  /file/bot<token>/<file_path>   (a tiny PNG for every photo)
+    Sent messages are kept in server.RequestHandlerClass.telegram.
+
+Latency, token rate and error injection are configurable:
+  python -m llm_toolkit.mock_server --port 8900 --latency-ms 300 --tokens-per-s 250 --error-rate 0.05
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockConfig:
+    """Knobs for the simulated upstreams."""
+
+    def __init__(self, latency_ms=250.0, jitter_ms=50.0, tokens_per_s=300.0, completion_tokens=180,
+                 error_rate=0.0, error_status=429, serp_latency_ms=400.0, telegram_latency_ms=40.0, seed=0):
+        self.latency_ms = latency_ms  # time to first token
+        self.jitter_ms = jitter_ms
+        self.tokens_per_s = tokens_per_s  # 0 means "emit everything at once"
+        self.completion_tokens = completion_tokens  # length of free-text replies (capped by max_tokens)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.serp_latency_ms = serp_latency_ms
+        self.telegram_latency_ms = telegram_latency_ms
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def jitter(self, base_ms):
+        with self._lock:
+            return max(0.0, base_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+    def should_fail(self):
+        with self._lock:
+            return self.random.random() < self.error_rate
+
+
+WORDS = ("the quick insight shows a strong match with your preference because it balances price quality "
+         "and long term value while keeping the experience simple engaging and reliable for everyday use").split()
+
+
+SAMPLE_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC"
+)
+TELEGRAM_BOT_USER = {"id": 1000001, "is_bot": True, "first_name": "Mock Bot", "username": "mock_bot"}
+# Bot API methods whose result is the Message that was sent.
+TELEGRAM_MESSAGE_METHODS = {"sendMessage", "sendPhoto", "sendDocument", "sendAnimation", "editMessageText"}
+
+
+class TelegramLog:
+    """What the bots sent to the mock Bot API, in order."""
+
+    def __init__(self):
+        self.calls = []  # (method, params)
+        self.webhook = None
+        self._message_ids = 0
+        self._lock = threading.Lock()
+
+    def record(self, method, params):
+        with self._lock:
+            self.calls.append((method, params))
+            if method == "setWebhook":
+                self.webhook = params.get("url")
+            elif method == "deleteWebhook":
+                self.webhook = None
+            self._message_ids += 1
+            return self._message_ids
+
+    @property
+    def messages(self):
+        with self._lock:
+            return [params for method, params in self.calls if method in TELEGRAM_MESSAGE_METHODS]
+
+
+def telegram_response(method, params, message_id):
+    if method == "getMe":
+        return TELEGRAM_BOT_USER
+    if method in TELEGRAM_MESSAGE_METHODS:
+        chat_id = str(params.get("chat_id", "0"))
+        return {"message_id": message_id, "date": int(time.time()), "from": TELEGRAM_BOT_USER,
+                "chat": {"id": int(chat_id) if chat_id.lstrip("-").isdigit() else chat_id, "type": "private"},
+                "text": params.get("text", "")}
+    if method == "getFile":
+        file_id = params.get("file_id", "file")
+        return {"file_id": file_id, "file_unique_id": file_id, "file_size": len(SAMPLE_PNG),
+                "file_path": f"photos/{file_id}.png"}
+    if method == "getWebhookInfo":
+        return {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+    return True
+
+
+def _seeded(text):
+    return random.Random(int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16))
+
+
+def _filler(n_tokens, seed_text):
+    rng = _seeded(seed_text)
+    return " ".join(rng.choice(WORDS) for _ in range(n_tokens)).capitalize() + "."
+
+
+def sample_lesson_plan(prompt):
+    """A lesson plan that passes validate_lesson_plan in the Lesson Planner."""
+    return {
+        "subject": "Mathematics",
+        "grade_level": "Middle School (6-8)",
+        "duration": "60 minutes",
+        "learning_style": ["Visual"],
+        "objectives": "Understand fractions",
+        "sections": [
+            {"title": title, "duration": "15 minutes",
+             "activities": [f"{title} activity {i}" for i in range(1, 4)]}
+            for title in ("Introduction", "Main Content", "Practice", "Assessment & Closure")
+        ],
+        "resources": ["Slides", "Worksheets", "Fraction tiles", "Exit tickets", "Reference guide"],
+        "differentiation": {
+            "visual_learners": "Diagrams",
+            "auditory_learners": "Discussion",
+            "kinesthetic_learners": "Manipulatives",
+        },
+    }
+
+
+def sample_ux_suggestions():
+    return {
+        "high_priority": ["Increase contrast of the primary call-to-action"],
+        "medium_priority": ["Group related form fields"],
+        "low_priority": ["Soften card shadows"],
+        "rationale": "Contrast and grouping have the largest effect on task completion.",
+    }
+
+
+def reply_for(messages, max_tokens, config):
+    """Pick a plausible reply for a chat request."""
+    text = " ".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for m in messages
+        for part in (m.get("content") if isinstance(m.get("content"), list) else [m.get("content", "")])
+    )
+    if "lesson plan" in text.lower() and "json" in text.lower():
+        return json.dumps(sample_lesson_plan(text), indent=2)
+    if "high_priority" in text:
+        return json.dumps(sample_ux_suggestions())
+    n = min(config.completion_tokens, max_tokens or config.completion_tokens)
+    return _filler(n, text)
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _tokenize(text):
+    """Split a reply into token-sized pieces for streaming."""
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+def shopping_results(query, n=20):
+    rng = _seeded("shopping" + query)
+    return [{
+        "position": i + 1,
+        "title": f"{query.title()} Model {i + 1} Pro Edition",
+        "product_id": str(rng.randrange(10 ** 17, 10 ** 18)),
+        "product_link": f"https://www.google.com/shopping/product/{rng.randrange(10 ** 15)}?gl=in&hl=hi&prds=eto:{rng.randrange(10 ** 15)}",
+        "serpapi_product_api": f"https://serpapi.com/search.json?engine=google_product&product_id={rng.randrange(10 ** 15)}",
+        "source": rng.choice(["Amazon.in", "Flipkart", "Croma", "Reliance Digital"]),
+        "source_icon": f"https://encrypted-tbn0.gstatic.com/favicon-tbn?q=tbn:{rng.randrange(10 ** 12)}",
+        "price": f"₹{rng.randrange(999, 19999):,}",
+        "extracted_price": float(rng.randrange(999, 19999)),
+        "rating": round(rng.uniform(3.2, 4.9), 1),
+        "reviews": rng.randrange(10, 20000),
+        "extensions": ["Free delivery", "30-day returns"],
+        "thumbnail": f"https://encrypted-tbn2.gstatic.com/shopping?q=tbn:{rng.randrange(10 ** 20)}&usqp=CAE",
+        "delivery": "Free delivery by Mon",
+        "tag": rng.choice(["", "Sale", "Best seller"]),
+    } for i in range(n)]
+
+
+def play_items(kind, query, n=20):
+    rng = _seeded(kind + query)
+    items = []
+    for i in range(n):
+        title = f"{query.title()} {kind.title()} Volume {i + 1}"
+        items.append({
+            "title": title,
+            "link": f"https://play.google.com/store/{kind}s/details?id={rng.randrange(10 ** 12)}",
+            "product_id": str(rng.randrange(10 ** 12)),
+            "serpapi_link": f"https://serpapi.com/search.json?engine=google_play_product&product_id={rng.randrange(10 ** 12)}",
+            "author": rng.choice(["A. Writer", "B. Novelist", "C. Scholar"]),
+            "category": rng.choice(["Fiction", "Comics", "Science", "Action & Adventure", "Drama"]),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "price": f"${rng.randrange(1, 30)}.99",
+            "extracted_price": rng.randrange(1, 30) + 0.99,
+            "description": _filler(rng.randrange(60, 160), title + str(i)),
+            "thumbnail": f"https://play-lh.googleusercontent.com/{hashlib.md5(title.encode()).hexdigest()}=s256-rw",
+            "extension": {"name": f"Volume {i + 1}"},
+        })
+    return items
+
+
+def video_results(query, n=20):
+    rng = _seeded("youtube" + query)
+    return [{
+        "position_on_page": i + 1,
+        "title": f"{query.title()} explained part {i + 1}",
+        "link": f"https://www.youtube.com/watch?v={rng.randrange(10 ** 10):x}",
+        "channel": {"name": f"Channel {i}", "link": f"https://www.youtube.com/@channel{i}", "verified": True},
+        "published_date": f"{rng.randrange(1, 11)} months ago",
+        "views": rng.randrange(1000, 10 ** 7),
+        "length": f"{rng.randrange(3, 60)}:{rng.randrange(10, 60)}",
+        "description": _filler(30, query + str(i)),
+        "thumbnail": {"static": f"https://i.ytimg.com/vi/{i}/hq720.jpg", "rich": f"https://i.ytimg.com/an_webp/{i}/mqdefault_6s.webp"},
+    } for i in range(n)]
+
+
+def top_sights(query, n=8):
+    rng = _seeded("sights" + query)
+    return {"sights": [{
+        "title": f"{query.title()} Sight {i + 1}",
+        "link": f"https://www.google.com/search?q=sight+{i}",
+        "description": _filler(12, query + str(i)),
+        "rating": round(rng.uniform(3.5, 5.0), 1),
+        "reviews": rng.randrange(100, 50000),
+        "thumbnail": f"https://serpapi.com/searches/{i}/images/{rng.randrange(10 ** 10)}.jpeg",
+    } for i in range(n)]}
+
+
+def serp_response(params):
+    engine = params.get("engine", "google")
+    query = params.get("q") or params.get("search_query") or params.get("movies_category") or "results"
+    meta = {"search_metadata": {"id": hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest(),
+                                "status": "Success"},
+            "search_parameters": {k: v for k, v in params.items() if k != "api_key"}}
+    if engine == "google_shopping":
+        meta["shopping_results"] = shopping_results(query)
+    elif engine == "youtube":
+        meta["video_results"] = video_results(query)
+    elif engine == "google_play_books":
+        meta["organic_results"] = [{"title": "Top results", "items": play_items("book", query)}]
+    elif engine == "google_play_movies":
+        meta["organic_results"] = [{"title": "Top movies", "items": play_items("movie", query)}]
+    else:
+        meta["top_sights"] = top_sights(query)
+    return meta
+
+
+# The fixed catalog served by search.php?f=<letter>: (name, category, area, ingredients). Every run sees
+# the same meals, so the meal planner's mirror sync and ingredient lookups are reproducible.
+MEALDB_CATALOG = [
+    ("Apple Frangipan Tart", "Dessert", "British", ["apples", "butter", "caster sugar", "ground almonds", "eggs"]),
+    ("Arrabiata", "Vegetarian", "Italian", ["penne rigate", "olive oil", "garlic", "chopped tomatoes",
+                                            "chilli flakes"]),
+    ("Beef and Broccoli Stir-Fry", "Beef", "Chinese", ["beef", "broccoli", "soy sauce", "garlic", "ginger", "rice"]),
+    ("Beef Lo Mein", "Beef", "Chinese", ["beef", "egg noodles", "carrots", "spring onions", "soy sauce"]),
+    ("Chicken Fajitas", "Chicken", "Mexican", ["chicken breast", "red pepper", "onion", "tortillas", "lime"]),
+    ("Chicken Teriyaki Casserole", "Chicken", "Japanese", ["chicken breast", "soy sauce", "rice", "broccoli",
+                                                          "brown sugar"]),
+    ("Dal Fry", "Vegetarian", "Indian", ["toor dal", "onion", "tomato", "cumin seeds", "turmeric"]),
+    ("Egg Drop Soup", "Vegetarian", "Chinese", ["chicken stock", "eggs", "spring onions", "cornstarch"]),
+    ("Fish Pie", "Seafood", "British", ["white fish", "potatoes", "milk", "butter", "peas"]),
+    ("Garlic Butter Salmon", "Seafood", "American", ["salmon", "butter", "garlic", "lemon", "parsley"]),
+    ("Honey Teriyaki Salmon", "Seafood", "Japanese", ["salmon", "honey", "soy sauce", "rice", "sesame seeds"]),
+    ("Irish Stew", "Lamb", "Irish", ["lamb", "potatoes", "carrots", "onion", "thyme"]),
+    ("Jerk Chicken with Rice and Peas", "Chicken", "Jamaican", ["chicken thighs", "rice", "kidney beans",
+                                                               "allspice", "scotch bonnet"]),
+    ("Kedgeree", "Seafood", "British", ["smoked haddock", "rice", "eggs", "curry powder", "butter"]),
+    ("Lasagne", "Pasta", "Italian", ["lasagne sheets", "minced beef", "chopped tomatoes", "mozzarella", "milk"]),
+    ("Lentil Soup", "Vegetarian", "Turkish", ["red lentils", "onion", "carrots", "cumin", "lemon"]),
+    ("Moussaka", "Beef", "Greek", ["aubergine", "minced beef", "potatoes", "onion", "milk"]),
+    ("Nasi Lemak", "Chicken", "Malaysian", ["rice", "coconut milk", "peanuts", "eggs", "cucumber"]),
+    ("Omelette", "Breakfast", "French", ["eggs", "butter", "cheese", "chives"]),
+    ("Pad Thai", "Chicken", "Thai", ["rice noodles", "chicken breast", "eggs", "peanuts", "bean sprouts"]),
+    ("Ratatouille", "Vegetarian", "French", ["aubergine", "courgettes", "red pepper", "tomatoes", "olive oil"]),
+    ("Spaghetti alla Carbonara", "Pasta", "Italian", ["spaghetti", "eggs", "pancetta", "parmesan", "black pepper"]),
+    ("Shakshuka", "Vegetarian", "Egyptian", ["eggs", "chopped tomatoes", "red pepper", "onion", "cumin"]),
+    ("Tandoori Chicken", "Chicken", "Indian", ["chicken thighs", "yogurt", "garam masala", "lemon", "garlic"]),
+    ("Vegetable Biryani", "Vegetarian", "Indian", ["basmati rice", "carrots", "peas", "onion", "yogurt"]),
+    ("Wontons", "Pork", "Chinese", ["minced pork", "wonton wrappers", "ginger", "spring onions", "soy sauce"]),
+]
+MEALDB_MEASURES = ("1 cup", "2 tbs", "200g", "1 tsp", "2", "Pinch")
+MEALDB_INGREDIENTS = sorted({ingredient for *_, ingredients in MEALDB_CATALOG for ingredient in ingredients})
+
+
+def _meal(meal_id, name, category, area, ingredients):
+    rng = _seeded(name)
+    meal = {
+        "idMeal": meal_id,
+        "strMeal": name,
+        "strCategory": category,
+        "strArea": area,
+        "strInstructions": _filler(80, name),
+        "strMealThumb": "https://www.themealdb.com/images/media/meals/wvpsxx1468256321.jpg",
+    }
+    for i in range(1, 21):  # TheMealDB always sends all 20 slots, unused ones empty
+        used = i <= len(ingredients)
+        meal[f"strIngredient{i}"] = ingredients[i - 1].title() if used else ""
+        meal[f"strMeasure{i}"] = rng.choice(MEALDB_MEASURES) if used else ""
+    return meal
+
+
+def mealdb_response(params):
+    letter = params.get("f", "")[:1].lower()
+    if letter:
+        meals = [_meal(str(52700 + i), *dish) for i, dish in enumerate(MEALDB_CATALOG)
+                 if dish[0].lower().startswith(letter)]
+        return {"meals": meals or None}  # TheMealDB answers null, not [], for an empty letter
+    name = params.get("s", "")
+    rng = _seeded(name)
+    if not name or rng.random() < 0.3:  # roughly a third of dish names miss, as in production
+        return {"meals": None}
+    return {"meals": [_meal("52772", name.title(), "Chicken", "Japanese", rng.sample(MEALDB_INGREDIENTS, 6))]}
+
+
+def openlibrary_response(params):
+    query = params.get("q", "books")
+    rng = _seeded("openlibrary" + query)
+    docs = [{
+        "key": f"/works/OL{rng.randrange(10 ** 6)}W",
+        "title": f"{query.title()} Handbook {i + 1}",
+        "author_name": [f"Author {i}"],
+        "first_publish_year": rng.randrange(1950, 2024),
+        "isbn": [str(rng.randrange(10 ** 12, 10 ** 13)) for _ in range(8)],
+        "subject": [_filler(3, query + str(j)) for j in range(15)],
+    } for i in range(int(params.get("limit", 100)))]
+    return {"numFound": len(docs), "start": 0, "docs": docs}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    config = MockConfig()
+    telegram = TelegramLog()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _read_form(self):
+        """Bot API parameters: JSON, or form fields as python-telegram-bot sends them."""
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/json"):
+            return json.loads(raw or b"{}")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            return {k: v[0] for k, v in parse_qs(raw.decode("utf-8")).items()}
+        return {}  # multipart uploads: the mock does not need their fields
+
+    def _telegram(self, path, params):
+        time.sleep(self.config.jitter(self.config.telegram_latency_ms))
+        method = path.rsplit("/", 1)[-1]
+        message_id = self.telegram.record(method, params)
+        self._send_json(200, {"ok": True, "result": telegram_response(method, params, message_id)})
+
+    def _maybe_fail(self):
+        if self.config.should_fail():
+            status = self.config.error_status
+            self._send_json(status, {"error": {"message": "Injected failure from mock server",
+                                               "type": "rate_limit_exceeded" if status == 429 else "server_error"}})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.startswith("/bot"):
+            self._telegram(url.path, params)
+            return
+        if url.path.startswith("/file/bot"):
+            time.sleep(self.config.jitter(self.config.telegram_latency_ms))
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(SAMPLE_PNG)))
+            self.end_headers()
+            self.wfile.write(SAMPLE_PNG)
+            return
+        time.sleep(self.config.jitter(self.config.serp_latency_ms))
+        if self._maybe_fail():
+            return
+        if url.path.endswith("/search.php"):
+            self._send_json(200, mealdb_response(params))
+        elif url.path in ("/search", "/search.json") and "engine" in params:
+            self._send_json(200, serp_response(params))
+        elif url.path == "/search.json":
+            self._send_json(200, openlibrary_response(params))
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/bot"):
+            self._telegram(url.path, self._read_form())
+            return
+        body = self._read_json()
+        if url.path.endswith("/chat/completions"):
+            self._chat(body)
+        elif ":generateContent" in url.path:
+            self._gemini(url.path, body)
+        else:
+            self.send_error(404)
+
+    def _chat(self, body):
+        time.sleep(self.config.jitter(self.config.latency_ms))
+        if self._maybe_fail():
+            return
+        messages = body.get("messages", [])
+        model = body.get("model", "mock-model")
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        content = reply_for(messages, max_tokens, self.config)
+        prompt_tokens = _estimate_tokens(json.dumps(messages))
+        completion_tokens = _estimate_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        created = int(time.time())
+        completion_id = "chatcmpl-mock-" + hashlib.md5(content.encode()).hexdigest()[:12]
+
+        if not body.get("stream"):
+            if self.config.tokens_per_s:
+                time.sleep(completion_tokens / self.config.tokens_per_s)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop", "logprobs": None}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        pieces = _tokenize(content)
+        delay = 1.0 / self.config.tokens_per_s if self.config.tokens_per_s else 0.0
+        for i, piece in enumerate(pieces):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece} if i == 0
+                                  else {"content": piece}, "finish_reason": None, "logprobs": None}]}
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+            if delay:
+                time.sleep(delay)
+        final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop", "logprobs": None}],
+                 "x_groq": {"id": completion_id, "usage": usage}, "usage": usage}
+        self.wfile.write(b"data: " + json.dumps(final).encode("utf-8") + b"\n\n")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _gemini(self, path, body):
+        time.sleep(self.config.jitter(self.config.latency_ms))
+        if self._maybe_fail():
+            return
+        prompt = " ".join(part.get("text", "") for content in body.get("contents", [])
+                          for part in content.get("parts", []))
+        # Topic extraction style prompts get a short answer.
+        text = " ".join(_filler(4, prompt).split()[:4]).rstrip(".")
+        prompt_tokens = _estimate_tokens(prompt)
+        completion_tokens = _estimate_tokens(text)
+        if self.config.tokens_per_s:
+            time.sleep(completion_tokens / self.config.tokens_per_s)
+        self._send_json(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP",
+                            "index": 0}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": completion_tokens,
+                              "totalTokenCount": prompt_tokens + completion_tokens},
+            "modelVersion": path.split("/models/")[-1].split(":")[0],
+        })
+
+
+def start_mock_server(config=None, host="127.0.0.1", port=0):
+    """Start the mock server in a daemon thread; returns (server, base_url)."""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": config or MockConfig(),
+                                                            "telegram": TelegramLog()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_mock_arguments(parser):
+    """Mock server knobs, shared with llm_toolkit.benchmark."""
+    parser.add_argument("--latency-ms", type=float, default=250.0, help="LLM time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-s", type=float, default=300.0, help="0 disables token pacing")
+    parser.add_argument("--completion-tokens", type=int, default=180)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--serp-latency-ms", type=float, default=400.0)
+    parser.add_argument("--telegram-latency-ms", type=float, default=40.0, help="mock Bot API latency")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline mock of Groq/OpenAI, Gemini, SerpAPI and the Telegram Bot API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_mock_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def config_from_args(args):
+    return MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, tokens_per_s=args.tokens_per_s,
+                      completion_tokens=args.completion_tokens, error_rate=args.error_rate,
+                      error_status=args.error_status, serp_latency_ms=args.serp_latency_ms,
+                      telegram_latency_ms=args.telegram_latency_ms, seed=args.seed)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server, base_url = start_mock_server(config_from_args(args), args.host, args.port)
+    print(f"Mock server running at {base_url}")
+    print(f"  export GROQ_BASE_URL={base_url}")
+    print(f"  export TELEGRAM_API_URL={base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,140 @@
+# llm_toolkit/prompt_compaction.py
+"""
+Compact serialization of search results for LLM prompts.
+
+Raw SerpAPI objects carry thumbnails, links, tracking IDs and pretty-printed
+whitespace that the model never needs. `compact_records` keeps only the
+fields in a per-domain whitelist, drops empty/"N/A" values, truncates long
+text to a token budget and encodes the rows as a compact table or minified JSON.
+
+Print the before/after token report for every prompt builder with:
+  python -m llm_toolkit.prompt_compaction
+"""
+import json
+import re
+
+# Fields the model actually uses, in the order they are shown.
+DOMAIN_FIELDS = {
+    "products": ("title", "price", "rating", "reviews", "source", "extensions", "delivery"),
+    "books": ("title", "author", "category", "price", "rating", "description"),
+    "movies": ("title", "rating", "price", "description"),
+    "videos": ("title", "channel", "views", "length", "published_date"),
+}
+
+# Token budget per long text field, per domain.
+TEXT_BUDGETS = {
+    "books": {"description": 60},
+    "movies": {"description": 50},
+    "products": {"title": 24},
+}
+
+EMPTY_VALUES = (None, "", "N/A", [], {})
+
+try:
+    import tiktoken  # optional: exact counts for the report
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def estimate_tokens(text):
+        return len(_encoding.encode(text))
+
+except ImportError:
+
+    def estimate_tokens(text):
+        """Rough token count: about four characters per token for English/JSON."""
+        return max(1, round(len(text) / 4)) if text else 0
+
+
+def truncate_to_tokens(text, budget):
+    """Cut `text` at a word boundary so it fits roughly `budget` tokens."""
+    text = " ".join(str(text).split())
+    if estimate_tokens(text) <= budget:
+        return text
+    words = text.split(" ")
+    kept = []
+    for word in words:
+        if estimate_tokens(" ".join(kept + [word])) > budget:
+            break
+        kept.append(word)
+    return " ".join(kept).rstrip(",.;:") + "…"
+
+
+def _flatten(value):
+    if isinstance(value, dict):
+        return value.get("name") or value.get("title") or ", ".join(str(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+def compact_record(record, domain):
+    """Whitelisted, flattened, truncated copy of one record."""
+    budgets = TEXT_BUDGETS.get(domain, {})
+    compact = {}
+    for field in DOMAIN_FIELDS[domain]:
+        value = _flatten(record.get(field))
+        if value in EMPTY_VALUES:
+            continue
+        if field in budgets:
+            value = truncate_to_tokens(value, budgets[field])
+        compact[field] = value
+    return compact
+
+
+def compact_records(records, domain, fmt="table"):
+    """
+    Encode records for a prompt.
+
+    fmt="table": a header line of field names and one "|"-separated row per record.
+    fmt="json":  minified JSON list of the whitelisted fields.
+    """
+    rows = [compact_record(record, domain) for record in records]
+    if fmt == "json":
+        return json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+
+    fields = [field for field in DOMAIN_FIELDS[domain] if any(field in row for row in rows)]
+    lines = ["|".join(fields)]
+    for row in rows:
+        lines.append("|".join(re.sub(r"[|\n]", " ", str(row.get(field, ""))) for field in fields))
+    return "\n".join(lines)
+
+
+def _report_rows():
+    """Token counts of each app's prompt payload before and after compaction, on mock-server fixtures."""
+    from llm_toolkit.mock_server import play_items, shopping_results, video_results
+
+    products = shopping_results("wireless headphones")[:5]
+    # fetch_books() in "AI  Book Analysis" reshapes the Play items like this before get_best_book.
+    books = [{
+        "title": item.get("title", "N/A"),
+        "author": item.get("author", "N/A"),
+        "volume": item.get("extension", {}).get("name", "N/A"),
+        "category": item.get("category", "N/A"),
+        "price": item.get("price", "N/A"),
+        "rating": item.get("rating", "N/A"),
+        "description": item.get("description", "N/A"),
+        "link": item.get("link", "N/A"),
+        "thumbnail": item.get("thumbnail", "N/A"),
+    } for item in play_items("book", "python programming")][0:10]
+    movies = play_items("movie", "1")[:10]
+    videos = video_results("sourdough baking")[:5]
+
+    cases = [
+        ("analyze_products (AI Shopping Recommender)", json.dumps(products, indent=2),
+         compact_records(products, "products")),
+        ("get_best_book (AI Book Analysis)", json.dumps(books, indent=2), compact_records(books, "books")),
+        ("get_enhanced_recommendations (AI Movie Recommender)",
+         "\n".join(f"{m['title']}: {m['description']}" for m in movies), compact_records(movies, "movies")),
+        ("video results (YouTube Search Assistant)", json.dumps(videos, indent=2), compact_records(videos, "videos")),
+    ]
+    rows = []
+    for name, before, after in cases:
+        before_tokens, after_tokens = estimate_tokens(before), estimate_tokens(after)
+        rows.append((name, before_tokens, after_tokens, 100.0 * (1 - after_tokens / before_tokens)))
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"{'prompt builder':<55}{'before':>8}{'after':>8}{'saved':>8}")
+    for name, before, after, saved in _report_rows():
+        print(f"{name:<55}{before:>8}{after:>8}{saved:>7.0f}%")
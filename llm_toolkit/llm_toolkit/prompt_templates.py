@@ -0,0 +1,55 @@
+# llm_toolkit/prompt_templates.py
+"""
+Prompt templates with a fixed, cacheable prefix.
+
+Groq and OpenAI-compatible backends reuse the KV cache of a prompt prefix they
+have already seen, but only if it is byte-identical. A `PromptTemplate` is
+compiled once at import time: the system message and the static part of the
+user message are frozen strings, and only the `{fields}` of the suffix are
+filled in per request, always after the static text.
+
+    PLAN = PromptTemplate("lesson_plan", app="lesson_planner",
+                          system="You are an expert educator...",
+                          prefix=STATIC_INSTRUCTIONS,
+                          suffix="Subject: {subject}\\nObjectives: {objectives}")
+    client.chat.completions.create(messages=PLAN.messages(subject=..., objectives=...), ...)
+
+The prefix is never passed through str.format, so it may contain JSON braces.
+Every render is timed and reported with `metrics.record_prompt_build`.
+"""
+import hashlib
+import string
+import time
+
+from llm_toolkit.metrics import record_prompt_build
+
+
+class PromptTemplate:
+    """A system message and a user message split into a static prefix and a formatted suffix."""
+
+    def __init__(self, name, prefix="", suffix="", system=None, app="unknown"):
+        self.name = name
+        self.app = app
+        self.system = system
+        self.prefix = prefix
+        self.suffix = suffix
+        self.fields = tuple(field for _, field, _, _ in string.Formatter().parse(suffix) if field)
+        # Identifies the cacheable part, e.g. to check that two deployments send the same prefix.
+        self.prefix_hash = hashlib.sha256(((system or "") + "\x00" + prefix).encode("utf-8")).hexdigest()[:12]
+
+    def render(self, **fields):
+        """The user message: the static prefix followed by the filled-in suffix."""
+        started = time.perf_counter()
+        missing = [field for field in self.fields if field not in fields]
+        if missing:
+            raise KeyError(f"{self.name}: missing template fields {', '.join(missing)}")
+        text = self.prefix + self.suffix.format(**fields)
+        record_prompt_build(self.app, self.name, (time.perf_counter() - started) * 1000,
+                            len(self.prefix), len(text))
+        return text
+
+    def messages(self, **fields):
+        """Chat messages with the system prompt first, so the shared prefix spans both messages."""
+        messages = [{"role": "system", "content": self.system}] if self.system else []
+        messages.append({"role": "user", "content": self.render(**fields)})
+        return messages
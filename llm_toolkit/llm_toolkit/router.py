@@ -0,0 +1,332 @@
+# llm_toolkit/router.py
+"""
+Backend router for the Groq-based apps.
+
+`wrap_client(client, app)` returns an object with the same
+`chat.completions.create(...)` surface as the Groq client, but every call is
+routed between three backends:
+
+  - "groq":    the app's own Groq client (primary).
+  - "ollama":  a local Ollama server through its OpenAI-compatible endpoint
+               (see Deepseek/ollama.py), used when Groq is rate-limited,
+               saturated, offline or slower than the app's latency budget.
+  - "offline": a deterministic in-process responder that needs no network,
+               for tests, benchmarks and degraded operation. Its responses (and
+               stream chunks) carry `degraded=True`; check `is_degraded(response)`
+               before caching or persisting a reply.
+
+Configuration:
+  LLM_BACKEND         Force a single backend for every app (e.g. "offline").
+  LLM_ROUTER_CONFIG   Path to a JSON file: {"default": {...}, "apps": {"<app>": {...}}}
+  OLLAMA_BASE_URL     Defaults to http://localhost:11434/v1/
+  OLLAMA_MODEL        Default local model when an app rule does not name one.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from llm_toolkit.metrics import current_backend, instrument_client
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1/")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+
+DEFAULT_RULES = {
+    "primary": "groq",
+    "fallbacks": ["ollama", "offline"],
+    "latency_budget_ms": 15000,  # prefer a fallback once the primary is slower than this
+    "request_timeout_s": 60,  # hard per-call timeout on every backend but the last resort
+    "max_inflight": 8,  # more concurrent calls than this means the primary queue is saturated
+    "cooldown_s": 30,  # how long a rate-limited/offline backend is skipped
+    "probe_interval_s": 60,  # how often a slow primary is retried anyway
+    "ollama_model": None,
+}
+
+# Per-app overrides. Interactive bots get tight budgets, long generations get loose ones.
+APP_RULES = {
+    "lesson_planner": {"latency_budget_ms": 45000, "request_timeout_s": 120},
+    "design_lens": {"latency_budget_ms": 30000, "ollama_model": "llama3.2-vision"},
+    "caption_hashtag_recommender": {"latency_budget_ms": 20000, "ollama_model": "llama3.2-vision"},
+    "would_you_rather": {"latency_budget_ms": 4000},
+    "fact_wizard": {"latency_budget_ms": 4000},
+    "book_recommendation": {"latency_budget_ms": 8000},
+    "ai_mealplanner": {"latency_budget_ms": 10000},
+}
+
+# Exceptions that mean "try somewhere else" rather than "the request is wrong".
+ROUTABLE_ERRORS = {
+    "RateLimitError",
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "ConnectionError",
+    "TimeoutError",
+    "ReadTimeout",
+    "ConnectTimeout",
+}
+# 429 rate limit, 498 Groq flex-tier capacity exceeded, 5xx upstream trouble.
+ROUTABLE_STATUS = {429, 498, 500, 502, 503, 504}
+
+
+class RouterError(RuntimeError):
+    """Raised when no backend could serve a request."""
+
+
+def load_rules(app):
+    """Merge DEFAULT_RULES, APP_RULES and the optional LLM_ROUTER_CONFIG file for one app."""
+    rules = dict(DEFAULT_RULES)
+    rules.update(APP_RULES.get(app, {}))
+
+    config_path = os.getenv("LLM_ROUTER_CONFIG")
+    if config_path and os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        rules.update(config.get("default", {}))
+        rules.update(config.get("apps", {}).get(app, {}))
+
+    forced = os.getenv("LLM_BACKEND")
+    if forced:
+        rules["primary"] = forced
+        rules["fallbacks"] = []
+    return rules
+
+
+def is_routable_error(exc):
+    """Return True if the error should trip the backend and move on to the next one."""
+    if type(exc).__name__ in ROUTABLE_ERRORS:
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in ROUTABLE_STATUS
+
+
+def _last_user_text(messages):
+    for message in reversed(messages or []):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content", "")
+        if isinstance(content, list):
+            return " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+        return content
+    return ""
+
+
+def is_degraded(response):
+    """True for a completion or stream chunk produced by the offline backend instead of a real model."""
+    return getattr(response, "degraded", False) is True
+
+
+def _completion(content, model, prompt_tokens=0):
+    """Build an offline response object shaped like a Groq/OpenAI chat completion."""
+    completion_tokens = max(1, len(content) // 4)
+    return SimpleNamespace(
+        id="offline-" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:12],
+        model=model,
+        created=int(time.time()),
+        degraded=True,
+        choices=[SimpleNamespace(
+            index=0,
+            finish_reason="stop",
+            message=SimpleNamespace(role="assistant", content=content),
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+    )
+
+
+def _stream_chunks(content, model, chunk_chars=16):
+    """Yield offline chat.completion.chunk-shaped objects for `content`."""
+    for start in range(0, len(content), chunk_chars):
+        yield SimpleNamespace(
+            model=model,
+            degraded=True,
+            choices=[SimpleNamespace(
+                index=0,
+                finish_reason=None,
+                delta=SimpleNamespace(role="assistant", content=content[start:start + chunk_chars]),
+            )],
+            usage=None,
+        )
+    yield SimpleNamespace(
+        model=model,
+        degraded=True,
+        choices=[SimpleNamespace(index=0, finish_reason="stop", delta=SimpleNamespace(role=None, content=None))],
+        usage=None,
+    )
+
+
+class OfflineBackend:
+    """
+    In-process backend that never touches the network.
+
+    `responder(**create_kwargs) -> str` decides the reply; the default is a
+    deterministic acknowledgement so the apps keep working in degraded mode.
+    Every response is marked degraded (see `is_degraded`), so apps can show it
+    without caching it as if a model had written it.
+    """
+
+    name = "offline"
+
+    def __init__(self, responder=None, latency_s=0.0):
+        self.responder = responder or self.default_responder
+        self.latency_s = latency_s
+
+    @staticmethod
+    def default_responder(messages=None, **kwargs):
+        text = _last_user_text(messages).strip().replace("\n", " ")
+        return f"The AI service is temporarily unavailable. (offline reply to: {text[:80]})"
+
+    def create(self, **kwargs):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        messages = kwargs.get("messages", [])
+        model = kwargs.get("model", "offline")
+        content = self.responder(**kwargs)
+        if kwargs.get("stream"):
+            return _stream_chunks(content, model)
+        prompt_chars = sum(len(json.dumps(m.get("content", ""))) for m in messages)
+        return _completion(content, model, prompt_tokens=prompt_chars // 4)
+
+
+class ClientBackend:
+    """Adapter for any client exposing chat.completions.create (Groq, OpenAI, Ollama)."""
+
+    def __init__(self, name, client, model=None):
+        self.name = name
+        self.client = client
+        self.model = model
+
+    def create(self, **kwargs):
+        if self.model:
+            kwargs["model"] = self.model
+        return self.client.chat.completions.create(**kwargs)
+
+
+class LazyOllamaBackend(ClientBackend):
+    """Ollama backend whose OpenAI client is only built on first use."""
+
+    def __init__(self, model=None, base_url=OLLAMA_BASE_URL):
+        super().__init__("ollama", None, model or OLLAMA_MODEL)
+        self.base_url = base_url
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        if self.client is None:
+            with self._lock:
+                if self.client is None:
+                    try:
+                        from openai import OpenAI  # optional dependency, only needed for Ollama
+                    except ImportError:
+                        raise ConnectionError("The 'openai' package is required for the Ollama backend.")
+
+                    self.client = OpenAI(base_url=self.base_url, api_key="ollama")  # key required but ignored
+        # Ollama only understands the older max_tokens name.
+        if "max_completion_tokens" in kwargs:
+            kwargs.setdefault("max_tokens", kwargs.pop("max_completion_tokens"))
+        return super().create(**kwargs)
+
+
+class _BackendState:
+    """Health bookkeeping for one backend."""
+
+    def __init__(self):
+        self.inflight = 0
+        self.ewma_latency_ms = None
+        self.open_until = 0.0
+        self.last_attempt = 0.0
+
+    def record_latency(self, elapsed_ms, alpha=0.3):
+        if self.ewma_latency_ms is None:
+            self.ewma_latency_ms = elapsed_ms
+        else:
+            self.ewma_latency_ms = alpha * elapsed_ms + (1 - alpha) * self.ewma_latency_ms
+
+
+class BackendRouter:
+    """Drop-in replacement for a Groq client that routes each call to a healthy backend."""
+
+    def __init__(self, app, backends, rules=None):
+        self.app = app
+        self.backends = backends
+        self.rules = rules or load_rules(app)
+        self._state = {name: _BackendState() for name in backends}
+        self._lock = threading.Lock()
+        self.last_backend = None
+        # Mirror the client surface: router.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def candidates(self):
+        """Backends to try for the next call, best first."""
+        order = [self.rules["primary"]] + list(self.rules.get("fallbacks", []))
+        order = [name for name in order if name in self.backends]
+        now = time.monotonic()
+        usable, deferred = [], []
+        for name in order:
+            state = self._state[name]
+            if state.open_until > now:
+                continue
+            if state.inflight >= self.rules["max_inflight"]:
+                deferred.append(name)
+                continue
+            too_slow = (state.ewma_latency_ms or 0) > self.rules["latency_budget_ms"]
+            if too_slow and now - state.last_attempt < self.rules["probe_interval_s"]:
+                deferred.append(name)
+                continue
+            usable.append(name)
+        # Saturated or slow backends are still better than nothing.
+        return usable + deferred or order[-1:]
+
+    def create(self, **kwargs):
+        names = self.candidates()
+        last_error = None
+        for position, name in enumerate(names):
+            state = self._state[name]
+            call_kwargs = dict(kwargs)
+            # The latency budget only steers candidates(); a call that is merely slower than the budget
+            # still completes, and only a backend that hangs past the real timeout is abandoned.
+            if position < len(names) - 1 and "timeout" not in call_kwargs and name != "offline":
+                call_kwargs["timeout"] = self.rules["request_timeout_s"]
+            with self._lock:
+                state.inflight += 1
+                state.last_attempt = time.monotonic()
+            started = time.perf_counter()
+            try:
+                response = self.backends[name].create(**call_kwargs)
+            except Exception as e:
+                if not is_routable_error(e):
+                    raise
+                last_error = e
+                with self._lock:
+                    state.open_until = time.monotonic() + self.rules["cooldown_s"]
+                continue
+            finally:
+                with self._lock:
+                    state.inflight -= 1
+            with self._lock:
+                state.record_latency((time.perf_counter() - started) * 1000)
+            self.last_backend = name
+            current_backend.set(name)
+            return response
+        raise RouterError(f"No backend could serve {self.app!r}: {last_error}") from last_error
+
+
+def wrap_client(client, app, **rule_overrides):
+    """
+    Wrap an app's Groq client in a BackendRouter with the default backend set,
+    instrumented with llm_toolkit.metrics.
+
+    Usage in an app:
+        client = wrap_client(Groq(api_key=os.getenv("GROQ")), app="ai_book_analysis")
+    """
+    rules = load_rules(app)
+    rules.update(rule_overrides)
+    backends = {
+        "groq": ClientBackend("groq", client),
+        "ollama": LazyOllamaBackend(model=rules.get("ollama_model")),
+        "offline": OfflineBackend(),
+    }
+    return instrument_client(BackendRouter(app, backends, rules), app)
@@ -0,0 +1,313 @@
+# llm_toolkit/streaming_json.py
+"""
+Incremental JSON parsing of streamed LLM completions.
+
+`StreamingJSONParser.feed(text)` consumes a completion chunk by chunk and
+returns `(path, value)` for every value that has just been closed, e.g.
+`(("sections", 0), {...})` as soon as the first lesson section's `}` arrives.
+The finished document is reported with the empty path `()`.
+
+Leading prose or a ```json fence is skipped, anything after the document is
+ignored. An optional schema lets the parser give up as soon as the reply
+clearly diverges from the expected shape, so the caller can close the stream
+instead of paying for the rest of a bad generation:
+
+    schema = {"sections": [{"title": str, "activities": [str]}], "resources": [str]}
+
+A dict spec means "object with at least these keys", a one-element list spec
+means "array of", a type (str, int, float, bool, dict, list) is a type check
+and None accepts anything. Unknown keys and null values are allowed.
+"""
+import json
+
+_WHITESPACE = " \t\r\n"
+_NUMBER_TYPES = (int, float)
+
+
+class JSONStreamError(ValueError):
+    """The stream is not valid JSON, or not the JSON the schema describes."""
+
+    def __init__(self, message, path=()):
+        super().__init__(message)
+        self.path = path
+
+
+class _Frame:
+    __slots__ = ("container", "path", "key", "expect")
+
+    def __init__(self, container, path):
+        self.container = container
+        self.path = path
+        self.key = None
+        # dict: "key", "colon", "value", "comma"; list: "value", "comma"
+        self.expect = "key" if isinstance(container, dict) else "value"
+
+
+def _spec_at(schema, path):
+    """Schema spec for a path, or None if the schema says nothing about it."""
+    spec = schema
+    for part in path:
+        if isinstance(spec, dict):
+            spec = spec.get(part)
+        elif isinstance(spec, list) and spec:
+            spec = spec[0]
+        else:
+            return None
+    return spec
+
+
+def _kind_matches(spec, kind):
+    if spec is None or kind is type(None):
+        return True
+    if isinstance(spec, dict) or spec is dict:
+        return kind is dict
+    if isinstance(spec, list) or spec is list:
+        return kind is list
+    if spec in _NUMBER_TYPES:
+        return kind in _NUMBER_TYPES and kind is not bool
+    return kind is spec
+
+
+def _format_path(path):
+    return "".join(f"[{part}]" if isinstance(part, int) else f".{part}" for part in path) or "<root>"
+
+
+class StreamingJSONParser:
+    """
+    Push parser for one JSON document.
+
+    emit_depth limits which closed values are reported: 1 reports top-level fields,
+    2 also their items (each `sections[i]`), and so on. The root is always reported.
+    """
+
+    def __init__(self, schema=None, emit_depth=2, max_preamble=500):
+        self.schema = schema
+        self.emit_depth = emit_depth
+        self.max_preamble = max_preamble
+        self.done = False
+        self._root = None
+        self._stack = []
+        self._preamble = 0
+        self._token = None  # characters of the string/number/literal being read
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def partial(self):
+        """The document as parsed so far (open containers included)."""
+        return self._root
+
+    def feed(self, text):
+        events = []
+        for char in text:
+            if self.done:
+                break
+            self._consume(char, events)
+        return events
+
+    def close(self):
+        """Finish the document; raises JSONStreamError if it is incomplete."""
+        if not self.done and self._token is not None and not self._in_string and not self._stack:
+            self._finish_scalar([])  # bare top-level number/literal
+        if not self.done:
+            raise JSONStreamError("stream ended before the JSON document was complete",
+                                  self._stack[-1].path if self._stack else ())
+        return self._root
+
+    # -- character handling ------------------------------------------------
+
+    def _consume(self, char, events):
+        if self._in_string:
+            self._consume_string(char, events)
+            return
+        if self._token is not None:
+            if char not in _WHITESPACE and char not in ",]}":
+                self._token.append(char)
+                return
+            self._finish_scalar(events)
+            if self.done:
+                return
+
+        if not self._stack and self._root is None:
+            if char in "{[":
+                self._open(char)
+            else:
+                self._preamble += 1
+                if self._preamble > self.max_preamble:
+                    raise JSONStreamError(f"no JSON after {self.max_preamble} characters")
+            return
+
+        if char in _WHITESPACE:
+            return
+        frame = self._stack[-1]
+        if char == '"':
+            if frame.expect == "key":
+                self._start_string()
+                return
+            self._expect_value(frame, char)
+            self._check_kind(self._value_path(frame), str)
+            self._start_string()
+        elif char in "{[":
+            self._expect_value(frame, char)
+            self._open(char)
+        elif char == ":":
+            if frame.expect != "colon":
+                self._fail("unexpected ':'", frame.path)
+            frame.expect = "value"
+        elif char == ",":
+            if frame.expect != "comma":
+                self._fail("unexpected ','", frame.path)
+            frame.expect = "key" if isinstance(frame.container, dict) else "value"
+        elif char in "}]":
+            self._close(char, frame, events)
+        else:
+            self._expect_value(frame, char)
+            self._token = [char]
+
+    def _consume_string(self, char, events):
+        if self._escaped:
+            self._escaped = False
+            self._token.append(char)
+        elif char == "\\":
+            self._escaped = True
+            self._token.append(char)
+        elif char == '"':
+            self._in_string = False
+            try:
+                value = json.loads('"' + "".join(self._token) + '"')
+            except json.JSONDecodeError as e:
+                self._fail(f"invalid string: {e}", self._stack[-1].path)
+            self._token = None
+            frame = self._stack[-1]
+            if frame.expect == "key":
+                frame.key = value
+                frame.expect = "colon"
+            else:
+                self._attach(value, events)
+        else:
+            self._token.append(char)
+
+    def _start_string(self):
+        self._in_string = True
+        self._token = []
+
+    def _finish_scalar(self, events):
+        text = "".join(self._token)
+        self._token = None
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            self._fail(f"invalid literal {text!r}", self._stack[-1].path if self._stack else ())
+        if self._stack:
+            self._check_kind(self._value_path(self._stack[-1]), type(value))
+        self._attach(value, events)
+
+    # -- structure ---------------------------------------------------------
+
+    def _expect_value(self, frame, char):
+        if frame.expect != "value":
+            self._fail(f"unexpected {char!r}", frame.path)
+
+    def _value_path(self, frame):
+        if isinstance(frame.container, dict):
+            return frame.path + (frame.key,)
+        return frame.path + (len(frame.container),)
+
+    def _open(self, char):
+        container = {} if char == "{" else []
+        if self._stack:
+            frame = self._stack[-1]
+            path = self._value_path(frame)
+            self._check_kind(path, type(container))
+            self._store(frame, container)
+        else:
+            path = ()
+            self._check_kind(path, type(container))
+            self._root = container
+        self._stack.append(_Frame(container, path))
+
+    def _close(self, char, frame, events):
+        is_dict = isinstance(frame.container, dict)
+        if (char == "}") != is_dict:
+            self._fail(f"unexpected {char!r}", frame.path)
+        closes_empty = not frame.container and frame.expect == ("key" if is_dict else "value")
+        if frame.expect != "comma" and not closes_empty:
+            self._fail(f"unexpected {char!r}", frame.path)
+        spec = _spec_at(self.schema, frame.path)
+        if is_dict and isinstance(spec, dict):
+            missing = [key for key in spec if key not in frame.container]
+            if missing:
+                self._fail(f"missing {', '.join(missing)}", frame.path)
+        self._stack.pop()
+        self._emit(frame.path, frame.container, events)
+
+    def _attach(self, value, events):
+        if not self._stack:
+            self._root = value
+            self._emit((), value, events)
+            return
+        frame = self._stack[-1]
+        path = self._value_path(frame)
+        self._store(frame, value)
+        self._emit(path, value, events)
+
+    @staticmethod
+    def _store(frame, value):
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+        frame.expect = "comma"
+
+    def _emit(self, path, value, events):
+        if not path:
+            self.done = True
+            events.append((path, value))
+        elif len(path) <= self.emit_depth:
+            events.append((path, value))
+
+    def _check_kind(self, path, kind):
+        if self.schema is None:
+            return
+        spec = _spec_at(self.schema, path)
+        if not _kind_matches(spec, kind):
+            expected = spec.__name__ if isinstance(spec, type) else type(spec).__name__
+            self._fail(f"expected {expected}, got {kind.__name__}", path)
+
+    @staticmethod
+    def _fail(message, path):
+        raise JSONStreamError(f"{_format_path(path)}: {message}", path)
+
+
+def stream_text(stream):
+    """Text deltas of an OpenAI/Groq-style streaming completion; closing it closes the stream."""
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+
+def iter_json_stream(chunks, schema=None, emit_depth=2):
+    """
+    Feed text chunks to a parser and yield its events; the last one has the path ().
+
+    The source is closed as soon as parsing stops, whether the document is complete,
+    the reply diverges from the schema (JSONStreamError) or the caller stops iterating,
+    so no further tokens are generated for a reply that will be thrown away.
+    """
+    parser = StreamingJSONParser(schema, emit_depth)
+    try:
+        for text in chunks:
+            for event in parser.feed(text):
+                yield event
+            if parser.done:
+                return
+        parser.close()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,582 @@
+# llm_toolkit/telegram_webhook.py
+"""
+Webhook deployment for the python-telegram-bot apps: several bots behind one ASGI server.
+
+Telegram POSTs every update to <public url>/<bot name>. The endpoint checks the secret token,
+puts the update on the bot's bounded queue and answers at once; a pool of workers per bot runs the
+handlers. Updates of one chat are handled one at a time and in order, different chats in parallel.
+When a bot's queue is full the endpoint answers 503 and Telegram delivers the update again later.
+
+Each bot still polls by default and switches to webhook mode when TELEGRAM_WEBHOOK_URL is set:
+  TELEGRAM_WEBHOOK_URL=https://bots.example.com python book_recommendation.py
+
+Several bots in one server, with their handlers spread over worker processes ("shards"). The front
+process accepts every request and routes it by chat, so a chat (and its albums) always reaches the same
+shard; bots that keep process-wide state (WEBHOOK_SINGLE_PROCESS = True) all run in shard 0:
+  python -m llm_toolkit.telegram_webhook serve --public-url https://bots.example.com --processes 4 \\
+      --bot caption=caption_hashtag_recommender/caption_hashtag_recommender.py \\
+      --bot books=book_recommendation/book_recommendation.py
+
+With TELEGRAM_API_URL pointing at llm_toolkit.mock_server the bots talk to a local Bot API stand-in,
+and `send` plays the part of Telegram:
+  python -m llm_toolkit.telegram_webhook send --url http://127.0.0.1:8443/books --chats 20 --messages 5
+"""
+import argparse
+import asyncio
+import hmac
+import importlib.util
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_toolkit.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8443
+MAX_BODY_BYTES = 1 << 20
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+class ChatOrderedQueue:
+    """
+    Bounded queue that hands out at most one update per chat at a time.
+
+    A chat's updates wait in its own deque; the chat itself is queued as "ready" while it has work and
+    no worker holds it. A worker takes a ready chat, handles its oldest update and calls done(key), which
+    queues the chat again if more updates arrived meanwhile. Chats are served round-robin.
+    """
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self.size = 0  # updates waiting, not counting those being handled
+        self.in_flight = 0
+        self._pending = {}  # chat key -> deque of updates
+        self._ready = asyncio.Queue()
+
+    @property
+    def idle(self):
+        return self.size == 0 and self.in_flight == 0
+
+    def put(self, key, item):
+        """Queue an update; False when the queue is full."""
+        if self.size >= self.max_pending:
+            return False
+        self.size += 1
+        if key in self._pending:
+            self._pending[key].append(item)  # the chat is already ready or being handled
+        else:
+            self._pending[key] = deque([item])
+            self._ready.put_nowait(key)
+        return True
+
+    async def get(self):
+        key = await self._ready.get()
+        self.size -= 1
+        self.in_flight += 1
+        return key, self._pending[key].popleft()
+
+    def done(self, key):
+        self.in_flight -= 1
+        if self._pending[key]:
+            self._ready.put_nowait(key)
+        else:
+            del self._pending[key]
+
+
+def chat_key(update_data):
+    """Ordering key of a raw update: its chat, else its sender, else the update itself."""
+    for value in update_data.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+        user = value.get("from")
+        if user and "id" in user:
+            return f"user:{user['id']}"
+    return f"update:{update_data.get('update_id')}"
+
+
+class BotEndpoint:
+    """One bot: its Application, update queue and worker pool."""
+
+    def __init__(self, name, build_application, workers=8, max_pending=1000, on_done=None):
+        self.name = name
+        self.build_application = build_application
+        self.workers = workers
+        self.on_done = on_done  # called after every handled update, e.g. to acknowledge it to the front process
+        self.queue = None
+        self.application = None
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._max_pending = max_pending
+        self._tasks = []
+
+    async def start(self, webhook_url=None, secret_token=None, max_connections=40):
+        from telegram import Update
+
+        # Same start-up order as Application.run_polling.
+        application = self.build_application()
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        self.application = application
+        if webhook_url:
+            await application.bot.set_webhook(url=webhook_url, secret_token=secret_token,
+                                              max_connections=max_connections, allowed_updates=Update.ALL_TYPES)
+            logger.info("Webhook for %s set to %s", self.name, webhook_url)
+        self.queue = ChatOrderedQueue(self._max_pending)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def submit(self, update_data):
+        """Queue a raw update; False (backpressure) when the queue is full or the bot is not running."""
+        if self.queue is None or not self.queue.put(chat_key(update_data), update_data):
+            self.rejected += 1
+            return False
+        return True
+
+    async def _work(self):
+        from telegram import Update
+
+        while True:
+            key, update_data = await self.queue.get()
+            try:
+                await self.application.process_update(Update.de_json(update_data, self.application.bot))
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("%s failed to process update %s", self.name, update_data.get("update_id"))
+            finally:
+                self.queue.done(key)
+                if self.on_done:
+                    self.on_done()
+
+    async def stop(self, drain_timeout=10.0):
+        """Finish the queued updates (up to drain_timeout), then shut the Application down."""
+        deadline = time.monotonic() + drain_timeout
+        while self.queue is not None and not self.queue.idle and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        application = self.application
+        if application is None:
+            return
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+    def stats(self):
+        return {
+            "pending": self.queue.size if self.queue else 0,
+            "in_flight": self.queue.in_flight if self.queue else 0,
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+class WebhookServer:
+    """
+    ASGI app serving POST /<bot name> for every endpoint and GET /healthz with queue statistics.
+    Bots are started and stopped through the ASGI lifespan protocol.
+    """
+
+    def __init__(self, endpoints, public_url=None, secret_token=None, max_connections=40):
+        self.endpoints = {endpoint.name: endpoint for endpoint in endpoints}
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.secret_token = secret_token
+        self.max_connections = max_connections
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    for name, endpoint in self.endpoints.items():
+                        webhook_url = f"{self.public_url}/{name}" if self.public_url else None
+                        await endpoint.start(webhook_url, self.secret_token, self.max_connections)
+                except Exception as e:
+                    logger.exception("Bot start-up failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for endpoint in self.endpoints.values():
+                    await endpoint.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        path = scope["path"].strip("/")
+        if scope["method"] == "GET" and path == "healthz":
+            await _respond(send, 200, {name: endpoint.stats() for name, endpoint in self.endpoints.items()})
+            return
+        endpoint = self.endpoints.get(path)
+        if endpoint is None or scope["method"] != "POST":
+            await _respond(send, 404, {"ok": False})
+            return
+        if self.secret_token:
+            headers = dict(scope["headers"])
+            if not hmac.compare_digest(headers.get(SECRET_HEADER, b""), self.secret_token.encode("utf-8")):
+                await _respond(send, 401, {"ok": False})
+                return
+
+        body = await _read_body(receive)
+        if body is None:
+            await _respond(send, 413, {"ok": False})
+            return
+        try:
+            update_data = json.loads(body)
+        except ValueError:
+            update_data = None
+        if not isinstance(update_data, dict):
+            await _respond(send, 400, {"ok": False})
+            return
+        if endpoint.submit(update_data):
+            await _respond(send, 200, {"ok": True})
+        else:
+            await _respond(send, 503, {"ok": False}, [(b"retry-after", b"1")])
+
+
+async def _read_body(receive):
+    """The request body, or None when it is larger than MAX_BODY_BYTES."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _respond(send, status, payload, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode("ascii")), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def application_builder(token):
+    """ApplicationBuilder for `token`, talking to TELEGRAM_API_URL (e.g. the mock server) when it is set."""
+    from telegram.ext import ApplicationBuilder
+
+    builder = ApplicationBuilder().token(token)
+    api_url = os.getenv("TELEGRAM_API_URL")
+    if api_url:
+        api_url = api_url.rstrip("/")
+        builder = builder.base_url(f"{api_url}/bot").base_file_url(f"{api_url}/file/bot")
+    return builder
+
+
+def settings_from_env():
+    """serve() keyword arguments from the TELEGRAM_WEBHOOK_* environment variables."""
+    return {
+        "host": os.getenv("TELEGRAM_WEBHOOK_HOST", "0.0.0.0"),
+        "port": int(os.getenv("TELEGRAM_WEBHOOK_PORT", str(DEFAULT_PORT))),
+        "workers": int(os.getenv("TELEGRAM_WEBHOOK_WORKERS", "8")),
+        "max_pending": int(os.getenv("TELEGRAM_WEBHOOK_MAX_PENDING", "1000")),
+        "processes": int(os.getenv("TELEGRAM_WEBHOOK_PROCESSES", "1")),
+        "secret_token": os.getenv("TELEGRAM_WEBHOOK_SECRET") or None,
+        "max_connections": int(os.getenv("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "40")),
+    }
+
+
+class ShardedEndpoint:
+    """
+    The front process's stand-in for a bot whose Applications run in shard processes.
+
+    Updates go to the shard picked by a hash of their chat key, so one chat's updates (and albums) are
+    always handled by the same shard, in order. A single-process bot only runs in shard 0. At most
+    max_pending updates per shard are outstanding; beyond that the endpoint answers 503.
+    """
+
+    def __init__(self, name, inboxes, single_process=False, max_pending=1000):
+        self.name = name
+        self.inboxes = inboxes
+        self.single_process = single_process
+        self.max_pending = max_pending
+        self.outstanding = [0] * len(inboxes)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    async def start(self, webhook_url=None, secret_token=None, max_connections=40):
+        pass  # the shards run the Application; shard 0 registers the webhook
+
+    async def stop(self, drain_timeout=10.0):
+        pass  # serve() drains and stops the shards after the front server has exited
+
+    def shard_of(self, key):
+        if self.single_process:
+            return 0
+        return zlib.crc32(str(key).encode("utf-8")) % len(self.inboxes)
+
+    def submit(self, update_data):
+        shard = self.shard_of(chat_key(update_data))
+        with self._lock:
+            if self.outstanding[shard] >= self.max_pending:
+                self.rejected += 1
+                return False
+            self.outstanding[shard] += 1
+        self.inboxes[shard].put((self.name, update_data))
+        return True
+
+    def done(self, shard):
+        with self._lock:
+            self.outstanding[shard] -= 1
+
+    def stats(self):
+        with self._lock:
+            outstanding = list(self.outstanding)
+        return {"pending": sum(outstanding), "per_shard": outstanding, "single_process": self.single_process,
+                "rejected": self.rejected}
+
+
+def serve(bots, public_url=None, host="0.0.0.0", port=DEFAULT_PORT, workers=8, max_pending=1000, processes=1,
+          secret_token=None, max_connections=40, single_process=()):
+    """
+    Serve `bots` ({name: build_application}) until interrupted.
+
+    With processes > 1 this process only accepts requests and the handlers run in that many forked
+    shard processes, each with its own worker pools. Updates are routed by chat, so per-chat ordering
+    holds across the whole server. Bots named in `single_process` keep process-wide state (a queue or a
+    mirror saved to a file, a background refill task started by post_init), so they are built, started
+    and fed only in shard 0. Shard 0 also registers the webhooks.
+    """
+    try:
+        import uvicorn  # noqa: F401  (optional dependency, only needed for webhook mode)
+    except ImportError:
+        raise RuntimeError("Webhook mode needs uvicorn: pip install 'llm_toolkit[webhook]'")
+
+    if processes <= 1:
+        endpoints = [BotEndpoint(name, build, workers, max_pending) for name, build in bots.items()]
+        _run_server(WebhookServer(endpoints, public_url, secret_token, max_connections), host, port)
+        return
+
+    import multiprocessing
+
+    context = multiprocessing.get_context("fork")
+    inboxes = [context.Queue() for _ in range(processes)]
+    acks = context.Queue()
+    shards = [context.Process(target=_run_shard, name=f"webhook-shard-{index}",
+                              args=(index, bots, set(single_process), inboxes[index], acks, public_url, workers,
+                                    max_pending, secret_token, max_connections))
+              for index in range(processes)]
+    for shard in shards:
+        shard.start()
+    endpoints = [ShardedEndpoint(name, inboxes, name in single_process, max_pending) for name in bots]
+    collector = threading.Thread(target=_collect_acks, args=(acks, {e.name: e for e in endpoints}),
+                                 name="webhook-acks", daemon=True)
+    collector.start()
+    try:
+        _run_server(WebhookServer(endpoints, None, secret_token, max_connections), host, port)
+    finally:
+        for inbox in inboxes:
+            inbox.put(None)  # each shard finishes what it has queued, then shuts its bots down
+        for shard in shards:
+            shard.join()
+        acks.put(None)
+
+
+def _run_server(app, host, port):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, lifespan="on", access_log=False))
+    asyncio.run(server.serve())
+
+
+def _collect_acks(acks, endpoints):
+    """Front-process thread: release a shard's slot whenever it has handled one of our updates."""
+    while True:
+        ack = acks.get()
+        if ack is None:
+            return
+        name, shard = ack
+        endpoints[name].done(shard)
+
+
+def _run_shard(index, bots, single_process, inbox, acks, public_url, workers, max_pending, secret_token,
+               max_connections):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C stops the front process, which then stops the shards
+    asyncio.run(_shard_main(index, bots, single_process, inbox, acks, public_url, workers, max_pending,
+                            secret_token, max_connections))
+
+
+async def _shard_main(index, bots, single_process, inbox, acks, public_url, workers, max_pending, secret_token,
+                      max_connections):
+    public_url = public_url.rstrip("/") if public_url else None
+    endpoints = {}
+    try:
+        for name, build in bots.items():
+            if index != 0 and name in single_process:
+                continue
+            endpoint = BotEndpoint(name, build, workers, max_pending,
+                                   on_done=lambda name=name: acks.put((name, index)))
+            endpoints[name] = endpoint
+            webhook_url = f"{public_url}/{name}" if public_url and index == 0 else None
+            await endpoint.start(webhook_url, secret_token, max_connections)
+        while True:
+            item = await asyncio.to_thread(inbox.get)
+            if item is None:
+                break
+            name, update_data = item
+            endpoint = endpoints.get(name)
+            if endpoint is None or not endpoint.submit(update_data):
+                logger.error("Shard %s dropped an update for %s", index, name)
+                acks.put((name, index))
+    finally:
+        for endpoint in endpoints.values():
+            await endpoint.stop()
+
+
+def run_bot(build_application, name, single_process=False):
+    """
+    A bot's entry point: polling, or webhook mode (configured by environment) when TELEGRAM_WEBHOOK_URL is set.
+    A single_process bot keeps process-wide state and is never run in more than one process.
+    """
+    public_url = os.getenv("TELEGRAM_WEBHOOK_URL")
+    if not public_url:
+        build_application().run_polling()
+        return
+    settings = settings_from_env()
+    if single_process and settings["processes"] > 1:
+        logger.warning("%s keeps process-wide state; ignoring TELEGRAM_WEBHOOK_PROCESSES=%s",
+                       name, settings["processes"])
+        settings["processes"] = 1
+    serve({name: build_application}, public_url=public_url, **settings)
+
+
+def load_bot(spec):
+    """
+    "name=path/to/bot.py" -> (name, build_application, single_process). The bot file must define
+    build_application(token=None) and may set WEBHOOK_SINGLE_PROCESS = True; TELEGRAM_TOKEN_<NAME> overrides
+    its usual token variable, so bots sharing a variable name can be combined.
+    """
+    name, _, path = spec.partition("=")
+    path = os.path.abspath(path)
+    bot_dir = os.path.dirname(path)
+    if bot_dir not in sys.path:
+        sys.path.insert(0, bot_dir)
+    module_spec = importlib.util.spec_from_file_location(f"webhook_{name}", path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    token = os.getenv(f"TELEGRAM_TOKEN_{name.upper()}")
+    return name, lambda: module.build_application(token), getattr(module, "WEBHOOK_SINGLE_PROCESS", False)
+
+
+def make_text_update(update_id, chat_id, text):
+    """A minimal Telegram update carrying a private text message."""
+    user = {"id": chat_id, "is_bot": False, "first_name": f"User {chat_id}"}
+    return {"update_id": update_id,
+            "message": {"message_id": update_id, "date": int(time.time()), "text": text, "from": user,
+                        "chat": {"id": chat_id, "type": "private", "first_name": user["first_name"]}}}
+
+
+def send_updates(url, chats=10, messages=5, text="science fiction", secret_token=None, concurrency=16):
+    """
+    Play Telegram: POST `messages` text updates for each of `chats` chats to a webhook URL. A chat's
+    updates are sent one after another, chats concurrently. Returns counts and delivery latencies.
+    """
+    def post(update):
+        request = urllib.request.Request(url, data=json.dumps(update).encode("utf-8"), method="POST",
+                                         headers={"Content-Type": "application/json"})
+        if secret_token:
+            request.add_header("X-Telegram-Bot-Api-Secret-Token", secret_token)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            status = None
+        return status, (time.perf_counter() - started) * 1000
+
+    def chat_session(chat_index):
+        chat_id = 100000 + chat_index
+        return [post(make_text_update(chat_index * messages + i + 1, chat_id, f"{text} {i + 1}"))
+                for i in range(messages)]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [result for session in pool.map(chat_session, range(chats)) for result in session]
+    latencies = [ms for _, ms in results]
+    return {
+        "sent": len(results),
+        "accepted": sum(status == 200 for status, _ in results),
+        "rejected": sum(status == 503 for status, _ in results),
+        "errors": sum(status not in (200, 503) for status, _ in results),
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Telegram bots through webhooks, or send them test updates.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run bots behind one webhook server")
+    serve_parser.add_argument("--bot", action="append", required=True, metavar="NAME=PATH",
+                              help="bot file defining build_application(token=None); repeat for more bots")
+    serve_parser.add_argument("--public-url", default=os.getenv("TELEGRAM_WEBHOOK_URL"),
+                              help="public base URL Telegram posts to; webhooks are not registered without it")
+    env = settings_from_env()
+    serve_parser.add_argument("--host", default=env["host"])
+    serve_parser.add_argument("--port", type=int, default=env["port"])
+    serve_parser.add_argument("--workers", type=int, default=env["workers"], help="concurrent updates per bot")
+    serve_parser.add_argument("--max-pending", type=int, default=env["max_pending"],
+                              help="queued updates per bot before answering 503")
+    serve_parser.add_argument("--processes", type=int, default=env["processes"],
+                              help="shard processes running the handlers; chats are routed to shards")
+    serve_parser.add_argument("--max-connections", type=int, default=env["max_connections"])
+
+    send_parser = commands.add_parser("send", help="POST fake text updates to a webhook URL")
+    send_parser.add_argument("--url", required=True)
+    send_parser.add_argument("--chats", type=int, default=10)
+    send_parser.add_argument("--messages", type=int, default=5, help="updates per chat")
+    send_parser.add_argument("--text", default="science fiction")
+    send_parser.add_argument("--concurrency", type=int, default=16)
+
+    args = parser.parse_args(argv)
+    secret_token = os.getenv("TELEGRAM_WEBHOOK_SECRET") or None
+    if args.command == "send":
+        print(json.dumps(send_updates(args.url, args.chats, args.messages, args.text, secret_token,
+                                      args.concurrency), indent=2))
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    loaded = [load_bot(spec) for spec in args.bot]
+    bots = {name: build for name, build, _ in loaded}
+    serve(bots, public_url=args.public_url, host=args.host, port=args.port, workers=args.workers,
+          max_pending=args.max_pending, processes=args.processes, secret_token=secret_token,
+          max_connections=args.max_connections,
+          single_process={name for name, _, single_process in loaded if single_process})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+# setup.py
+from setuptools import setup, find_packages
+
+setup(
+    name="llm_toolkit",
+    version="0.1.0",
+    description="Shared helpers for the Groq/Gemini apps in this repository: backend routing, metrics, benchmarking and Telegram webhooks.",
+    packages=find_packages(),
+    install_requires=[
+        # Everything is optional: the Groq client is passed in by the app,
+        # and "openai" is only needed for the Ollama backend.
+    ],
+    extras_require={
+        "ollama": ["openai"],
+        "webhook": ["uvicorn"],
+    },
+    classifiers=[
+        "Programming Language :: Python :: 3",
+        "Operating System :: OS Independent",
+    ],
+)
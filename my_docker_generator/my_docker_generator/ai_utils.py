@@ -8,6 +8,13 @@ try:
         api_key=os.getenv("GROQ_API_KEY")
     )
 
+    try:
+        from llm_toolkit.router import wrap_client
+
+        groq_client = wrap_client(groq_client, app="my_docker_generator")
+    except ImportError:
+        pass
+
     def groq_query(data, query):
         """Return a list of file objects from data matching the filename in the query."""
         if query.startswith('*[name == "') and query.endswith('"]'):